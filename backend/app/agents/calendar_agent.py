@@ -13,10 +13,8 @@ from app.agents.tools.calendar import (
     find_free_time,
 )
 
-CALENDAR_SYSTEM_PROMPT = (
-    "You are the Calendar Agent, a specialist within the Jarvis assistant. "
-    "Your role is to manage the user's Google Calendar using the tools available to you. "
-    "You can list, create, update, and delete events, and find free time slots.\n\n"
+# Domain rules, shared with the orchestrator when it calls the tools itself (flat mode)
+CALENDAR_RULES = (
     "IMPORTANT RULES:\n"
     "1. To create an event you MUST have at minimum: an event name and a start time. "
     "If any of these are missing, ask the user for the missing information before calling create_event.\n"
@@ -30,7 +28,16 @@ CALENDAR_SYSTEM_PROMPT = (
     "7. For updates or deletions, first list events to find the right one if the user didn't provide an ID.\n"
     "8. Always respond in the same language the user speaks to you.\n"
     "9. Keep responses concise and natural, as they will be spoken aloud.\n"
-    "10. Available event colors: lavender, sage, grape, flamingo, banana, tangerine, peacock, graphite, blueberry, basil, tomato."
+    "10. Available event colors: lavender, sage, grape, flamingo, banana, tangerine, peacock, graphite, blueberry, basil, tomato.\n"
+    "11. For free time over several days, call find_free_time once for the whole range, not once per day. "
+    "When the user wants to fit a meeting, pass its length as meeting_minutes."
+)
+
+CALENDAR_SYSTEM_PROMPT = (
+    "You are the Calendar Agent, a specialist within the Jarvis assistant. "
+    "Your role is to manage the user's Google Calendar using the tools available to you. "
+    "You can list, create, update, and delete events, and find free time slots.\n\n"
+    + CALENDAR_RULES
 )
 
 CALENDAR_TOOLS = [
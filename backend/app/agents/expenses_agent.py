@@ -15,10 +15,8 @@ from app.agents.tools.folders import (
     query_folder_expenses,
 )
 
-EXPENSES_SYSTEM_PROMPT = (
-    "You are the Expenses Agent, a specialist within the Jarvis assistant. "
-    "Your role is to manage the user's personal expenses and expense folders using the database tools available to you. "
-    "You can add, query, update, and delete expenses, provide spending summaries, and manage folders.\n\n"
+# Domain rules, shared with the orchestrator when it calls the tools itself (flat mode)
+EXPENSES_RULES = (
     "IMPORTANT RULES:\n"
     "1. When the user wants to add an expense, you MUST have at minimum: the amount, a description, and a category. "
     "If any of these are missing, ask the user for the missing information before calling add_expense.\n"
@@ -43,6 +41,13 @@ EXPENSES_SYSTEM_PROMPT = (
     "When the user mentions a folder by name, first use list_folders to find its ID, then use that ID for further operations."
 )
 
+EXPENSES_SYSTEM_PROMPT = (
+    "You are the Expenses Agent, a specialist within the Jarvis assistant. "
+    "Your role is to manage the user's personal expenses and expense folders using the database tools available to you. "
+    "You can add, query, update, and delete expenses, provide spending summaries, and manage folders.\n\n"
+    + EXPENSES_RULES
+)
+
 EXPENSE_TOOLS = [
     query_expenses,
     get_expense_summary,
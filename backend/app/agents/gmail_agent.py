@@ -6,10 +6,8 @@ from agent_framework.azure import AzureOpenAIChatClient
 
 from app.agents.tools.gmail import GMAIL_TOOLS
 
-GMAIL_SYSTEM_PROMPT = (
-    "You are the Email Agent, a specialist within the Jarvis assistant. "
-    "Your role is to manage the user's Gmail using the tools available to you. "
-    "You can search emails, read full messages, send new emails, reply to emails, and list recent inbox messages.\n\n"
+# Domain rules, shared with the orchestrator when it calls the tools itself (flat mode)
+GMAIL_RULES = (
     "IMPORTANT RULES:\n"
     "1. To send an email you MUST have all three: recipient (to), subject, and body. "
     "If any of these are missing, ask the user for the missing information before calling send_email.\n"
@@ -24,6 +22,13 @@ GMAIL_SYSTEM_PROMPT = (
     "'from:', 'to:', 'subject:', 'is:unread', 'has:attachment', 'newer_than:', 'older_than:', etc."
 )
 
+GMAIL_SYSTEM_PROMPT = (
+    "You are the Email Agent, a specialist within the Jarvis assistant. "
+    "Your role is to manage the user's Gmail using the tools available to you. "
+    "You can search emails, read full messages, send new emails, reply to emails, and list recent inbox messages.\n\n"
+    + GMAIL_RULES
+)
+
 
 def create_gmail_agent(client: AzureOpenAIChatClient) -> Agent:
     """Create the Gmail agent using the shared Azure OpenAI client."""
@@ -1,24 +1,41 @@
+import asyncio
+import contextvars
 import logging
+import re
+import threading
+import time
+from datetime import datetime
+from typing import AsyncIterator, NamedTuple
+from zoneinfo import ZoneInfo
 
-from agent_framework import Agent
+from agent_framework import Agent, Message
 from agent_framework.azure import AzureOpenAIChatClient
 
 from app import config
-from app.agents.expenses_agent import create_expenses_agent
-from app.agents.calendar_agent import create_calendar_agent
-from app.agents.weather_agent import create_weather_agent
-from app.agents.gmail_agent import create_gmail_agent
+from app.agents.expenses_agent import create_expenses_agent, EXPENSES_RULES, EXPENSE_TOOLS
+from app.agents.calendar_agent import create_calendar_agent, CALENDAR_RULES, CALENDAR_TOOLS
+from app.agents.weather_agent import create_weather_agent, WEATHER_RULES, WEATHER_TOOLS
+from app.agents.gmail_agent import create_gmail_agent, GMAIL_RULES
+from app.agents.tools.gmail import GMAIL_TOOLS
+from app.agents import response_cache, router
+from app.database.cosmos import get_expenses_container
+from app.database.documents import DocumentNotFound
+from app.services import conversations
 
 logger = logging.getLogger(__name__)
 
-SYSTEM_PROMPT = (
+PERSONA_PROMPT = (
     "You are Jarvis, a personal AI voice assistant. "
     "You are helpful, concise, and friendly. "
     "Keep responses short and conversational since they will be spoken aloud via text-to-speech. "
     "IMPORTANT: Never use emoji, markdown formatting (**, ##, -, *), bullet points, or numbered lists. "
     "Output only plain text, as if you were speaking naturally to someone. "
     "Respond in the same language the user speaks to you.\n\n"
-    "You have access to specialist agents. "
+)
+
+SYSTEM_PROMPT = (
+    PERSONA_PROMPT
+    + "You have access to specialist agents. "
     "When the user asks anything related to expenses, spending, costs, payments, or money tracking, "
     "delegate to the expenses tool. "
     "When the user asks anything related to calendar, events, schedule, meetings, appointments, or free time, "
@@ -32,8 +49,54 @@ SYSTEM_PROMPT = (
     "For all other topics, respond directly."
 )
 
+# Flat mode: the orchestrator calls the concrete tools itself, following each domain's rules
+FLAT_SYSTEM_PROMPT = (
+    PERSONA_PROMPT
+    + "You manage the user's expenses and expense folders, Google Calendar, Gmail, and weather lookups "
+    "directly with your tools. For all other topics, respond directly. "
+    "Follow the rules of each area below.\n\n"
+    + "\n\n".join(
+        f"{domain.upper()}\n{rules}"
+        for domain, rules in (
+            ("expenses", EXPENSES_RULES),
+            ("calendar", CALENDAR_RULES),
+            ("weather", WEATHER_RULES),
+            ("email", GMAIL_RULES),
+        )
+    )
+)
+
+# Sentence boundary: terminal punctuation followed by whitespace, or a newline.
+# Requiring the whitespace keeps "3.50" from being split across two chunks.
+_SENTENCE_END = re.compile(r"[.!?…]+\s+|\n+")
+
+# Queue of the /api/chat/stream request currently running, if any
+_event_queue: contextvars.ContextVar[asyncio.Queue | None] = contextvars.ContextVar(
+    "jarvis_event_queue", default=None
+)
+
 _agent = None
-_thread = None  # the memory of the conversation, it cancel evry time the backend restart
+_specialists: dict[str, Agent] = {}  # by tool name, for turns the router sends straight to them
+_tool_domains: dict[str, str] = {}  # orchestrator tool name -> specialist domain
+_summarizer = None
+_agent_lock = threading.Lock()  # warmup builds the agent on a worker thread while requests may ask for it
+_background_tasks: set[asyncio.Task] = set()
+_pending_saves: dict[str, asyncio.Task] = {}  # conversation id -> deferred save of a cached turn
+
+
+class Reply(NamedTuple):
+    text: str
+    conversation_id: str
+    cached: bool = False  # served from the response cache, no agent ran
+
+
+SUMMARY_PROMPT = (
+    "You maintain the running summary of a conversation between a user and Jarvis, a personal voice assistant. "
+    "You get the current summary (if any) and the next turns of the conversation. "
+    "Return an updated summary in plain text, at most 150 words, in the language of the conversation. "
+    "Keep facts that later turns may refer to: names, dates, amounts, IDs of expenses, events, folders or emails, "
+    "decisions taken and open questions. Drop greetings and small talk."
+)
 
 
 def _create_client():
@@ -51,9 +114,48 @@ def _create_client():
     )
 
 
-def _create_agent():
-    client = _create_client()
-    logger.info("Azure OpenAI client connected (deployment=%s)", config.AZURE_OPENAI_DEPLOYMENT)
+def _progress_callback(agent_name: str):
+    """Build a specialist stream callback that reports tool calls to the active stream."""
+    async def _on_update(update):
+        queue = _event_queue.get()
+        if queue is None:
+            return
+        for content in update.contents:
+            if content.type == "function_call" and content.name:
+                await queue.put({"event": "progress", "agent": agent_name, "tool": content.name})
+
+    return _on_update
+
+
+def _create_flat_agent(client: AzureOpenAIChatClient) -> Agent:
+    """Orchestrator that calls the specialists' tools itself: one LLM conversation per turn."""
+    domain_tools = {
+        "expenses": EXPENSE_TOOLS, "calendar": CALENDAR_TOOLS, "weather": WEATHER_TOOLS, "gmail": GMAIL_TOOLS,
+    }
+    _tool_domains.clear()
+    _tool_domains.update({t.name: domain for domain, tools in domain_tools.items() for t in tools})
+
+    now = datetime.now(ZoneInfo("Europe/Rome"))
+    date_context = f"\n\nToday's date is {now.strftime('%A, %Y-%m-%d')} and the current time is {now.strftime('%H:%M')}. Use this to resolve relative dates like 'today', 'tomorrow', 'next week', etc."
+
+    logger.info("Orchestrator ready (flat mode, %d tools)", len(_tool_domains))
+    return Agent(
+        client=client,
+        name="jarvis",
+        instructions=FLAT_SYSTEM_PROMPT + date_context,
+        tools=[t for tools in domain_tools.values() for t in tools],
+    )
+
+
+def build_agent(client: AzureOpenAIChatClient, mode: str) -> Agent:
+    """Build the orchestrator (plus the specialists the router dispatches to
+    and the conversation summarizer) on client.
+
+    mode "nested" wraps each specialist agent as a tool; "flat" gives the
+    orchestrator the specialists' tools directly.
+    """
+    if mode not in ("nested", "flat"):
+        raise RuntimeError(f"Unknown ORCHESTRATOR_MODE '{mode}' (expected 'nested' or 'flat')")
 
     # Create the expenses agent and wrap it as a tool for the orchestrator
     expenses_agent = create_expenses_agent(client)
@@ -65,6 +167,7 @@ def _create_agent():
         ),
         arg_name="request",
         arg_description="The user's expense-related request in natural language",
+        stream_callback=_progress_callback("expenses"),
     )
 
     # Create the calendar agent and wrap it as a tool for the orchestrator
@@ -77,6 +180,7 @@ def _create_agent():
         ),
         arg_name="request",
         arg_description="The user's calendar-related request in natural language",
+        stream_callback=_progress_callback("calendar"),
     )
 
     # Create the weather agent and wrap it as a tool for the orchestrator
@@ -89,6 +193,7 @@ def _create_agent():
         ),
         arg_name="request",
         arg_description="The user's weather-related request in natural language",
+        stream_callback=_progress_callback("weather"),
     )
 
     # Create the gmail agent and wrap it as a tool for the orchestrator
@@ -101,8 +206,19 @@ def _create_agent():
         ),
         arg_name="request",
         arg_description="The user's email-related request in natural language",
+        stream_callback=_progress_callback("gmail"),
+    )
+
+    _specialists.update(
+        expenses=expenses_agent, calendar=calendar_agent, weather=weather_agent, gmail=gmail_agent,
     )
+    global _summarizer
+    _summarizer = Agent(client=client, name="summarizer", instructions=SUMMARY_PROMPT)
+    if mode == "flat":
+        return _create_flat_agent(client)
 
+    _tool_domains.clear()
+    _tool_domains.update({name: name for name in _specialists})
     logger.info("Orchestrator ready (tools: expenses, calendar, weather, gmail)")
 
     return Agent(
@@ -113,29 +229,268 @@ def _create_agent():
     )
 
 
+def _create_agent():
+    client = _create_client()
+    logger.info("Azure OpenAI client connected (deployment=%s)", config.AZURE_OPENAI_DEPLOYMENT)
+    return build_agent(client, config.ORCHESTRATOR_MODE)
+
+
 def get_agent():
     global _agent
     if _agent is None:
-        _agent = _create_agent()
+        with _agent_lock:
+            if _agent is None:
+                _agent = _create_agent()
     return _agent
 
 
-def get_thread():
-    global _thread
-    if _thread is None:
-        _thread = get_agent().get_new_thread()
-    return _thread
+def _route(message: str) -> router.Route:
+    if not config.ROUTER_ENABLED:
+        return router.Route(None, 0.0, "router disabled")
+    decision = router.route(message)
+    logger.info("Router: %s (%.2f, %s)", decision.domain or "orchestrator", decision.confidence, decision.reason)
+    return decision
+
+
+def _delegated_to(tool_names: set[str]) -> str | None:
+    """The specialist domain an orchestrated turn went to, if exactly one."""
+    domains = {_tool_domains.get(name, name) for name in tool_names}
+    return next(iter(domains)) if len(domains) == 1 else None
+
+
+async def _summarize(summary: str | None, turns: list[dict]) -> str:
+    transcript = "\n".join(f"{turn['role']}: {turn['text']}" for turn in turns)
+    response = await _summarizer.run(f"Current summary: {summary or '(none)'}\n\nNext turns:\n{transcript}")
+    return response.text or summary or ""
+
+
+async def _thread_for(agent: Agent, conversation: dict):
+    """A thread holding the conversation's summary and recent turns (tool calls aren't kept)."""
+    thread = agent.get_new_thread()
+    messages = []
+    if conversation.get("summary"):
+        messages.append(Message(role="system", text=f"Summary of the earlier conversation: {conversation['summary']}"))
+    messages += [Message(role=turn["role"], text=turn["text"]) for turn in conversation.get("turns", [])]
+    if messages:
+        await thread.on_new_messages(messages)
+    return thread
+
+
+async def _after_pending_save(conversation_id: str):
+    """Wait for a cached turn of the conversation still being written, so turns stay in order."""
+    pending = _pending_saves.get(conversation_id)
+    if pending is not None:
+        await asyncio.wait([pending])
+
+
+async def _load_conversation(conversation_id: str | None) -> dict:
+    """The stored conversation, or a new one when no ID is given. Raises DocumentNotFound."""
+    container = await get_expenses_container()
+    if not conversation_id:
+        return await conversations.create_conversation(container)
+    await _after_pending_save(conversation_id)
+    return await conversations.get_conversation(container, conversation_id)
+
+
+async def _save_turn(conversation: dict, message: str, reply: str):
+    """Persist the turn, after any cached turn of the conversation still being written."""
+    await _after_pending_save(conversation["id"])
+    await _write_turn(conversation, message, reply)
+
+
+async def _write_turn(conversation: dict, message: str, reply: str):
+    """Append the turn; summarizing old turns happens in the background, off this turn's latency."""
+    container = await get_expenses_container()
+    updated = await conversations.append_turn(container, conversation, message, reply)
+    if conversations.needs_compaction(updated):
+        task = asyncio.create_task(conversations.compact(container, updated, _summarize))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+
+def _defer_save_turn(conversation_id: str | None, message: str, reply: str) -> str:
+    """Persist a cached turn in the background: a cache hit answers without waiting on Cosmos.
+
+    Loading the conversation (or creating it, without an ID) happens in the
+    same background step. Returns the conversation's ID.
+    """
+    new = not conversation_id
+    conversation_id = conversation_id or conversations.new_conversation_id()
+    previous = _pending_saves.get(conversation_id)
+
+    async def _save():
+        if previous is not None:
+            await asyncio.wait([previous])
+        try:
+            container = await get_expenses_container()
+            if new:
+                conversation = await conversations.create_conversation(container, conversation_id=conversation_id)
+            else:
+                conversation = await conversations.get_conversation(container, conversation_id)
+            await _write_turn(conversation, message, reply)
+        except DocumentNotFound:
+            logger.warning("Cached turn not saved: conversation %s not found", conversation_id)
+        except Exception:
+            logger.exception("Saving cached turn failed for conversation %s", conversation_id)
 
+    task = asyncio.create_task(_save())
+    _pending_saves[conversation_id] = task
+    _background_tasks.add(task)
 
-def reset_thread():
-    """Start a new conversation (clears history)."""
-    global _thread
-    _thread = None
+    def _done(finished: asyncio.Task):
+        _background_tasks.discard(finished)
+        if _pending_saves.get(conversation_id) is finished:
+            del _pending_saves[conversation_id]
 
+    task.add_done_callback(_done)
+    return conversation_id
 
-async def send_message(message: str) -> str:
-    """Send a message to Jarvis and return the response text."""
+
+async def send_message(message: str, conversation_id: str | None) -> Reply:
+    """Send a message to Jarvis within a stored conversation (a new one without an ID) and return the reply.
+
+    Raises DocumentNotFound for an unknown conversation. A cached answer
+    doesn't wait for the conversation: it is read or created in the
+    background, with the turn.
+    """
+    cache_key = response_cache.cache.key_for(message)
+    cached = response_cache.cache.get(cache_key) if cache_key else None
+    if cached is not None:
+        return Reply(cached, _defer_save_turn(conversation_id, message, cached), cached=True)
+
+    conversation = await _load_conversation(conversation_id)
+    agent = get_agent()
+    started = time.perf_counter()
+    decision = _route(message)
+
+    if decision.domain:
+        # The specialist gets the conversation too, so a follow-up the router let through still resolves
+        specialist = _specialists[decision.domain]
+        response = await specialist.run(message, thread=await _thread_for(specialist, conversation))
+        await _save_turn(conversation, message, response.text or "")
+        router.stats.record("direct", decision.domain, time.perf_counter() - started)
+    else:
+        response = await agent.run(message, thread=await _thread_for(agent, conversation))
+        await _save_turn(conversation, message, response.text or "")
+        tool_names = {
+            content.name
+            for reply in response.messages
+            for content in reply.contents
+            if content.type == "function_call" and content.name
+        }
+        router.stats.record("orchestrator", _delegated_to(tool_names), time.perf_counter() - started)
+    if cache_key:
+        response_cache.cache.put(cache_key, response.text or "")
+    return Reply(response.text or "", conversation["id"])
+
+
+def _split_sentences(buffer: str) -> tuple[list[str], str]:
+    """Split complete sentences off the front of buffer. Returns (sentences, rest)."""
+    sentences = []
+    start = 0
+    for match in _SENTENCE_END.finditer(buffer):
+        sentence = buffer[start:match.end()].strip()
+        if sentence:
+            sentences.append(sentence)
+        start = match.end()
+    return sentences, buffer[start:]
+
+
+async def stream_message(message: str, conversation_id: str | None) -> tuple[str, AsyncIterator[dict]]:
+    """Send a message to Jarvis within a stored conversation (a new one without an ID).
+
+    Returns the conversation's ID and the events of the turn as it progresses:
+    {"event": "agent", "agent"} when a specialist is delegated to,
+    {"event": "progress", "agent", "tool"} when a specialist calls a tool,
+    {"event": "sentence", "text"} for each complete sentence of the answer,
+    then {"event": "done", "text", "cached"} or {"event": "error", "detail"}.
+    A cached answer comes as its sentences and "done", with no agent events.
+    Raises DocumentNotFound for an unknown conversation, before any event;
+    as in send_message, a cached answer doesn't wait for the conversation.
+    """
+    cache_key = response_cache.cache.key_for(message)
+    cached = response_cache.cache.get(cache_key) if cache_key else None
+    if cached is not None:
+        return _defer_save_turn(conversation_id, message, cached), _cached_events(cached)
+
+    conversation = await _load_conversation(conversation_id)
+    return conversation["id"], _turn_events(message, conversation, cache_key)
+
+
+async def _cached_events(cached: str) -> AsyncIterator[dict]:
+    sentences, rest = _split_sentences(cached)
+    for sentence in sentences + ([rest.strip()] if rest.strip() else []):
+        yield {"event": "sentence", "text": sentence}
+    yield {"event": "done", "text": cached, "cached": True}
+
+
+async def _turn_events(message: str, conversation: dict, cache_key) -> AsyncIterator[dict]:
     agent = get_agent()
-    thread = get_thread()
-    response = await agent.run(message, thread=thread)
-    return response.text or ""
+    queue: asyncio.Queue = asyncio.Queue()
+    started = time.perf_counter()
+    decision = _route(message)
+    runner = _specialists[decision.domain] if decision.domain else agent
+    thread = await _thread_for(runner, conversation)
+
+    async def _pump():
+        buffer = ""
+        tool_names, domains = set(), set()
+        try:
+            if decision.domain:
+                await queue.put({"event": "agent", "agent": decision.domain})
+            stream = runner.run(message, stream=True, thread=thread)
+            async for update in stream:
+                for content in update.contents:
+                    if content.type != "function_call" or not content.name:
+                        continue
+                    if decision.domain:
+                        # The specialist's own tool calls
+                        await queue.put({"event": "progress", "agent": decision.domain, "tool": content.name})
+                        continue
+                    domain = _tool_domains.get(content.name, content.name)
+                    if domain not in domains:
+                        domains.add(domain)
+                        await queue.put({"event": "agent", "agent": domain})
+                    tool_names.add(content.name)
+                    if domain != content.name:
+                        # Flat mode: the orchestrator called the domain's tool itself
+                        await queue.put({"event": "progress", "agent": domain, "tool": content.name})
+                if update.text:
+                    sentences, buffer = _split_sentences(buffer + update.text)
+                    for sentence in sentences:
+                        await queue.put({"event": "sentence", "text": sentence})
+            if buffer.strip():
+                await queue.put({"event": "sentence", "text": buffer.strip()})
+            response = await stream.get_final_response()
+            # Saved before "done", so a follow-up sent right away already sees this turn
+            await _save_turn(conversation, message, response.text or "")
+            if decision.domain:
+                router.stats.record("direct", decision.domain, time.perf_counter() - started)
+            else:
+                router.stats.record("orchestrator", _delegated_to(tool_names), time.perf_counter() - started)
+            if cache_key:
+                response_cache.cache.put(cache_key, response.text or "")
+            await queue.put({"event": "done", "text": response.text or "", "cached": False})
+        except Exception as e:
+            logger.error("stream_message failed: %s", e, exc_info=True)
+            await queue.put({"event": "error", "detail": str(e)})
+        finally:
+            await queue.put(None)
+
+    # The pump task copies the current context, so specialist callbacks see the queue
+    token = _event_queue.set(queue)
+    try:
+        task = asyncio.create_task(_pump())
+    finally:
+        _event_queue.reset(token)
+
+    try:
+        while True:
+            event = await queue.get()
+            if event is None:
+                break
+            yield event
+    finally:
+        # Client went away mid-turn
+        if not task.done():
+            task.cancel()
@@ -0,0 +1,152 @@
+"""Turn-level cache for read-only questions.
+
+Asking "what's on my calendar today" or "how much did I spend on food this
+month" again returns the previous answer without running the orchestrator,
+a specialist or any tool. Answers are keyed on the normalized message,
+today's date (for relative dates) and the version of the data they were
+built from, so any write makes them unreachable:
+
+- expenses: the expense cache version plus the folders counter, plus a
+  longer TTL as a bound on how long any answer is reused
+- calendar: the calendar counter, bumped by the app's writes and by syncs
+  of the event store that bring changes, plus a short TTL for changes made
+  elsewhere that no sync has picked up yet
+- weather: the weather service's own TTL
+
+Only messages the router maps to one of those domains are cached. Email is
+never cached, because new mail arrives without any write here. Messages that
+read like a change ("add", "delete", "sposta"...) are never looked up, and an
+answer isn't stored if the data changed while it was being produced.
+Entries are kept per worker, in a bounded LRU. A hit still records the
+turn in the conversation, but the write runs in the background.
+"""
+
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from app import config
+from app.agents import router
+from app.services.data_cache import data_version, expenses_version
+from app.services.weather import CURRENT_TTL
+
+_WORD = re.compile(r"[\w']+")
+
+# Verbs of requests that change something (English and Italian)
+_MUTATING = re.compile(
+    r"\b(add|create|log|record|delete|remove|update|change|edit|modify|move|rename|assign|set|mark|"
+    r"send|reply|forward|schedule|book|cancel|reschedule|"
+    r"aggiungi|crea|registra|elimina|cancella|rimuovi|aggiorna|modifica|cambia|sposta|rinomina|assegna|"
+    r"segna|manda|invia|inoltra|rispondi|fissa|prenota|annulla)\b"
+)
+# Statements of a new expense: "I paid 12 euros for lunch", "ho comprato..."
+_NEW_EXPENSE = re.compile(r"\b(i (paid|spent|bought)|i've (paid|spent|bought)|^ho (pagato|speso|comprato))\b")
+
+
+def _domain_ttl() -> dict[str, int]:
+    return {"expenses": config.RESPONSE_CACHE_EXPENSES_TTL, "calendar": config.RESPONSE_CACHE_CALENDAR_TTL, "weather": CURRENT_TTL}
+
+
+def _versions(domain: str) -> tuple:
+    if domain == "expenses":
+        return expenses_version(), data_version("folders")
+    if domain == "calendar":
+        return (data_version("calendar"),)
+    return ()
+
+
+def normalize(message: str) -> str:
+    """Case, punctuation and spacing don't change the question."""
+    return " ".join(_WORD.findall(message.lower()))
+
+
+@dataclass(frozen=True)
+class CacheKey:
+    text: str
+    domain: str
+    day: str
+    versions: tuple
+
+
+class ResponseCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._entries: OrderedDict[CacheKey, tuple[float, str]] = OrderedDict()
+            self.hits = 0
+            self.misses = 0
+            self.stored = 0
+            self.bypassed = Counter()
+            self.hit_seconds = 0.0
+
+    def _bypass(self, reason: str) -> None:
+        with self._lock:
+            self.bypassed[reason] += 1
+
+    def key_for(self, message: str) -> CacheKey | None:
+        """The key message's answer is cached under, or None if it must not be cached."""
+        if not config.RESPONSE_CACHE_ENABLED:
+            return None
+        text = normalize(message)
+        if _MUTATING.search(text) or _NEW_EXPENSE.search(text):
+            self._bypass("mutating")
+            return None
+        domain = router.route(message).domain
+        if domain not in _domain_ttl():
+            self._bypass("uncached domain" if domain else "not routable")
+            return None
+        day = datetime.now(ZoneInfo("Europe/Rome")).date().isoformat()
+        return CacheKey(text, domain, day, _versions(domain))
+
+    def get(self, key: CacheKey) -> str | None:
+        started = time.perf_counter()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.hit_seconds += time.perf_counter() - started
+            return entry[1]
+
+    def put(self, key: CacheKey, text: str) -> bool:
+        """Store an answer, unless the data changed while it was produced (the turn itself may have written)."""
+        if not text or _versions(key.domain) != key.versions:
+            self._bypass("data changed during turn")
+            return False
+        expires = time.monotonic() + _domain_ttl()[key.domain]
+        with self._lock:
+            self._entries[key] = (expires, text)
+            self._entries.move_to_end(key)
+            while len(self._entries) > config.RESPONSE_CACHE_SIZE:
+                self._entries.popitem(last=False)
+            self.stored += 1
+        return True
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": config.RESPONSE_CACHE_ENABLED,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "stored": self.stored,
+                "bypassed": dict(self.bypassed),
+                "hitRate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "avgHitMs": round(self.hit_seconds / self.hits * 1000, 3) if self.hits else None,
+            }
+
+
+cache = ResponseCache()
@@ -0,0 +1,273 @@
+"""Local intent router in front of the orchestrator.
+
+Unambiguous requests ("what's the weather in Rome") go straight to the
+specialist agent, skipping the orchestrator's LLM hop that would only pick
+the tool. Keyword rules and a small naive Bayes classifier (trained at import
+on the examples below) must agree; anything ambiguous, multi-domain or
+context-dependent ("yes, do it", "and tomorrow?") falls back to the
+orchestrator, which has the conversation history.
+"""
+
+import math
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+
+from app import config
+
+DOMAINS = ("expenses", "calendar", "weather", "gmail")
+OTHER = "other"
+
+_WORD = re.compile(r"[a-zà-ÿ0-9']+")
+
+# Strong signals per domain (English and Italian)
+_KEYWORDS = {
+    "expenses": re.compile(
+        r"\b(expenses?|spen[dt]|spending|costs?|paid|pay(ment)?s?|bought|purchases?|budget|euros?|"
+        r"folders?|receipts?|spes[ae]|speso|pagat[oaie]|comprat[oaie]|soldi|cartell[ae])\b"
+    ),
+    "calendar": re.compile(
+        r"\b(calendar|events?|meetings?|appointments?|schedule[d]?|agenda|free time|busy|"
+        r"calendario|eventi|evento|riunion[ei]|appuntament[oi]|impegn[oi]|libero)\b"
+    ),
+    "weather": re.compile(
+        r"\b(weather|forecast|temperature|rain(ing|y)?|sunny|snow(ing)?|umbrella|humid(ity)?|wind(y)?|cold|"
+        r"meteo|tempo fa|previsioni|temperatura|piove(rà)?|pioggia|neve|ombrello|caldo|freddo)\b"
+    ),
+    "gmail": re.compile(
+        r"\b(e-?mails?|gmail|inbox|mail|unread|reply|replies|send (a )?message|"
+        r"posta|rispondi|non lett[ei])\b"
+    ),
+}
+
+# Turns that only make sense with the previous turn in view
+_FOLLOW_UP = re.compile(
+    r"^(yes|yeah|yep|no|nope|ok(ay)?|sure|confirm|cancel|do it|go ahead|and|also|what about|"
+    r"sì|si|va bene|conferma|annulla|e |anche|invece)\b"
+)
+_ANAPHORA = re.compile(
+    r"\b(that one|this one|the same|them|those|quello|quella|quelli|lo stesso)\b|"
+    r"\b(delete|cancel|move|change|update|edit|send|forward|reply to) (it|that)\b"
+)
+
+_EXAMPLES = {
+    "expenses": [
+        "add an expense of 20 euros for lunch",
+        "how much did I spend on food this month",
+        "show my expenses from last week",
+        "I paid 45 euros for fuel today",
+        "what did I spend on transport in march",
+        "give me a summary of my spending",
+        "delete the expense for the pharmacy",
+        "create a folder for the trip to paris",
+        "list my expense folders",
+        "quanto ho speso questo mese",
+        "aggiungi una spesa di 12 euro per la spesa al supermercato",
+        "mostrami le spese di ieri",
+        "ho pagato 30 euro di benzina",
+        "spending on subscriptions this year",
+    ],
+    "calendar": [
+        "what's on my calendar today",
+        "schedule a meeting with marco tomorrow at 3pm",
+        "do I have any appointments on friday",
+        "when am I free next week",
+        "move my dentist appointment to monday",
+        "create an event called gym tomorrow morning",
+        "cancel the meeting on thursday",
+        "what is my schedule for tomorrow",
+        "find free time this afternoon",
+        "cosa ho in calendario domani",
+        "fissa un appuntamento con il medico lunedì alle 10",
+        "ho impegni venerdì sera",
+        "quando sono libero questa settimana",
+        "list my events for the weekend",
+    ],
+    "weather": [
+        "what's the weather in rome",
+        "will it rain tomorrow",
+        "weather forecast for the weekend in milan",
+        "how hot is it outside",
+        "do I need an umbrella today",
+        "what's the temperature in london",
+        "is it going to snow in turin",
+        "forecast for the next three days",
+        "che tempo fa a roma",
+        "pioverà domani a milano",
+        "previsioni meteo per il weekend",
+        "che temperatura c'è fuori",
+        "is it sunny in naples",
+        "how windy is it today",
+    ],
+    "gmail": [
+        "do I have any new emails",
+        "check my inbox",
+        "read the last email from anna",
+        "send an email to luca about the report",
+        "reply to the email from my boss",
+        "search my mail for the invoice from amazon",
+        "any unread messages in gmail",
+        "what did marco write me",
+        "ho nuove email",
+        "controlla la posta",
+        "leggi l'ultima mail di giulia",
+        "manda una mail a paolo",
+        "rispondi alla mail del capo",
+        "show my recent emails",
+    ],
+    OTHER: [
+        "hello how are you",
+        "tell me a joke",
+        "who are you",
+        "what time is it",
+        "translate good morning into french",
+        "what is the capital of spain",
+        "thank you",
+        "explain how photosynthesis works",
+        "write a short poem about the sea",
+        "ciao come stai",
+        "raccontami una barzelletta",
+        "chi sei",
+        "grazie mille",
+        "how many days until christmas",
+        "what can you do",
+    ],
+}
+
+
+def _tokens(text: str) -> list[str]:
+    return _WORD.findall(text.lower())
+
+
+class _NaiveBayes:
+    """Multinomial naive Bayes over word unigrams, Laplace-smoothed."""
+
+    def __init__(self, examples: dict[str, list[str]]):
+        self.labels = list(examples)
+        self.counts = {label: Counter() for label in self.labels}
+        self.totals = {}
+        vocabulary = set()
+        for label, texts in examples.items():
+            for text in texts:
+                words = _tokens(text)
+                self.counts[label].update(words)
+                vocabulary.update(words)
+            self.totals[label] = sum(self.counts[label].values())
+        self.vocabulary_size = len(vocabulary)
+        total_examples = sum(len(texts) for texts in examples.values())
+        self.priors = {label: math.log(len(texts) / total_examples) for label, texts in examples.items()}
+
+    def predict(self, text: str) -> dict[str, float]:
+        """Posterior probability per label."""
+        words = _tokens(text)
+        scores = {}
+        for label in self.labels:
+            counts, denominator = self.counts[label], self.totals[label] + self.vocabulary_size
+            scores[label] = self.priors[label] + sum(math.log((counts[w] + 1) / denominator) for w in words)
+        top = max(scores.values())
+        exp = {label: math.exp(score - top) for label, score in scores.items()}
+        norm = sum(exp.values())
+        return {label: value / norm for label, value in exp.items()}
+
+
+_classifier = _NaiveBayes(_EXAMPLES)
+
+
+@dataclass
+class Route:
+    domain: str | None  # specialist to dispatch to, None = orchestrator
+    confidence: float
+    reason: str
+
+
+def route(message: str) -> Route:
+    """Decide whether message can skip the orchestrator."""
+    text = message.strip().lower()
+    words = _tokens(text)
+    if len(words) < 3 or _FOLLOW_UP.match(text) or _ANAPHORA.search(text):
+        return Route(None, 0.0, "needs conversation context")
+
+    matched = [domain for domain, pattern in _KEYWORDS.items() if pattern.search(text)]
+    if len(matched) > 1:
+        return Route(None, 0.0, f"several domains: {', '.join(matched)}")
+
+    probabilities = _classifier.predict(text)
+    predicted = max(probabilities, key=probabilities.get)
+    confidence = probabilities[predicted]
+    if predicted == OTHER:
+        return Route(None, confidence, "classifier: other")
+
+    if matched and matched[0] != predicted:
+        return Route(None, confidence, f"keywords say {matched[0]}, classifier says {predicted}")
+    # Without a keyword to back it up, the classifier alone must be near certain
+    threshold = config.ROUTER_MIN_CONFIDENCE if matched else config.ROUTER_CLASSIFIER_ONLY_CONFIDENCE
+    if confidence < threshold:
+        return Route(None, confidence, "low confidence")
+    return Route(predicted, confidence, "keywords + classifier" if matched else "classifier")
+
+
+class RouterStats:
+    """Hit rate and latency of routed vs orchestrated turns, per domain.
+
+    The saving per direct turn is estimated as the difference between the
+    mean latency of orchestrated turns that ended up in the same specialist
+    and the mean latency of direct turns.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.direct = Counter()
+            self.fallback = 0
+            self.latency = {"direct": Counter(), "orchestrator": Counter()}
+            self.samples = {"direct": Counter(), "orchestrator": Counter()}
+
+    def record(self, path: str, domain: str | None, seconds: float):
+        with self._lock:
+            if path == "direct":
+                self.direct[domain] += 1
+            else:
+                self.fallback += 1
+            # Orchestrated turns that answered directly (or used several tools) say nothing per domain
+            if domain:
+                self.latency[path][domain] += seconds
+                self.samples[path][domain] += 1
+
+    def _mean(self, path: str, domain: str) -> float | None:
+        samples = self.samples[path][domain]
+        return self.latency[path][domain] / samples if samples else None
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            routed = sum(self.direct.values())
+            total = routed + self.fallback
+            domains = {}
+            saved_total = 0.0
+            for domain in DOMAINS:
+                direct_ms = self._mean("direct", domain)
+                orchestrated_ms = self._mean("orchestrator", domain)
+                saved = None
+                if direct_ms is not None and orchestrated_ms is not None:
+                    saved = orchestrated_ms - direct_ms
+                    saved_total += saved * self.direct[domain]
+                domains[domain] = {
+                    "direct": self.direct[domain],
+                    "avgDirectMs": round(direct_ms * 1000) if direct_ms is not None else None,
+                    "avgOrchestratorMs": round(orchestrated_ms * 1000) if orchestrated_ms is not None else None,
+                    "avgSavedMs": round(saved * 1000) if saved is not None else None,
+                }
+            return {
+                "enabled": config.ROUTER_ENABLED,
+                "messages": total,
+                "direct": routed,
+                "hitRate": round(routed / total, 3) if total else 0.0,
+                "estimatedSavedMs": round(saved_total * 1000),
+                "domains": domains,
+            }
+
+
+stats = RouterStats()
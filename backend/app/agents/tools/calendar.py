@@ -1,12 +1,12 @@
-import asyncio
 import logging
-from datetime import datetime, timedelta
+from datetime import date, datetime, time, timedelta
 from typing import Annotated
 from zoneinfo import ZoneInfo
 
 from agent_framework import tool
 
-from app.services.google_calendar import get_calendar_service
+from app.services import calendar_store, free_busy, google_calendar
+from app.agents.tools.formatting import format_records, truncate
 
 logger = logging.getLogger(__name__)
 
@@ -28,9 +28,9 @@ COLOR_MAP = {
 }
 
 
-def _run_sync(func, *args, **kwargs):
-    """Run a synchronous Google API call in a thread."""
-    return asyncio.to_thread(func, *args, **kwargs)
+def _compact_time(value: str) -> str:
+    """'2026-03-02T09:30:00+01:00' -> '2026-03-02 09:30' (times are already in DEFAULT_TIMEZONE)."""
+    return value[:16].replace("T", " ") if "T" in value else value
 
 
 @tool(approval_mode="never_require")
@@ -41,58 +41,38 @@ async def list_events(
     max_results: Annotated[int, "Maximum number of events to return"] = 20,
 ) -> str:
     """List calendar events within a date range, optionally filtered by text search."""
-    try:
-        service = get_calendar_service()
-    except Exception as e:
-        logger.error("Failed to get calendar service: %s", e)
-        return f"Error connecting to Google Calendar: {e}"
-
     if end_date is None:
         end_date = start_date
 
     tz = ZoneInfo(DEFAULT_TIMEZONE)
-    time_min = datetime(int(start_date[:4]), int(start_date[5:7]), int(start_date[8:10]), 0, 0, 0, tzinfo=tz).isoformat()
-    time_max = datetime(int(end_date[:4]), int(end_date[5:7]), int(end_date[8:10]), 23, 59, 59, tzinfo=tz).isoformat()
-
-    kwargs = {
-        "calendarId": "primary",
-        "timeMin": time_min,
-        "timeMax": time_max,
-        "timeZone": DEFAULT_TIMEZONE,
-        "maxResults": max_results,
-        "singleEvents": True,
-        "orderBy": "startTime",
-    }
-    if search_query:
-        kwargs["q"] = search_query
+    time_min = datetime(int(start_date[:4]), int(start_date[5:7]), int(start_date[8:10]), 0, 0, 0, tzinfo=tz)
+    time_max = datetime(int(end_date[:4]), int(end_date[5:7]), int(end_date[8:10]), 23, 59, 59, tzinfo=tz)
 
     try:
-        result = await _run_sync(service.events().list(**kwargs).execute)
+        events = await calendar_store.list_events(time_min, time_max, search_query)
     except Exception as e:
         logger.error("Google Calendar list_events failed: %s", e)
         return f"Error querying calendar: {e}"
 
-    events = result.get("items", [])
     if not events:
         return "No events found for that period."
 
-    lines = [f"Found {len(events)} event{'s' if len(events) != 1 else ''}:"]
-    for event in events:
-        summary = event.get("summary", "No title")
+    rows = []
+    for event in events[:max_results]:
         start = event.get("start", {})
         end = event.get("end", {})
-        start_str = start.get("dateTime", start.get("date", ""))
-        end_str = end.get("dateTime", end.get("date", ""))
-        location = event.get("location", "")
-        event_id = event.get("id", "")
-
-        line = f"- {summary}: {start_str} to {end_str}"
-        if location:
-            line += f" at {location}"
-        line += f" (id: {event_id})"
-        lines.append(line)
-
-    return "\n".join(lines)
+        rows.append([
+            event.get("summary", "No title"),
+            _compact_time(start.get("dateTime", start.get("date", ""))),
+            _compact_time(end.get("dateTime", end.get("date", ""))),
+            event.get("location"),
+            event.get("id"),
+        ])
+
+    return format_records(
+        "events", ["name", "start", "end", "location", "id"], rows, "list_events",
+        total=len(events), more_hint="ask for a shorter range or a larger max_results",
+    )
 
 
 @tool(approval_mode="never_require")
@@ -100,12 +80,8 @@ async def get_event(
     event_id: Annotated[str, "The Google Calendar event ID"],
 ) -> str:
     """Fetch details for a single calendar event by its ID."""
-    service = get_calendar_service()
-
     try:
-        event = await _run_sync(
-            service.events().get(calendarId="primary", eventId=event_id).execute
-        )
+        event = await google_calendar.get_event(event_id)
     except Exception as e:
         logger.error("Google Calendar get_event failed: %s", e)
         return f"Event with id {event_id} not found."
@@ -120,16 +96,16 @@ async def get_event(
     status = event.get("status", "")
 
     lines = [
-        f"Event: {summary}",
-        f"Start: {start_str}",
-        f"End: {end_str}",
+        f"event: {summary}",
+        f"start: {_compact_time(start_str)}",
+        f"end: {_compact_time(end_str)}",
     ]
-    if description:
-        lines.append(f"Description: {description}")
     if location:
-        lines.append(f"Location: {location}")
-    lines.append(f"Status: {status}")
-    lines.append(f"ID: {event.get('id', '')}")
+        lines.append(f"location: {location}")
+    lines.append(f"status: {status}")
+    lines.append(f"id: {event.get('id', '')}")
+    if description:
+        lines.append(f"description: {truncate(description, 'get_event', reserved=60)}")
 
     return "\n".join(lines)
 
@@ -145,8 +121,6 @@ async def create_event(
     timezone: Annotated[str, "Timezone for the event"] = DEFAULT_TIMEZONE,
 ) -> str:
     """Create a new Google Calendar event."""
-    service = get_calendar_service()
-
     if end_time is None:
         start_dt = datetime.fromisoformat(start_time)
         end_dt = start_dt + timedelta(hours=1)
@@ -166,12 +140,11 @@ async def create_event(
         body["colorId"] = COLOR_MAP[color.lower()]
 
     try:
-        event = await _run_sync(
-            service.events().insert(calendarId="primary", body=body).execute
-        )
+        event = await google_calendar.insert_event(body)
     except Exception as e:
         logger.error("Google Calendar create_event failed: %s", e)
         return f"Error creating event: {e}"
+    await calendar_store.record_event(event)
 
     return (
         f"Event created: {name} from {start_time} to {end_time}"
@@ -191,12 +164,8 @@ async def update_event(
     timezone: Annotated[str, "Timezone for the event"] = DEFAULT_TIMEZONE,
 ) -> str:
     """Update an existing Google Calendar event. Only provided fields will be changed."""
-    service = get_calendar_service()
-
     try:
-        event = await _run_sync(
-            service.events().get(calendarId="primary", eventId=event_id).execute
-        )
+        event = await google_calendar.get_event(event_id)
     except Exception as e:
         logger.error("Google Calendar update_event fetch failed: %s", e)
         return f"Event with id {event_id} not found."
@@ -225,12 +194,11 @@ async def update_event(
         return "No fields to update were provided."
 
     try:
-        await _run_sync(
-            service.events().update(calendarId="primary", eventId=event_id, body=event).execute
-        )
+        updated = await google_calendar.update_event(event_id, event)
     except Exception as e:
         logger.error("Google Calendar update_event failed: %s", e)
         return f"Error updating event: {e}"
+    await calendar_store.record_event(updated)
 
     return f"Event {event_id} updated: {', '.join(updates)}."
 
@@ -240,77 +208,66 @@ async def delete_event(
     event_id: Annotated[str, "The Google Calendar event ID to delete"],
 ) -> str:
     """Delete a Google Calendar event."""
-    service = get_calendar_service()
-
     try:
-        await _run_sync(
-            service.events().delete(calendarId="primary", eventId=event_id).execute
-        )
+        await google_calendar.delete_event(event_id)
     except Exception as e:
         logger.error("Google Calendar delete_event failed: %s", e)
         return f"Event with id {event_id} not found."
+    await calendar_store.record_deleted(event_id)
 
     return f"Event {event_id} has been deleted."
 
 
 @tool(approval_mode="never_require")
 async def find_free_time(
-    date: Annotated[str, "Date to check in YYYY-MM-DD format"],
-    work_hours_start: Annotated[str, "Start of day to consider, HH:MM format"] = "08:00",
-    work_hours_end: Annotated[str, "End of day to consider, HH:MM format"] = "20:00",
+    start_date: Annotated[str, "First date to check in YYYY-MM-DD format"],
+    end_date: Annotated[str | None, "Last date to check in YYYY-MM-DD format, defaults to start_date"] = None,
+    work_hours_start: Annotated[str, "Start of each day to consider, HH:MM format"] = "08:00",
+    work_hours_end: Annotated[str, "End of each day to consider, HH:MM format"] = "20:00",
+    days: Annotated[str, "Days to consider: 'all', 'weekdays' or 'weekends'"] = "all",
+    min_duration_minutes: Annotated[int, "Ignore free slots shorter than this"] = 15,
+    meeting_minutes: Annotated[int | None, "Length of a meeting to fit: returns the first times it fits instead of every free slot"] = None,
+    max_slots: Annotated[int, "Maximum number of slots or meeting times to return"] = 10,
+    calendar_ids: Annotated[list[str] | None, "Calendars whose events count as busy, defaults to the primary calendar"] = None,
 ) -> str:
-    """Find free time slots for a given date by checking busy periods."""
-    service = get_calendar_service()
-
+    """Find free time over one or more days (one call covers a whole week), or the first times a meeting fits."""
     tz = ZoneInfo(DEFAULT_TIMEZONE)
-    dt_min = datetime.fromisoformat(f"{date}T{work_hours_start}:00").replace(tzinfo=tz)
-    dt_max = datetime.fromisoformat(f"{date}T{work_hours_end}:00").replace(tzinfo=tz)
-
-    body = {
-        "timeMin": dt_min.isoformat(),
-        "timeMax": dt_max.isoformat(),
-        "timeZone": DEFAULT_TIMEZONE,
-        "items": [{"id": "primary"}],
-    }
+    try:
+        first_day = date.fromisoformat(start_date)
+        last_day = date.fromisoformat(end_date) if end_date else first_day
+        day_start, day_end = time.fromisoformat(work_hours_start), time.fromisoformat(work_hours_end)
+        if last_day < first_day or (last_day - first_day).days >= free_busy.MAX_RANGE_DAYS:
+            return f"The range must go forward and span at most {free_busy.MAX_RANGE_DAYS} days."
+        windows = free_busy.working_windows(first_day, last_day, tz, day_start, day_end, days)
+    except ValueError as e:
+        return f"Invalid free time request: {e}"
+    if not windows:
+        return f"No {days} between {first_day} and {last_day}."
 
     try:
-        result = await _run_sync(
-            service.freebusy().query(body=body).execute
-        )
+        busy, errors = await free_busy.query_busy(windows[0][0], windows[-1][1], calendar_ids or ["primary"])
     except Exception as e:
         logger.error("Google Calendar find_free_time failed: %s", e)
         return f"Error checking free time: {e}"
 
-    busy_slots = result.get("calendars", {}).get("primary", {}).get("busy", [])
-
-    if not busy_slots:
-        return f"You are completely free on {date} between {work_hours_start} and {work_hours_end}."
-
-    lines = [f"Busy times on {date}:"]
-    for slot in busy_slots:
-        start = slot.get("start", "")
-        end = slot.get("end", "")
-        start_time = start[11:16] if len(start) > 16 else start
-        end_time = end[11:16] if len(end) > 16 else end
-        lines.append(f"- Busy from {start_time} to {end_time}")
-
-    # Calculate free slots
-    free_lines = ["\nFree times:"]
-    day_start = datetime.fromisoformat(f"{date}T{work_hours_start}:00")
-    day_end = datetime.fromisoformat(f"{date}T{work_hours_end}:00")
-
-    current = day_start
-    for slot in busy_slots:
-        busy_start_str = slot.get("start", "")
-        busy_end_str = slot.get("end", "")
-        busy_start = datetime.fromisoformat(busy_start_str.replace("Z", "+00:00").replace("+00:00", "").replace("+01:00", "").replace("+02:00", "")[:19])
-        busy_end = datetime.fromisoformat(busy_end_str.replace("Z", "+00:00").replace("+00:00", "").replace("+01:00", "").replace("+02:00", "")[:19])
-
-        if current < busy_start:
-            free_lines.append(f"- Free from {current.strftime('%H:%M')} to {busy_start.strftime('%H:%M')}")
-        current = max(current, busy_end)
-
-    if current < day_end:
-        free_lines.append(f"- Free from {current.strftime('%H:%M')} to {day_end.strftime('%H:%M')}")
-
-    return "\n".join(lines + free_lines)
+    free = free_busy.free_slots(windows, busy, timedelta(minutes=min_duration_minutes))
+    if meeting_minutes:
+        slots = free_busy.meeting_slots(free, timedelta(minutes=meeting_minutes), max_slots)
+        kind, total = f"times for a {meeting_minutes} min meeting", len(slots)
+    else:
+        slots, kind, total = free[:max_slots], "free slots", len(free)
+
+    rows = [
+        [start.astimezone(tz).strftime("%a %Y-%m-%d"), start.astimezone(tz).strftime("%H:%M"),
+         end.astimezone(tz).strftime("%H:%M"), int((end - start).total_seconds() // 60)]
+        for start, end in slots
+    ]
+    preamble = f"checked {first_day} to {last_day}, {work_hours_start}-{work_hours_end}, {days} days"
+    if errors:
+        preamble += "\ncould not read: " + ", ".join(f"{cal} ({reason})" for cal, reason in errors.items())
+    if not rows:
+        return preamble + "\nno free time" + (f" for a {meeting_minutes} min meeting" if meeting_minutes else "")
+    return format_records(
+        kind, ["date", "start", "end", "minutes"], rows, "find_free_time",
+        total=total, more_hint="raise max_slots or narrow the range", preamble=preamble,
+    )
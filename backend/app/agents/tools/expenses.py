@@ -6,9 +6,23 @@ from typing import Annotated
 from agent_framework import tool
 
 from app.database.cosmos import get_expenses_container
+from app.database.documents import DocumentNotFound, PreconditionFailed
+from app.services.expense_queries import find_expenses
+from app.services import expense_summary
+from app.services import expense_writes
+from app.agents.tools.formatting import amount as fmt_amount, format_records
 
 USER_ID = "fede"
 
+EXPENSE_FIELDS = ["date", "amount", "description", "category", "id"]
+
+
+def expense_row(item: dict) -> list:
+    return [
+        item.get("date"), fmt_amount(item.get("amount"), item.get("currency")),
+        item.get("description"), item.get("category"), item.get("id"),
+    ]
+
 
 @tool(approval_mode="never_require")
 async def query_expenses(
@@ -21,43 +35,22 @@ async def query_expenses(
     """Query and list expenses with optional filters for date range, category, and payment method."""
     container = await get_expenses_container()
 
-    conditions = ["c.userId = @userId"]
-    params = [{"name": "@userId", "value": USER_ID}]
-
-    if start_date:
-        conditions.append("c.date >= @startDate")
-        params.append({"name": "@startDate", "value": start_date})
-    if end_date:
-        conditions.append("c.date <= @endDate")
-        params.append({"name": "@endDate", "value": end_date})
-    if category:
-        conditions.append("LOWER(c.category) = LOWER(@category)")
-        params.append({"name": "@category", "value": category})
-    if payment_method:
-        conditions.append("LOWER(c.paymentMethod) = LOWER(@paymentMethod)")
-        params.append({"name": "@paymentMethod", "value": payment_method})
-
-    query = f"SELECT * FROM c WHERE {' AND '.join(conditions)} ORDER BY c.date DESC OFFSET 0 LIMIT @limit"
-    params.append({"name": "@limit", "value": max_results})
-
-    items = []
-    async for item in container.query_items(query=query, parameters=params):
-        items.append(item)
+    # Served from the resident cache, so counting every match costs nothing extra
+    items = await find_expenses(
+        container,
+        category=category,
+        start_date=start_date,
+        end_date=end_date,
+        payment_method=payment_method,
+    )
 
     if not items:
         return "No expenses found matching the filters."
 
-    lines = [f"Found {len(items)} expense{'s' if len(items) != 1 else ''}:"]
-    for item in items:
-        amount = item.get("amount", 0)
-        currency = item.get("currency", "EUR")
-        desc = item.get("description", "No description")
-        cat = item.get("category", "uncategorized")
-        date = item.get("date", "unknown date")
-        expense_id = item.get("id", "")
-        lines.append(f"- {date}: {amount} {currency} for {desc} (category: {cat}, id: {expense_id})")
-
-    return "\n".join(lines)
+    return format_records(
+        "expenses", EXPENSE_FIELDS, [expense_row(item) for item in items[:max_results]], "query_expenses",
+        total=len(items), more_hint="narrow the dates or filters, or use get_expense_summary for totals",
+    )
 
 
 @tool(approval_mode="never_require")
@@ -69,43 +62,26 @@ async def get_expense_summary(
     """Get a summary of expenses with totals grouped by category or month."""
     container = await get_expenses_container()
 
-    conditions = ["c.userId = @userId"]
-    params = [{"name": "@userId", "value": USER_ID}]
+    summary = await expense_summary.get_expense_summary(container, start_date=start_date, end_date=end_date)
 
-    if start_date:
-        conditions.append("c.date >= @startDate")
-        params.append({"name": "@startDate", "value": start_date})
-    if end_date:
-        conditions.append("c.date <= @endDate")
-        params.append({"name": "@endDate", "value": end_date})
-
-    query = f"SELECT c.amount, c.currency, c.category, c.date FROM c WHERE {' AND '.join(conditions)}"
-
-    items = []
-    async for item in container.query_items(query=query, parameters=params):
-        items.append(item)
-
-    if not items:
+    if not summary["count"]:
         return "No expenses found for the given period."
 
-    total = sum(item.get("amount", 0) for item in items)
-    currency = items[0].get("currency", "EUR")
+    groups = summary["byMonth"] if group_by == "month" else summary["byCategory"]
+    totals = summary["totals"] or {"EUR": summary["total"]}
+    # Group totals add up every currency: label them only when there is just one
+    currency = next(iter(totals)) if len(totals) == 1 else None
+    overall = " + ".join(fmt_amount(total, cur) for cur, total in totals.items())
 
-    groups: dict[str, float] = {}
-    for item in items:
-        if group_by == "month":
-            date_str = item.get("date", "")
-            key = date_str[:7] if len(date_str) >= 7 else "unknown"
-        else:
-            key = item.get("category", "uncategorized")
-        groups[key] = groups.get(key, 0) + item.get("amount", 0)
-
-    lines = [f"Total: {total:.2f} {currency} across {len(items)} expenses."]
-    lines.append(f"Breakdown by {group_by}:")
-    for key in sorted(groups, key=lambda k: groups[k], reverse=True):
-        lines.append(f"- {key}: {groups[key]:.2f} {currency}")
-
-    return "\n".join(lines)
+    return format_records(
+        group_by, ["total" if currency else "total (mixed currencies)"],
+        [
+            [key, fmt_amount(groups[key], currency) if currency else float(groups[key])]
+            for key in sorted(groups, key=lambda k: groups[k], reverse=True)
+        ],
+        "get_expense_summary",
+        preamble=f"total {overall} across {summary['count']} expenses",
+    )
 
 
 @tool(approval_mode="never_require")
@@ -138,7 +114,7 @@ async def add_expense(
         "createdAt": datetime.now(timezone.utc).isoformat(),
     }
 
-    await container.create_item(body=expense)
+    await expense_writes.create_expense(container, expense)
 
     return f"Expense added: {amount} {currency} for {description} on {date_str} (category: {category}, id: {expense_id})."
 
@@ -156,35 +132,36 @@ async def update_expense(
     """Update an existing expense. Only provided fields will be changed."""
     container = await get_expenses_container()
 
-    try:
-        item = await container.read_item(item=expense_id, partition_key=USER_ID)
-    except Exception:
-        return f"Expense with id {expense_id} not found."
-
+    fields = {}
     updates = []
     if amount is not None:
-        item["amount"] = amount
+        fields["amount"] = amount
         updates.append(f"amount to {amount}")
     if description is not None:
-        item["description"] = description
+        fields["description"] = description
         updates.append(f"description to {description}")
     if category is not None:
-        item["category"] = category.lower()
+        fields["category"] = category.lower()
         updates.append(f"category to {category}")
     if date_str is not None:
-        item["date"] = date_str
+        fields["date"] = date_str
         updates.append(f"date to {date_str}")
     if payment_method is not None:
-        item["paymentMethod"] = payment_method.lower()
+        fields["paymentMethod"] = payment_method.lower()
         updates.append(f"payment method to {payment_method}")
     if currency is not None:
-        item["currency"] = currency
+        fields["currency"] = currency
         updates.append(f"currency to {currency}")
 
     if not updates:
         return "No fields to update were provided."
 
-    await container.replace_item(item=expense_id, body=item)
+    try:
+        await expense_writes.update_expense_fields(container, expense_id, fields)
+    except DocumentNotFound:
+        return f"Expense with id {expense_id} not found."
+    except PreconditionFailed:
+        return f"Expense {expense_id} is being changed by another request, please try again."
 
     return f"Expense {expense_id} updated: {', '.join(updates)}."
 
@@ -197,8 +174,8 @@ async def delete_expense(
     container = await get_expenses_container()
 
     try:
-        await container.delete_item(item=expense_id, partition_key=USER_ID)
-    except Exception:
+        await expense_writes.delete_expense(container, expense_id)
+    except DocumentNotFound:
         return f"Expense with id {expense_id} not found."
 
     return f"Expense {expense_id} has been deleted."
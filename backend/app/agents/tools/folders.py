@@ -6,6 +6,16 @@ from typing import Annotated
 from agent_framework import tool
 
 from app.database.cosmos import get_expenses_container
+from app.services.data_cache import bump_data_version
+from app.services.folder_stats import (
+    empty_stats,
+    public_stats,
+    reconcile_folder_stats,
+)
+from app.services.folder_assignment import set_expenses_folder
+from app.services.expense_queries import find_expenses
+from app.agents.tools.expenses import EXPENSE_FIELDS, expense_row
+from app.agents.tools.formatting import amount as fmt_amount, format_records
 
 USER_ID = "fede"
 
@@ -28,9 +38,11 @@ async def create_folder(
         "description": description or "",
         "imageUrl": None,
         "createdAt": datetime.now(timezone.utc).isoformat(),
+        **empty_stats(),
     }
 
     await container.create_item(body=folder)
+    bump_data_version("folders")
 
     desc_part = f" ({description})" if description else ""
     return f"Folder '{name}'{desc_part} created successfully (id: {folder_id})."
@@ -55,38 +67,20 @@ async def list_folders() -> str:
     if not folders:
         return "You don't have any folders yet. You can create one to group related expenses together."
 
-    # Fetch all expenses that have a folderId
-    expense_query = (
-        "SELECT c.folderId, c.amount, c.currency FROM c "
-        "WHERE c.userId = @userId "
-        "AND (c.type = 'expense' OR NOT IS_DEFINED(c.type)) "
-        "AND IS_DEFINED(c.folderId)"
-    )
-    expense_params = [{"name": "@userId", "value": USER_ID}]
-
-    # Build a map: folderId -> {count, total}
-    folder_stats: dict[str, dict] = {}
-    async for exp in container.query_items(query=expense_query, parameters=expense_params):
-        fid = exp.get("folderId")
-        if fid:
-            if fid not in folder_stats:
-                folder_stats[fid] = {"count": 0, "total": 0.0}
-            folder_stats[fid]["count"] += 1
-            folder_stats[fid]["total"] += exp.get("amount", 0)
-
-    lines = [f"You have {len(folders)} folder{'s' if len(folders) != 1 else ''}:"]
+    # Folders created before stats were materialized: backfill them once
+    if any("totals" not in folder for folder in folders):
+        await reconcile_folder_stats(container)
+        folders = []
+        async for item in container.query_items(query=folder_query, parameters=folder_params):
+            folders.append(item)
+
+    rows = []
     for folder in folders:
-        fid = folder["id"]
-        stats = folder_stats.get(fid, {"count": 0, "total": 0.0})
-        desc = folder.get("description")
-        desc_part = f" - {desc}" if desc else ""
-        lines.append(
-            f"- {folder['name']}{desc_part}: "
-            f"{stats['count']} expense{'s' if stats['count'] != 1 else ''}, "
-            f"{stats['total']:.2f} EUR total (id: {fid})"
-        )
+        stats = public_stats(folder)
+        totals = ", ".join(fmt_amount(total, cur) for cur, total in stats["totals"].items()) or fmt_amount(0, "EUR")
+        rows.append([folder["name"], folder.get("description"), stats["expenseCount"], totals, folder["id"]])
 
-    return "\n".join(lines)
+    return format_records("folders", ["name", "description", "expenses", "total", "id"], rows, "list_folders")
 
 
 @tool(approval_mode="never_require")
@@ -105,16 +99,13 @@ async def add_expense_to_folder(
     except Exception:
         return f"Folder with id {folder_id} not found."
 
-    # Read the expense
-    try:
-        expense = await container.read_item(item=expense_id, partition_key=USER_ID)
-    except Exception:
+    result = (await set_expenses_folder(container, [expense_id], folder_id))[0]
+    if result["status"] == "not_found":
         return f"Expense with id {expense_id} not found."
+    if result["status"] == "failed":
+        return f"Could not add expense {expense_id} to folder: {result['error']}"
 
-    # Assign to folder
-    expense["folderId"] = folder_id
-    await container.replace_item(item=expense_id, body=expense)
-
+    expense = result["expense"]
     return (
         f"Expense '{expense.get('description', expense_id)}' "
         f"has been added to folder '{folder['name']}'."
@@ -139,31 +130,9 @@ async def query_folder_expenses(
     except Exception:
         return f"Folder with id {folder_id} not found."
 
-    conditions = [
-        "c.userId = @userId",
-        "(c.type = 'expense' OR NOT IS_DEFINED(c.type))",
-        "c.folderId = @folderId",
-    ]
-    params = [
-        {"name": "@userId", "value": USER_ID},
-        {"name": "@folderId", "value": folder_id},
-    ]
-
-    if category:
-        conditions.append("LOWER(c.category) = LOWER(@category)")
-        params.append({"name": "@category", "value": category})
-    if start_date:
-        conditions.append("c.date >= @startDate")
-        params.append({"name": "@startDate", "value": start_date})
-    if end_date:
-        conditions.append("c.date <= @endDate")
-        params.append({"name": "@endDate", "value": end_date})
-
-    query = f"SELECT * FROM c WHERE {' AND '.join(conditions)} ORDER BY c.date DESC"
-
-    items = []
-    async for item in container.query_items(query=query, parameters=params):
-        items.append(item)
+    items = await find_expenses(
+        container, folder_id=folder_id, category=category, start_date=start_date, end_date=end_date,
+    )
 
     folder_name = folder.get("name", folder_id)
 
@@ -173,16 +142,8 @@ async def query_folder_expenses(
     total = sum(item.get("amount", 0) for item in items)
     currency = items[0].get("currency", "EUR")
 
-    lines = [
-        f"Folder '{folder_name}' has {len(items)} expense{'s' if len(items) != 1 else ''} "
-        f"totaling {total:.2f} {currency}:"
-    ]
-    for item in items:
-        amount = item.get("amount", 0)
-        cur = item.get("currency", "EUR")
-        desc = item.get("description", "No description")
-        cat = item.get("category", "uncategorized")
-        date = item.get("date", "unknown date")
-        lines.append(f"- {date}: {amount} {cur} for {desc} (category: {cat}, id: {item.get('id', '')})")
-
-    return "\n".join(lines)
+    return format_records(
+        "expenses", EXPENSE_FIELDS, [expense_row(item) for item in items], "query_folder_expenses",
+        more_hint="narrow the dates or category",
+        preamble=f"folder '{folder_name}': {len(items)} expenses, total {fmt_amount(total, currency)}",
+    )
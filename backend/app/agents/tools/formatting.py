@@ -0,0 +1,91 @@
+"""Compact tool results.
+
+Everything a tool returns stays in the agent's context for the rest of the
+turn (and is re-read on every later LLM call), so listing tools return
+delimiter-based records instead of prose: one header naming the fields
+once, then one line per record, in a stable field order:
+
+    expenses 3 of 12 | date | amount | description | category | id
+    2026-03-02 | 12.5 EUR | Lunch | food | exp_1740912345_1234
+    ...
+    9 more not shown: narrow the filters to see them
+
+Each tool has a token budget (TOOL_TOKEN_BUDGET, overridable per tool with
+TOOL_TOKEN_BUDGETS); records that don't fit are dropped and counted in the
+"more" line, long text is cut with a marker saying how much was left out.
+"""
+
+from email.utils import parsedate_to_datetime
+
+from app import config
+from app.utils.tokens import estimate_tokens
+
+SEPARATOR = " | "
+# Longest single field (descriptions, subjects, locations) before it is cut
+MAX_FIELD_CHARS = 80
+
+
+def tool_budget(tool_name: str) -> int:
+    return config.TOOL_TOKEN_BUDGETS.get(tool_name, config.TOOL_TOKEN_BUDGET)
+
+
+def _field(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        value = f"{value:.2f}".rstrip("0").rstrip(".")
+    # The separator and line breaks belong to the format, not the data
+    text = " ".join(str(value).replace("|", "/").split())
+    if len(text) > MAX_FIELD_CHARS:
+        text = text[:MAX_FIELD_CHARS - 1] + "…"
+    return text
+
+
+def amount(value, currency: str | None) -> str:
+    return f"{_field(float(value or 0))} {currency or 'EUR'}"
+
+
+def email_date(value: str) -> str:
+    """'Mon, 2 Mar 2026 09:30:00 +0100' -> '2026-03-02 09:30' (left as is if it doesn't parse)."""
+    try:
+        return parsedate_to_datetime(value).strftime("%Y-%m-%d %H:%M")
+    except (TypeError, ValueError):
+        return value
+
+
+def format_records(kind: str, fields: list[str], rows: list[list], tool_name: str,
+                   total: int | None = None, more_hint: str = "", preamble: str = "", more: bool = False) -> str:
+    """One header line plus one line per row, cut to the tool's token budget.
+
+    total is the number of matches when rows is only the first page of them;
+    more says there are matches past rows without a count for them.
+    more_hint tells the model how to get the rest.
+    """
+    budget = tool_budget(tool_name)
+    total = len(rows) if total is None else total
+    lines = [SEPARATOR.join(_field(value) for value in row) for row in rows]
+
+    used = estimate_tokens(preamble) + estimate_tokens(SEPARATOR.join([kind] + fields)) + 8
+    shown = []
+    for line in lines:
+        cost = estimate_tokens(line)
+        if used + cost > budget and shown:
+            break
+        shown.append(line)
+        used += cost
+
+    header = SEPARATOR.join([f"{kind} {len(shown)} of {total}{'+' if more else ''}"] + fields)
+    out = ([preamble] if preamble else []) + [header] + shown
+    hidden = total - len(shown)
+    if hidden > 0 or more:
+        count = "" if more else f"{hidden} "
+        out.append(f"{count}more not shown" + (f": {more_hint}" if more_hint else ""))
+    return "\n".join(out)
+
+
+def truncate(text: str, tool_name: str, reserved: int = 0) -> str:
+    """Cut text to the tool's budget (minus reserved tokens used by the rest of the output)."""
+    max_chars = max(0, (tool_budget(tool_name) - reserved) * 4)
+    if len(text) <= max_chars:
+        return text
+    return f"{text[:max_chars]}… [{len(text) - max_chars} more characters not shown]"
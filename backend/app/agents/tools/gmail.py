@@ -1,17 +1,24 @@
-import asyncio
 import logging
 from typing import Annotated
 
 from agent_framework import tool
 
-from app.services.gmail import get_gmail_service, _parse_message, _build_raw_message
+from app.services.gmail import (
+    fetch_messages,
+    get_message,
+    list_messages,
+    send_message,
+    _parse_message,
+    _parse_metadata,
+    _build_raw_message,
+)
+from app.services.gmail_mirror import get_inbox
+from app.agents.tools.formatting import email_date, format_records, truncate
+from app.utils.tokens import estimate_tokens
 
 logger = logging.getLogger(__name__)
 
-
-def _run_sync(func, *args, **kwargs):
-    """Run a synchronous Google API call in a thread."""
-    return asyncio.to_thread(func, *args, **kwargs)
+EMAIL_FIELDS = ["from", "subject", "date", "id"]
 
 
 @tool(approval_mode="never_require")
@@ -21,15 +28,7 @@ async def search_emails(
 ) -> str:
     """Search emails using Gmail query syntax."""
     try:
-        service = get_gmail_service()
-    except Exception as e:
-        logger.error("Failed to get Gmail service: %s", e)
-        return f"Error connecting to Gmail: {e}"
-
-    try:
-        result = await _run_sync(
-            service.users().messages().list(userId="me", q=query, maxResults=max_results).execute
-        )
+        result = await list_messages(q=query, max_results=max_results)
     except Exception as e:
         logger.error("Gmail search_emails failed: %s", e)
         return f"Error searching emails: {e}"
@@ -38,20 +37,19 @@ async def search_emails(
     if not messages:
         return "No emails found matching that search."
 
-    lines = [f"Found {len(messages)} email{'s' if len(messages) != 1 else ''}:"]
-    for msg_ref in messages:
-        try:
-            msg = await _run_sync(
-                service.users().messages().get(userId="me", id=msg_ref["id"], format="full").execute
-            )
-            parsed = _parse_message(msg)
-            line = f"- From: {parsed['from']}, Subject: {parsed['subject']}, Date: {parsed['date']} (id: {parsed['id']})"
-            lines.append(line)
-        except Exception as e:
-            logger.error("Gmail fetch message %s failed: %s", msg_ref["id"], e)
-            lines.append(f"- Could not fetch email {msg_ref['id']}")
+    rows = []
+    for fetched in await fetch_messages([m["id"] for m in messages]):
+        if fetched["error"] is not None:
+            rows.append(["", "(could not fetch)", "", fetched["id"]])
+            continue
+        parsed = _parse_metadata(fetched["message"])
+        rows.append([parsed["from"], parsed["subject"], email_date(parsed["date"]), parsed["id"]])
 
-    return "\n".join(lines)
+    # resultSizeEstimate is rough: only a next page says that more matches exist
+    return format_records(
+        "emails", EMAIL_FIELDS, rows, "search_emails",
+        more="nextPageToken" in result, more_hint="refine the search query",
+    )
 
 
 @tool(approval_mode="never_require")
@@ -60,32 +58,25 @@ async def read_email(
 ) -> str:
     """Read the full content of an email by its ID."""
     try:
-        service = get_gmail_service()
-    except Exception as e:
-        logger.error("Failed to get Gmail service: %s", e)
-        return f"Error connecting to Gmail: {e}"
-
-    try:
-        msg = await _run_sync(
-            service.users().messages().get(userId="me", id=email_id, format="full").execute
-        )
+        msg = await get_message(email_id)
     except Exception as e:
         logger.error("Gmail read_email failed: %s", e)
         return f"Email with id {email_id} not found."
 
     parsed = _parse_message(msg)
 
-    lines = [
-        f"From: {parsed['from']}",
-        f"To: {parsed['to']}",
-        f"Subject: {parsed['subject']}",
-        f"Date: {parsed['date']}",
-        f"Body: {parsed['body'][:3000] if parsed['body'] else parsed['snippet']}",
-        f"ID: {parsed['id']}",
-        f"Thread ID: {parsed['threadId']}",
-    ]
+    header = "\n".join([
+        f"from: {parsed['from']}",
+        f"to: {parsed['to']}",
+        f"subject: {parsed['subject']}",
+        f"date: {email_date(parsed['date'])}",
+        f"id: {parsed['id']}",
+        f"thread: {parsed['threadId']}",
+    ])
+    # Whitespace runs (quoted blocks, signatures, HTML leftovers) cost tokens and say nothing
+    body = " ".join((parsed["body"] or parsed["snippet"]).split())
 
-    return "\n".join(lines)
+    return f"{header}\nbody: {truncate(body, 'read_email', reserved=estimate_tokens(header) + 4)}"
 
 
 @tool(approval_mode="never_require")
@@ -95,18 +86,10 @@ async def send_email(
     body: Annotated[str, "Email body text"],
 ) -> str:
     """Send a new email."""
-    try:
-        service = get_gmail_service()
-    except Exception as e:
-        logger.error("Failed to get Gmail service: %s", e)
-        return f"Error connecting to Gmail: {e}"
-
     raw = _build_raw_message(to, subject, body)
 
     try:
-        sent = await _run_sync(
-            service.users().messages().send(userId="me", body={"raw": raw}).execute
-        )
+        sent = await send_message(raw)
     except Exception as e:
         logger.error("Gmail send_email failed: %s", e)
         return f"Error sending email: {e}"
@@ -120,17 +103,9 @@ async def reply_to_email(
     body: Annotated[str, "Reply body text"],
 ) -> str:
     """Reply to an existing email, preserving the thread."""
-    try:
-        service = get_gmail_service()
-    except Exception as e:
-        logger.error("Failed to get Gmail service: %s", e)
-        return f"Error connecting to Gmail: {e}"
-
     # Fetch the original message to get headers
     try:
-        original = await _run_sync(
-            service.users().messages().get(userId="me", id=email_id, format="full").execute
-        )
+        original = await get_message(email_id)
     except Exception as e:
         logger.error("Gmail reply_to_email fetch failed: %s", e)
         return f"Original email with id {email_id} not found."
@@ -151,12 +126,7 @@ async def reply_to_email(
     raw = _build_raw_message(reply_to, subject, body, in_reply_to=message_id, references=references)
 
     try:
-        sent = await _run_sync(
-            service.users().messages().send(
-                userId="me",
-                body={"raw": raw, "threadId": original.get("threadId", "")},
-            ).execute
-        )
+        sent = await send_message(raw, thread_id=original.get("threadId"))
     except Exception as e:
         logger.error("Gmail reply_to_email send failed: %s", e)
         return f"Error sending reply: {e}"
@@ -170,39 +140,19 @@ async def list_recent_emails(
 ) -> str:
     """List recent emails from the inbox."""
     try:
-        service = get_gmail_service()
-    except Exception as e:
-        logger.error("Failed to get Gmail service: %s", e)
-        return f"Error connecting to Gmail: {e}"
-
-    try:
-        result = await _run_sync(
-            service.users().messages().list(userId="me", q="in:inbox", maxResults=max_results).execute
-        )
+        emails = await get_inbox(max_results)
     except Exception as e:
         logger.error("Gmail list_recent_emails failed: %s", e)
         return f"Error listing emails: {e}"
 
-    messages = result.get("messages", [])
-    if not messages:
+    if not emails:
         return "Your inbox is empty."
 
-    lines = [f"You have {len(messages)} recent email{'s' if len(messages) != 1 else ''} in your inbox:"]
-    for msg_ref in messages:
-        try:
-            msg = await _run_sync(
-                service.users().messages().get(userId="me", id=msg_ref["id"], format="full").execute
-            )
-            parsed = _parse_message(msg)
-            unread = "UNREAD" in msg.get("labelIds", [])
-            status = " [unread]" if unread else ""
-            line = f"- From: {parsed['from']}, Subject: {parsed['subject']}, Date: {parsed['date']}{status} (id: {parsed['id']})"
-            lines.append(line)
-        except Exception as e:
-            logger.error("Gmail fetch message %s failed: %s", msg_ref["id"], e)
-            lines.append(f"- Could not fetch email {msg_ref['id']}")
-
-    return "\n".join(lines)
+    rows = [
+        [parsed["from"], parsed["subject"], email_date(parsed["date"]), parsed["id"], "unread" if "UNREAD" in parsed["labelIds"] else ""]
+        for parsed in emails
+    ]
+    return format_records("emails", EMAIL_FIELDS + ["status"], rows, "list_recent_emails")
 
 
 GMAIL_TOOLS = [
@@ -6,10 +6,8 @@ from app.agents.tools.weather import (
     get_weather_forecast_tool,
 )
 
-WEATHER_SYSTEM_PROMPT = (
-    "You are the Weather Agent, a specialist within the Jarvis assistant. "
-    "Your role is to provide weather information using the tools available to you. "
-    "You can get current conditions and multi-day forecasts for any location.\n\n"
+# Domain rules, shared with the orchestrator when it calls the tools itself (flat mode)
+WEATHER_RULES = (
     "IMPORTANT RULES:\n"
     "1. If the user does not specify a location, use 'Rome' as the default.\n"
     "2. When the user asks for current weather, use get_current_weather_tool.\n"
@@ -21,6 +19,13 @@ WEATHER_SYSTEM_PROMPT = (
     "7. Use Celsius for temperature."
 )
 
+WEATHER_SYSTEM_PROMPT = (
+    "You are the Weather Agent, a specialist within the Jarvis assistant. "
+    "Your role is to provide weather information using the tools available to you. "
+    "You can get current conditions and multi-day forecasts for any location.\n\n"
+    + WEATHER_RULES
+)
+
 WEATHER_TOOLS = [
     get_current_weather_tool,
     get_weather_forecast_tool,
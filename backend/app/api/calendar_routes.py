@@ -1,4 +1,3 @@
-import asyncio
 import logging
 from datetime import datetime, timedelta
 from typing import Optional
@@ -8,7 +7,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel, Field
 
 from app.auth.jwt import get_current_user
-from app.services.google_calendar import get_calendar_service
+from app.services import calendar_store, google_calendar
 
 logger = logging.getLogger(__name__)
 
@@ -17,10 +16,6 @@ router = APIRouter()
 DEFAULT_TIMEZONE = "Europe/Rome"
 
 
-def _run_sync(func):
-    return asyncio.to_thread(func)
-
-
 # --- Request/Response models ---
 
 class EventCreate(BaseModel):
@@ -60,34 +55,20 @@ async def list_events(
     limit: int = Query(default=20, ge=1, le=100),
     user: dict = Depends(get_current_user),
 ):
-    service = get_calendar_service()
-
     if end_date is None:
         end_date = start_date
 
     tz = ZoneInfo(DEFAULT_TIMEZONE)
-    time_min = datetime(int(start_date[:4]), int(start_date[5:7]), int(start_date[8:10]), 0, 0, 0, tzinfo=tz).isoformat()
-    time_max = datetime(int(end_date[:4]), int(end_date[5:7]), int(end_date[8:10]), 23, 59, 59, tzinfo=tz).isoformat()
-
-    kwargs = {
-        "calendarId": "primary",
-        "timeMin": time_min,
-        "timeMax": time_max,
-        "timeZone": DEFAULT_TIMEZONE,
-        "maxResults": limit,
-        "singleEvents": True,
-        "orderBy": "startTime",
-    }
-    if q:
-        kwargs["q"] = q
+    time_min = datetime(int(start_date[:4]), int(start_date[5:7]), int(start_date[8:10]), 0, 0, 0, tzinfo=tz)
+    time_max = datetime(int(end_date[:4]), int(end_date[5:7]), int(end_date[8:10]), 23, 59, 59, tzinfo=tz)
 
     try:
-        result = await _run_sync(service.events().list(**kwargs).execute)
+        events = await calendar_store.list_events(time_min, time_max, q)
     except Exception as e:
         logger.error("Calendar list_events failed: %s", e)
         raise HTTPException(status_code=502, detail=str(e))
 
-    return {"events": result.get("items", [])}
+    return {"events": events[:limit]}
 
 
 @router.get("/calendar/events/{event_id}")
@@ -95,12 +76,8 @@ async def get_event(
     event_id: str,
     user: dict = Depends(get_current_user),
 ):
-    service = get_calendar_service()
-
     try:
-        event = await _run_sync(
-            service.events().get(calendarId="primary", eventId=event_id).execute
-        )
+        event = await google_calendar.get_event(event_id)
     except Exception as e:
         logger.error("Calendar get_event failed: %s", e)
         raise HTTPException(status_code=404, detail="Event not found")
@@ -113,8 +90,6 @@ async def create_event(
     body: EventCreate,
     user: dict = Depends(get_current_user),
 ):
-    service = get_calendar_service()
-
     end_time = body.end
     if end_time is None:
         start_dt = datetime.fromisoformat(body.start)
@@ -134,12 +109,11 @@ async def create_event(
         event_body["colorId"] = COLOR_MAP[body.color.lower()]
 
     try:
-        event = await _run_sync(
-            service.events().insert(calendarId="primary", body=event_body).execute
-        )
+        event = await google_calendar.insert_event(event_body)
     except Exception as e:
         logger.error("Calendar create_event failed: %s", e)
         raise HTTPException(status_code=502, detail=str(e))
+    await calendar_store.record_event(event)
 
     return {"event": event}
 
@@ -150,12 +124,8 @@ async def update_event(
     body: EventUpdate,
     user: dict = Depends(get_current_user),
 ):
-    service = get_calendar_service()
-
     try:
-        event = await _run_sync(
-            service.events().get(calendarId="primary", eventId=event_id).execute
-        )
+        event = await google_calendar.get_event(event_id)
     except Exception:
         raise HTTPException(status_code=404, detail="Event not found")
 
@@ -173,12 +143,11 @@ async def update_event(
         event["colorId"] = COLOR_MAP[body.color.lower()]
 
     try:
-        updated = await _run_sync(
-            service.events().update(calendarId="primary", eventId=event_id, body=event).execute
-        )
+        updated = await google_calendar.update_event(event_id, event)
     except Exception as e:
         logger.error("Calendar update_event failed: %s", e)
         raise HTTPException(status_code=502, detail=str(e))
+    await calendar_store.record_event(updated)
 
     return {"event": updated}
 
@@ -188,11 +157,8 @@ async def delete_event(
     event_id: str,
     user: dict = Depends(get_current_user),
 ):
-    service = get_calendar_service()
-
     try:
-        await _run_sync(
-            service.events().delete(calendarId="primary", eventId=event_id).execute
-        )
+        await google_calendar.delete_event(event_id)
     except Exception:
         raise HTTPException(status_code=404, detail="Event not found")
+    await calendar_store.record_deleted(event_id)
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from pydantic import BaseModel, Field
 from datetime import datetime, timezone
 from typing import Optional
@@ -7,7 +7,10 @@ import random
 
 from app.auth.jwt import get_current_user
 from app.database.cosmos import get_expenses_container
-from app.services.data_cache import get_expenses_cache, set_expenses_cache, clear_expenses_cache
+from app.database.documents import DocumentNotFound, PreconditionFailed
+from app.services.expense_queries import find_expenses_page
+from app.services.expense_summary import get_expense_summary
+from app.services import expense_writes
 
 router = APIRouter()
 
@@ -45,50 +48,50 @@ async def list_expenses(
     end_date: Optional[str] = Query(None, alias="end_date"),
     folder_id: Optional[str] = Query(None, alias="folder_id"),
     limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None),
     user: dict = Depends(get_current_user),
 ):
-    has_filters = any([category, start_date, end_date, folder_id])
-
-    # Return cached data when no filters are applied
-    if not has_filters:
-        cached = get_expenses_cache()
-        if cached is not None:
-            return {"expenses": cached}
-
+    """One page of expenses, newest first. Pass the returned "next" as cursor for the following page."""
     container = await get_expenses_container()
 
-    conditions = [
-        "c.userId = @userId",
-        "(c.type = 'expense' OR NOT IS_DEFINED(c.type))",
-    ]
-    params = [{"name": "@userId", "value": USER_ID}]
-
-    if category:
-        conditions.append("LOWER(c.category) = LOWER(@category)")
-        params.append({"name": "@category", "value": category})
-    if start_date:
-        conditions.append("c.date >= @startDate")
-        params.append({"name": "@startDate", "value": start_date})
-    if end_date:
-        conditions.append("c.date <= @endDate")
-        params.append({"name": "@endDate", "value": end_date})
-    if folder_id:
-        conditions.append("c.folderId = @folderId")
-        params.append({"name": "@folderId", "value": folder_id})
-
-    query = f"SELECT * FROM c WHERE {' AND '.join(conditions)} ORDER BY c.date DESC OFFSET 0 LIMIT @limit"
-    params.append({"name": "@limit", "value": limit})
-
+    # Served from the write-through cache; Cosmos is only read to load it
     try:
-        items = []
-        async for item in container.query_items(query=query, parameters=params):
-            items.append(item)
+        items, next_cursor = await find_expenses_page(
+            container,
+            limit=limit,
+            cursor=cursor,
+            category=category,
+            start_date=start_date,
+            end_date=end_date,
+            folder_id=folder_id,
+        )
+        return {"expenses": items, "next": next_cursor}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        # Cache the unfiltered result
-        if not has_filters:
-            set_expenses_cache(items)
 
-        return {"expenses": items}
+@router.get("/expenses/summary")
+async def expense_summary(
+    category: Optional[str] = Query(None),
+    start_date: Optional[str] = Query(None, alias="start_date"),
+    end_date: Optional[str] = Query(None, alias="end_date"),
+    folder_id: Optional[str] = Query(None, alias="folder_id"),
+    user: dict = Depends(get_current_user),
+):
+    """Totals per category, month, category-month and day, without shipping documents."""
+    container = await get_expenses_container()
+
+    try:
+        summary = await get_expense_summary(
+            container,
+            start_date=start_date,
+            end_date=end_date,
+            category=category,
+            folder_id=folder_id,
+        )
+        return {"summary": summary}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -119,8 +122,7 @@ async def create_expense(
     if body.folderId:
         expense["folderId"] = body.folderId
 
-    await container.create_item(body=expense)
-    clear_expenses_cache()
+    await expense_writes.create_expense(container, expense)
     return {"expense": expense}
 
 
@@ -128,15 +130,11 @@ async def create_expense(
 async def update_expense(
     expense_id: str,
     body: ExpenseUpdate,
+    if_match: Optional[str] = Header(None),
     user: dict = Depends(get_current_user),
 ):
     container = await get_expenses_container()
 
-    try:
-        item = await container.read_item(item=expense_id, partition_key=USER_ID)
-    except Exception:
-        raise HTTPException(status_code=404, detail="Expense not found")
-
     updates = body.model_dump(exclude_none=True)
     if not updates:
         raise HTTPException(status_code=400, detail="No fields to update")
@@ -146,9 +144,14 @@ async def update_expense(
     if "paymentMethod" in updates:
         updates["paymentMethod"] = updates["paymentMethod"].lower()
 
-    item.update(updates)
-    await container.replace_item(item=expense_id, body=item)
-    clear_expenses_cache()
+    # Optional If-Match: reject the edit if the expense changed since the client loaded it
+    try:
+        item = await expense_writes.update_expense_fields(container, expense_id, updates, etag=if_match)
+    except DocumentNotFound:
+        raise HTTPException(status_code=404, detail="Expense not found")
+    except PreconditionFailed:
+        raise HTTPException(status_code=412, detail="Expense was modified by another request")
+
     return {"expense": item}
 
 
@@ -160,8 +163,6 @@ async def delete_expense(
     container = await get_expenses_container()
 
     try:
-        await container.delete_item(item=expense_id, partition_key=USER_ID)
-    except Exception:
+        await expense_writes.delete_expense(container, expense_id)
+    except DocumentNotFound:
         raise HTTPException(status_code=404, detail="Expense not found")
-
-    clear_expenses_cache()
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, UploadFile, File, Form
 from pydantic import BaseModel
 from datetime import datetime, timezone
 from typing import Optional, List
@@ -8,7 +8,24 @@ import random
 from app.auth.jwt import get_current_user
 from app.database.cosmos import get_expenses_container
 from app.database.blob import upload_image, delete_image
-from app.services.data_cache import clear_expenses_cache
+from app.database.documents import (
+    DocumentNotFound,
+    PreconditionFailed,
+    patch_document,
+    set_operations,
+)
+from app.services.data_cache import bump_data_version
+from app.services.folder_stats import (
+    empty_stats,
+    public_stats,
+    reconcile_folder_stats,
+)
+from app.services.expense_queries import find_expenses_page
+from app.services.folder_assignment import (
+    remove_from_folder,
+    set_expenses_folder,
+    unassign_folder,
+)
 
 router = APIRouter()
 
@@ -32,6 +49,11 @@ def _extract_blob_filename(image_url: str) -> Optional[str]:
     return parts[-1] if parts else None
 
 
+def _image_blob_name(folder_id: str, image: UploadFile) -> str:
+    ext = image.filename.rsplit(".", 1)[-1] if "." in image.filename else "jpg"
+    return f"{folder_id}.{ext}"
+
+
 # --- Endpoints ---
 
 @router.get("/folders")
@@ -49,33 +71,28 @@ async def list_folders(
         async for item in container.query_items(query=folder_query, parameters=folder_params):
             folders.append(item)
 
-        # Get expense counts and totals per folder (client-side aggregation)
-        if folders:
-            stats_query = (
-                "SELECT c.folderId, c.amount FROM c "
-                "WHERE c.userId = @userId AND IS_DEFINED(c.folderId) AND c.folderId != null "
-                "AND (c.type = 'expense' OR NOT IS_DEFINED(c.type))"
-            )
-            stats_params = [{"name": "@userId", "value": USER_ID}]
-
-            stats_map = {}
-            async for item in container.query_items(query=stats_query, parameters=stats_params):
-                fid = item["folderId"]
-                if fid not in stats_map:
-                    stats_map[fid] = {"expenseCount": 0, "total": 0}
-                stats_map[fid]["expenseCount"] += 1
-                stats_map[fid]["total"] += item.get("amount", 0)
-
-            for folder in folders:
-                stats = stats_map.get(folder["id"], {"expenseCount": 0, "total": 0})
-                folder["expenseCount"] = stats["expenseCount"]
-                folder["total"] = stats["total"]
-
-        return {"folders": folders}
+        # Folders created before stats were materialized: backfill them once
+        if any("totals" not in folder for folder in folders):
+            await reconcile_folder_stats(container)
+            folders = []
+            async for item in container.query_items(query=folder_query, parameters=folder_params):
+                folders.append(item)
+
+        return {"folders": [public_stats(folder) for folder in folders]}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/folders/reconcile")
+async def reconcile_folders(
+    user: dict = Depends(get_current_user),
+):
+    """Recompute every folder's stats from its expenses (repairs drift)."""
+    container = await get_expenses_container()
+    repaired = await reconcile_folder_stats(container)
+    return {"repairedCount": repaired}
+
+
 @router.get("/folders/{folder_id}")
 async def get_folder(
     folder_id: str,
@@ -107,11 +124,7 @@ async def create_folder(
 
     image_url = ""
     if image and image.filename:
-        file_bytes = await image.read()
-        ext = image.filename.rsplit(".", 1)[-1] if "." in image.filename else "jpg"
-        blob_filename = f"{folder_id}.{ext}"
-        content_type = image.content_type or "image/jpeg"
-        image_url = upload_image(file_bytes, blob_filename, content_type)
+        image_url = await upload_image(image, _image_blob_name(folder_id, image), image.content_type or "image/jpeg")
 
     folder = {
         "id": folder_id,
@@ -121,9 +134,11 @@ async def create_folder(
         "description": description,
         "imageUrl": image_url,
         "createdAt": datetime.now(timezone.utc).isoformat(),
+        **empty_stats(),
     }
 
     await container.create_item(body=folder)
+    bump_data_version("folders")
     return {"folder": folder}
 
 
@@ -133,37 +148,55 @@ async def update_folder(
     name: Optional[str] = Form(None),
     description: Optional[str] = Form(None),
     image: Optional[UploadFile] = File(None),
+    if_match: Optional[str] = Header(None),
     user: dict = Depends(get_current_user),
 ):
     container = await get_expenses_container()
 
-    try:
-        item = await container.read_item(item=folder_id, partition_key=USER_ID)
-        if item.get("type") != "folder":
-            raise HTTPException(status_code=404, detail="Folder not found")
-    except HTTPException:
-        raise
-    except Exception:
-        raise HTTPException(status_code=404, detail="Folder not found")
-
+    fields = {}
     if name is not None:
-        item["name"] = name
+        fields["name"] = name
     if description is not None:
-        item["description"] = description
+        fields["description"] = description
 
+    # Only an image swap needs the current document (to find the old blob)
+    old_filename = None
     if image and image.filename:
-        # Delete old image if exists
+        try:
+            item = await container.read_item(item=folder_id, partition_key=USER_ID)
+            if item.get("type") != "folder":
+                raise HTTPException(status_code=404, detail="Folder not found")
+        except HTTPException:
+            raise
+        except Exception:
+            raise HTTPException(status_code=404, detail="Folder not found")
+        if if_match and item.get("_etag") != if_match:
+            raise HTTPException(status_code=412, detail="Folder was modified by another request")
+        if_match = if_match or item.get("_etag")
         old_filename = _extract_blob_filename(item.get("imageUrl", ""))
-        if old_filename:
-            delete_image(old_filename)
 
-        file_bytes = await image.read()
-        ext = image.filename.rsplit(".", 1)[-1] if "." in image.filename else "jpg"
-        blob_filename = f"{folder_id}.{ext}"
-        content_type = image.content_type or "image/jpeg"
-        item["imageUrl"] = upload_image(file_bytes, blob_filename, content_type)
+        blob_filename = _image_blob_name(folder_id, image)
+        fields["imageUrl"] = await upload_image(image, blob_filename, image.content_type or "image/jpeg")
+        if old_filename == blob_filename:
+            old_filename = None  # overwritten in place
+
+    if not fields:
+        return await get_folder(folder_id, user)
 
-    await container.replace_item(item=folder_id, body=item)
+    try:
+        item = await patch_document(
+            container, folder_id, set_operations(fields), doc_type="folder", etag=if_match,
+        )
+    except DocumentNotFound:
+        raise HTTPException(status_code=404, detail="Folder not found")
+    except PreconditionFailed:
+        if not if_match:
+            raise HTTPException(status_code=404, detail="Folder not found")
+        raise HTTPException(status_code=412, detail="Folder was modified by another request")
+
+    bump_data_version("folders")
+    if old_filename:
+        await delete_image(old_filename)
     return {"folder": item}
 
 
@@ -183,27 +216,46 @@ async def delete_folder(
     except Exception:
         raise HTTPException(status_code=404, detail="Folder not found")
 
+    # Unassign all expenses from this folder (batched patches)
+    results = await unassign_folder(container, folder_id)
+    failed = [r["id"] for r in results if r["status"] == "failed"]
+    if failed:
+        # The unassigned expenses left without a stats update (the folder was to be deleted)
+        await reconcile_folder_stats(container, folder_id)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Could not unassign {len(failed)} expense(s) from folder; folder kept",
+        )
+
     # Delete blob image if exists
     old_filename = _extract_blob_filename(item.get("imageUrl", ""))
     if old_filename:
-        delete_image(old_filename)
-
-    # Unassign all expenses from this folder
-    unassign_query = (
-        "SELECT * FROM c WHERE c.userId = @userId AND c.folderId = @folderId "
-        "AND (c.type = 'expense' OR NOT IS_DEFINED(c.type))"
-    )
-    unassign_params = [
-        {"name": "@userId", "value": USER_ID},
-        {"name": "@folderId", "value": folder_id},
-    ]
-    async for expense in container.query_items(query=unassign_query, parameters=unassign_params):
-        expense.pop("folderId", None)
-        await container.replace_item(item=expense["id"], body=expense)
+        await delete_image(old_filename)
 
     # Delete the folder document
     await container.delete_item(item=folder_id, partition_key=USER_ID)
-    clear_expenses_cache()
+    bump_data_version("folders")
+
+
+@router.get("/folders/{folder_id}/expenses")
+async def list_folder_expenses(
+    folder_id: str,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None),
+    user: dict = Depends(get_current_user),
+):
+    """One page of the folder's expenses, newest first, with a "next" cursor."""
+    container = await get_expenses_container()
+
+    try:
+        items, next_cursor = await find_expenses_page(
+            container, limit=limit, cursor=cursor, folder_id=folder_id,
+        )
+        return {"expenses": items, "next": next_cursor}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("/folders/{folder_id}/expenses")
@@ -224,18 +276,15 @@ async def assign_expenses_to_folder(
     except Exception:
         raise HTTPException(status_code=404, detail="Folder not found")
 
-    updated = []
-    for expense_id in body.expenseIds:
-        try:
-            expense = await container.read_item(item=expense_id, partition_key=USER_ID)
-            expense["folderId"] = folder_id
-            await container.replace_item(item=expense_id, body=expense)
-            updated.append(expense_id)
-        except Exception:
-            pass  # Skip expenses that don't exist
+    results = await set_expenses_folder(container, body.expenseIds, folder_id)
 
-    clear_expenses_cache()
-    return {"assignedCount": len(updated), "expenseIds": updated}
+    # Expenses already in the folder count as assigned; missing ones are skipped
+    assigned = [r["id"] for r in results if r["status"] in ("updated", "unchanged")]
+    return {
+        "assignedCount": len(assigned),
+        "expenseIds": assigned,
+        "results": [{k: r[k] for k in ("id", "status", "error")} for r in results],
+    }
 
 
 @router.delete("/folders/{folder_id}/expenses/{expense_id}")
@@ -247,14 +296,10 @@ async def remove_expense_from_folder(
     container = await get_expenses_container()
 
     try:
-        expense = await container.read_item(item=expense_id, partition_key=USER_ID)
-    except Exception:
+        item = await remove_from_folder(container, expense_id, folder_id)
+    except DocumentNotFound:
         raise HTTPException(status_code=404, detail="Expense not found")
-
-    if expense.get("folderId") != folder_id:
+    except PreconditionFailed:
         raise HTTPException(status_code=400, detail="Expense is not in this folder")
 
-    expense.pop("folderId", None)
-    await container.replace_item(item=expense_id, body=expense)
-    clear_expenses_cache()
-    return {"expense": expense}
+    return {"expense": item}
@@ -1,4 +1,3 @@
-import asyncio
 import logging
 from typing import Optional
 
@@ -6,19 +5,23 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel, Field
 
 from app.auth.jwt import get_current_user
-from app.services.gmail import get_gmail_service, _parse_message, _build_raw_message
+from app.services.gmail import (
+    fetch_messages,
+    get_message,
+    list_messages,
+    send_message,
+    _parse_message,
+    _parse_metadata,
+    _build_raw_message,
+)
 from app.services.email_classifier import classify_emails
-from app.services.data_cache import get_emails_cache, set_emails_cache
+from app.services.gmail_mirror import get_inbox, MIRROR_LABEL
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
-def _run_sync(func):
-    return asyncio.to_thread(func)
-
-
 # --- Request models ---
 
 class EmailSend(BaseModel):
@@ -31,6 +34,24 @@ class EmailReply(BaseModel):
     body: str = Field(min_length=1)
 
 
+async def _list_live(q: Optional[str], max_results: int, label: str) -> list[dict]:
+    """List and hydrate messages straight from Gmail (searches, non-inbox labels)."""
+    try:
+        result = await list_messages(q=q or "", max_results=max_results, label_ids=[label])
+    except Exception as e:
+        logger.error("Gmail list_emails failed: %s", e)
+        raise HTTPException(status_code=502, detail=str(e))
+
+    messages = result.get("messages", [])
+
+    # Fetch metadata for the whole page in batched requests (page order kept)
+    fetched = await fetch_messages([m["id"] for m in messages])
+    failed = [r["id"] for r in fetched if r["error"] is not None]
+    if failed:
+        logger.warning("list_emails: %d of %d emails could not be fetched", len(failed), len(fetched))
+    return [_parse_metadata(r["message"]) for r in fetched if r["message"] is not None]
+
+
 # --- Endpoints ---
 
 @router.get("/emails")
@@ -41,55 +62,15 @@ async def list_emails(
     refresh: Optional[bool] = Query(default=False),
     user: dict = Depends(get_current_user),
 ):
-    # Return cached emails when not searching and not forcing refresh
-    if not q and not refresh:
-        cached = get_emails_cache()
-        if cached is not None:
-            logger.info("list_emails: returning %d cached emails", len(cached))
-            return {"emails": cached}
-
-    service = get_gmail_service()
-
-    try:
-        result = await _run_sync(
-            service.users().messages().list(
-                userId="me",
-                q=q or "",
-                maxResults=max_results,
-                labelIds=[label],
-            ).execute
-        )
-    except Exception as e:
-        logger.error("Gmail list_emails failed: %s", e)
-        raise HTTPException(status_code=502, detail=str(e))
-
-    messages = result.get("messages", [])
-
-    # Fetch metadata for each message
-    emails = []
-    for msg_ref in messages:
+    if not q and label == MIRROR_LABEL:
+        # Inbox view is served from the local mirror (one history call per sync)
         try:
-            msg = await _run_sync(
-                service.users().messages().get(
-                    userId="me",
-                    id=msg_ref["id"],
-                    format="metadata",
-                    metadataHeaders=["From", "To", "Subject", "Date"],
-                ).execute
-            )
-            headers = {h["name"].lower(): h["value"] for h in msg.get("payload", {}).get("headers", [])}
-            emails.append({
-                "id": msg.get("id"),
-                "threadId": msg.get("threadId"),
-                "snippet": msg.get("snippet", ""),
-                "labelIds": msg.get("labelIds", []),
-                "from": headers.get("from", ""),
-                "to": headers.get("to", ""),
-                "subject": headers.get("subject", ""),
-                "date": headers.get("date", ""),
-            })
+            emails = await get_inbox(max_results, refresh=bool(refresh))
         except Exception as e:
-            logger.warning("Failed to fetch email %s: %s", msg_ref["id"], e)
+            logger.error("Gmail mirror sync failed: %s", e)
+            raise HTTPException(status_code=502, detail=str(e))
+    else:
+        emails = await _list_live(q, max_results, label)
 
     # Classify emails when not searching
     logger.info("list_emails: q=%r, will classify=%s, email_count=%d", q, not q, len(emails))
@@ -101,9 +82,6 @@ async def list_emails(
         except Exception as e:
             logger.warning("Email classification failed, returning unclassified: %s", e, exc_info=True)
 
-        # Cache the classified results
-        set_emails_cache(emails)
-
     return {"emails": emails}
 
 
@@ -112,16 +90,8 @@ async def get_email(
     email_id: str,
     user: dict = Depends(get_current_user),
 ):
-    service = get_gmail_service()
-
     try:
-        msg = await _run_sync(
-            service.users().messages().get(
-                userId="me",
-                id=email_id,
-                format="full",
-            ).execute
-        )
+        msg = await get_message(email_id)
     except Exception as e:
         logger.error("Gmail get_email failed: %s", e)
         raise HTTPException(status_code=404, detail="Email not found")
@@ -134,17 +104,10 @@ async def send_email(
     body: EmailSend,
     user: dict = Depends(get_current_user),
 ):
-    service = get_gmail_service()
-
     raw = _build_raw_message(to=body.to, subject=body.subject, body=body.body)
 
     try:
-        sent = await _run_sync(
-            service.users().messages().send(
-                userId="me",
-                body={"raw": raw},
-            ).execute
-        )
+        sent = await send_message(raw)
     except Exception as e:
         logger.error("Gmail send_email failed: %s", e)
         raise HTTPException(status_code=502, detail=str(e))
@@ -158,17 +121,10 @@ async def reply_to_email(
     body: EmailReply,
     user: dict = Depends(get_current_user),
 ):
-    service = get_gmail_service()
-
     # Fetch original email to get headers for threading
     try:
-        original = await _run_sync(
-            service.users().messages().get(
-                userId="me",
-                id=email_id,
-                format="metadata",
-                metadataHeaders=["From", "Subject", "Message-ID", "References"],
-            ).execute
+        original = await get_message(
+            email_id, fmt="metadata", metadata_headers=["From", "Subject", "Message-ID", "References"],
         )
     except Exception as e:
         logger.error("Gmail reply fetch original failed: %s", e)
@@ -195,12 +151,7 @@ async def reply_to_email(
     )
 
     try:
-        sent = await _run_sync(
-            service.users().messages().send(
-                userId="me",
-                body={"raw": raw, "threadId": original.get("threadId")},
-            ).execute
-        )
+        sent = await send_message(raw, thread_id=original.get("threadId"))
     except Exception as e:
         logger.error("Gmail reply_to_email failed: %s", e)
         raise HTTPException(status_code=502, detail=str(e))
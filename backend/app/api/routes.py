@@ -1,11 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from datetime import timedelta
-import httpx
+import json
 
 from app import config
 from app.auth.password import verify_password
 from app.auth.jwt import create_access_token, get_current_user
+from app.services.http_client import get_http_client
+from app.services import conversations
+from app.database.cosmos import get_expenses_container
+from app.database.documents import DocumentNotFound
 
 router = APIRouter()
 
@@ -25,11 +30,14 @@ class LoginResponse(BaseModel):
 
 class MessageRequest(BaseModel):
     message: str
+    conversationId: str | None = None  # omitted: start a new conversation
 
 
 class MessageResponse(BaseModel):
     text: str
     agent: str | None = None
+    conversationId: str | None = None
+    cached: bool = False  # answer reused from an identical earlier question
 
 
 class SpeechTokenResponse(BaseModel):
@@ -37,6 +45,28 @@ class SpeechTokenResponse(BaseModel):
     region: str
 
 
+# ============================================
+# HELPERS
+# ============================================
+
+async def _resolve_conversation(conversation_id: str | None) -> dict:
+    """Load the conversation, or start a new one when no ID is given."""
+    container = await get_expenses_container()
+    if not conversation_id:
+        return await conversations.create_conversation(container)
+    try:
+        return await conversations.get_conversation(container, conversation_id)
+    except DocumentNotFound:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conversation not found")
+
+
+def _public_conversation(conversation: dict) -> dict:
+    return {
+        key: conversation.get(key)
+        for key in ("id", "title", "summary", "summarizedTurns", "turnCount", "turns", "createdAt", "updatedAt")
+    }
+
+
 # ============================================
 # PUBLIC ROUTES (no auth required)
 # ============================================
@@ -106,26 +136,26 @@ async def get_speech_token(
     # Request token from Azure
     token_url = f"https://{config.AZURE_SPEECH_REGION}.api.cognitive.microsoft.com/sts/v1.0/issueToken"
 
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            token_url,
-            headers={
-                "Ocp-Apim-Subscription-Key": config.AZURE_SPEECH_KEY,
-                "Content-Type": "application/x-www-form-urlencoded"
-            }
-        )
-
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=status.HTTP_502_BAD_GATEWAY,
-                detail="Failed to get speech token from Azure"
-            )
+    client = get_http_client("azure_speech")
+    response = await client.post(
+        token_url,
+        headers={
+            "Ocp-Apim-Subscription-Key": config.AZURE_SPEECH_KEY,
+            "Content-Type": "application/x-www-form-urlencoded"
+        }
+    )
 
-        return SpeechTokenResponse(
-            token=response.text,
-            region=config.AZURE_SPEECH_REGION
+    if response.status_code != 200:
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail="Failed to get speech token from Azure"
         )
 
+    return SpeechTokenResponse(
+        token=response.text,
+        region=config.AZURE_SPEECH_REGION
+    )
+
 
 @router.post("/chat", response_model=MessageResponse)
 async def chat(
@@ -138,8 +168,13 @@ async def chat(
     """
     try:
         from app.agents.orchestrator import send_message
-        response_text = await send_message(request.message)
-        return MessageResponse(text=response_text, agent="jarvis")
+        # A cached answer doesn't wait for the conversation to be read or created
+        reply = await send_message(request.message, request.conversationId)
+        return MessageResponse(
+            text=reply.text, agent="jarvis", conversationId=reply.conversation_id, cached=reply.cached,
+        )
+    except DocumentNotFound:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conversation not found")
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -149,16 +184,91 @@ async def chat(
         )
 
 
+@router.post("/chat/stream")
+async def chat_stream(
+    request: MessageRequest,
+    user: dict = Depends(get_current_user)
+):
+    """
+    Streaming chat endpoint (Server-Sent Events).
+    Emits agent/progress events while specialists work, and one
+    'sentence' event per complete sentence so TTS can start early.
+    The 'done' event carries the conversationId to send with the next turn.
+    Protected: requires valid JWT token.
+    """
+    from app.agents.orchestrator import stream_message
+
+    try:
+        conversation_id, events = await stream_message(request.message, request.conversationId)
+    except DocumentNotFound:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conversation not found")
+
+    async def event_source():
+        async for event in events:
+            name = event.pop("event")
+            if name == "done":
+                event["conversationId"] = conversation_id
+            yield f"event: {name}\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/conversations")
 async def get_conversations(
     user: dict = Depends(get_current_user)  # ← MIDDLEWARE: verify token first
 ):
     """
-    Get conversation history.
+    List conversations, most recently active first.
     Protected: requires valid JWT token.
     """
-    # TODO: Implement Cosmos DB
-    return {"conversations": []}
+    container = await get_expenses_container()
+    return {"conversations": await conversations.list_conversations(container)}
+
+
+@router.post("/conversations")
+async def create_conversation(
+    user: dict = Depends(get_current_user)
+):
+    """
+    Start a new, empty conversation.
+    Protected: requires valid JWT token.
+    """
+    container = await get_expenses_container()
+    conversation = await conversations.create_conversation(container)
+    return {"conversation": _public_conversation(conversation)}
+
+
+@router.get("/conversations/{conversation_id}")
+async def get_conversation(
+    conversation_id: str,
+    user: dict = Depends(get_current_user)
+):
+    """
+    Get a conversation: the summary of its older turns plus the recent turns.
+    Protected: requires valid JWT token.
+    """
+    return {"conversation": _public_conversation(await _resolve_conversation(conversation_id))}
+
+
+@router.delete("/conversations/{conversation_id}")
+async def delete_conversation(
+    conversation_id: str,
+    user: dict = Depends(get_current_user)
+):
+    """
+    Delete a conversation.
+    Protected: requires valid JWT token.
+    """
+    container = await get_expenses_container()
+    try:
+        await conversations.delete_conversation(container, conversation_id)
+    except DocumentNotFound:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conversation not found")
+    return {"deleted": conversation_id}
 
 
 @router.get("/agents/status")
@@ -166,11 +276,16 @@ async def get_agent_status(
     user: dict = Depends(get_current_user)  # ← MIDDLEWARE: verify token first
 ):
     """
-    Get status of all agents.
+    Get status of all agents, plus intent router and response cache hit rates.
     Protected: requires valid JWT token.
     """
+    from app.agents.response_cache import cache as response_cache
+    from app.agents.router import stats as router_stats
+
     return {
         "orchestrator": "ready",
+        "router": router_stats.snapshot(),
+        "responseCache": response_cache.snapshot(),
         "agents": [
             {"name": "calendar", "status": "available"},
             {"name": "gmail", "status": "available"},
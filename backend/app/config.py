@@ -1,3 +1,4 @@
+import json
 import os
 from dotenv import load_dotenv
 from pathlib import Path
@@ -26,14 +27,51 @@ AZURE_OPENAI_API_VERSION = os.getenv("AZURE_OPENAI_API_VERSION", "2024-12-01-pre
 COSMOS_ENDPOINT = os.getenv("COSMOS_ENDPOINT", "")
 COSMOS_KEY = os.getenv("COSMOS_KEY", "")
 COSMOS_DATABASE = os.getenv("COSMOS_DATABASE", "jarvis")
+# "azure" (real account) or "memory" (local in-process stand-in, data not persisted)
+COSMOS_BACKEND = os.getenv("COSMOS_BACKEND", "azure")
 
 # Google Calendar
 GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID", "")
 GOOGLE_CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET", "")
 GOOGLE_REFRESH_TOKEN = os.getenv("GOOGLE_REFRESH_TOKEN", "")
+# Days before and after today kept in the local event store; reads outside go to Google
+CALENDAR_STORE_PAST_DAYS = int(os.getenv("CALENDAR_STORE_PAST_DAYS", "180"))
+CALENDAR_STORE_FUTURE_DAYS = int(os.getenv("CALENDAR_STORE_FUTURE_DAYS", "365"))
 
 # Azure Blob Storage
 AZURE_STORAGE_CONNECTION_STRING = os.getenv("AZURE_STORAGE_CONNECTION_STRING", "")
 
 # Weather
 OPENWEATHERMAP_API_KEY = os.getenv("OPENWEATHER_API_KEY", "")
+
+# Data cache: "sqlite" (shared by all gunicorn workers) or "memory" (single process)
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "sqlite")
+CACHE_DIR = os.getenv("CACHE_DIR", "/tmp/jarvis_cache")
+
+# Startup warm-up of the lazily created clients; /ready answers 503 until it finishes or times out
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+WARMUP_TIMEOUT = float(os.getenv("WARMUP_TIMEOUT", "30"))
+
+# Orchestrator: "nested" (specialist agents as tools) or "flat" (specialists' tools directly)
+ORCHESTRATOR_MODE = os.getenv("ORCHESTRATOR_MODE", "nested")
+
+# Intent router: send unambiguous chat messages straight to a specialist agent
+ROUTER_ENABLED = os.getenv("ROUTER_ENABLED", "true").lower() == "true"
+# Classifier confidence needed when the keyword rules agree / when no keyword matched
+ROUTER_MIN_CONFIDENCE = float(os.getenv("ROUTER_MIN_CONFIDENCE", "0.6"))
+ROUTER_CLASSIFIER_ONLY_CONFIDENCE = float(os.getenv("ROUTER_CLASSIFIER_ONLY_CONFIDENCE", "0.9"))
+
+# Answers to read-only questions, reused while the data behind them is unchanged (entries per worker)
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "256"))
+# Calendar answers also expire after this many seconds: changes made elsewhere show up only at the next sync
+RESPONSE_CACHE_CALENDAR_TTL = int(os.getenv("RESPONSE_CACHE_CALENDAR_TTL", "120"))
+# Expense answers expire after this many seconds even while the data is unchanged
+RESPONSE_CACHE_EXPENSES_TTL = int(os.getenv("RESPONSE_CACHE_EXPENSES_TTL", "3600"))
+
+# Chat history replayed to the model per conversation (estimated tokens); older turns get summarized
+CONVERSATION_TOKEN_BUDGET = int(os.getenv("CONVERSATION_TOKEN_BUDGET", "3000"))
+
+# Token budget for one tool result, and per-tool overrides as JSON (e.g. '{"read_email": 1200}')
+TOOL_TOKEN_BUDGET = int(os.getenv("TOOL_TOKEN_BUDGET", "500"))
+TOOL_TOKEN_BUDGETS = json.loads(os.getenv("TOOL_TOKEN_BUDGETS", "{}"))
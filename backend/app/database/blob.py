@@ -1,11 +1,27 @@
+"""Folder images in Azure Blob Storage, through the async client.
+
+Uploads are streamed from the request's upload file in BLOCK_SIZE chunks.
+An image up to one block goes up in a single request. Larger ones are
+staged as blocks, UPLOAD_CONCURRENCY at a time, and then committed. So
+neither the worker's memory nor its event loop is tied up by an upload, and
+other requests keep their latency while images are uploading. The client
+and its connection pool are created on first use and closed on shutdown.
+"""
+
 import logging
 
-from azure.storage.blob import BlobServiceClient, ContentSettings
+from azure.core.exceptions import ResourceNotFoundError
+from azure.storage.blob import ContentSettings
+from azure.storage.blob.aio import BlobServiceClient
+from fastapi import UploadFile
+
 from app import config
 
 logger = logging.getLogger(__name__)
 
 CONTAINER_NAME = "folder-images"
+BLOCK_SIZE = 4 * 1024 * 1024  # bytes read from the upload and sent per block
+UPLOAD_CONCURRENCY = 4  # blocks of one upload in flight at once
 
 _blob_service_client = None
 
@@ -23,34 +39,59 @@ def _get_blob_service_client():
         )
 
     _blob_service_client = BlobServiceClient.from_connection_string(
-        config.AZURE_STORAGE_CONNECTION_STRING
+        config.AZURE_STORAGE_CONNECTION_STRING,
+        max_single_put_size=BLOCK_SIZE,
+        max_block_size=BLOCK_SIZE,
     )
     logger.info("Azure Blob Storage connected (container=%s)", CONTAINER_NAME)
     return _blob_service_client
 
 
-def upload_image(file_bytes: bytes, filename: str, content_type: str = "image/jpeg") -> str:
-    """Upload image bytes to Blob Storage and return the public URL."""
+async def close_blob_client():
+    global _blob_service_client
+
+    if _blob_service_client is not None:
+        await _blob_service_client.close()
+        _blob_service_client = None
+
+
+async def warm_up():
+    """Create the client and open a connection to the images container."""
+    await _get_blob_service_client().get_container_client(CONTAINER_NAME).get_container_properties()
+
+
+async def _chunks(upload: UploadFile):
+    while chunk := await upload.read(BLOCK_SIZE):
+        yield chunk
+
+
+async def upload_image(upload: UploadFile, filename: str, content_type: str = "image/jpeg") -> str:
+    """Stream an uploaded image to Blob Storage and return the public URL."""
     client = _get_blob_service_client()
     container_client = client.get_container_client(CONTAINER_NAME)
     blob_client = container_client.get_blob_client(filename)
 
-    blob_client.upload_blob(
-        file_bytes,
+    await upload.seek(0)
+    await blob_client.upload_blob(
+        _chunks(upload),
+        length=upload.size,  # known for multipart uploads: small images go up in one request
         overwrite=True,
+        max_concurrency=UPLOAD_CONCURRENCY,
         content_settings=ContentSettings(content_type=content_type),
     )
 
-    logger.info("Uploaded image: %s", filename)
+    logger.info("Uploaded image: %s (%s bytes)", filename, upload.size)
     return blob_client.url
 
 
-def delete_image(filename: str):
+async def delete_image(filename: str):
     """Delete an image from Blob Storage. Silently ignores missing blobs."""
     try:
         client = _get_blob_service_client()
         container_client = client.get_container_client(CONTAINER_NAME)
-        container_client.delete_blob(filename)
+        await container_client.delete_blob(filename)
         logger.info("Deleted image: %s", filename)
+    except ResourceNotFoundError:
+        pass
     except Exception as e:
         logger.warning("Failed to delete image %s: %s", filename, e)
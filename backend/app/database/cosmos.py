@@ -16,6 +16,13 @@ async def get_expenses_container():
     if _expenses_container is not None:
         return _expenses_container
 
+    if config.COSMOS_BACKEND == "memory":
+        from app.database.memory_container import MemoryContainer
+
+        _expenses_container = MemoryContainer(partition_key_path="/userId")
+        logger.info("Cosmos DB stand-in: in-memory expenses container")
+        return _expenses_container
+
     if not config.COSMOS_ENDPOINT or not config.COSMOS_KEY:
         raise RuntimeError(
             "Cosmos DB not configured. Set COSMOS_ENDPOINT and COSMOS_KEY in .env"
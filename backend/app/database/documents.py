@@ -0,0 +1,57 @@
+from azure.core import MatchConditions
+from azure.cosmos.exceptions import CosmosHttpResponseError, CosmosResourceNotFoundError
+
+USER_ID = "fede"
+
+# Server-side type checks, so a patch never needs a read just to verify the document kind
+TYPE_PREDICATES = {
+    "expense": "(c.type = 'expense' OR NOT IS_DEFINED(c.type))",
+    "folder": "c.type = 'folder'",
+}
+
+
+class DocumentNotFound(Exception):
+    """No document with this ID exists in the partition."""
+
+
+class PreconditionFailed(Exception):
+    """The document exists but its ETag or the filter predicate didn't match."""
+
+
+def sql_string(value: str) -> str:
+    """Quote a value as a Cosmos SQL string literal (filter predicates take no parameters)."""
+    return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+def set_operations(fields: dict) -> list[dict]:
+    return [{"op": "set", "path": f"/{field}", "value": value} for field, value in fields.items()]
+
+
+async def patch_document(container, item_id: str, operations: list[dict],
+                         doc_type: str | None = None, condition: str | None = None,
+                         etag: str | None = None) -> dict:
+    """Apply patch operations in one round trip and return the updated document.
+
+    doc_type ("expense" / "folder") and condition (a SQL boolean over "c") are
+    checked server-side; etag makes the patch conditional on the document not
+    having changed since it was read.
+    Raises DocumentNotFound, or PreconditionFailed when a check doesn't match.
+    """
+    clauses = [clause for clause in (TYPE_PREDICATES.get(doc_type), condition) if clause]
+    kwargs = {}
+    if clauses:
+        kwargs["filter_predicate"] = "FROM c WHERE " + " AND ".join(clauses)
+    if etag:
+        kwargs["etag"] = etag
+        kwargs["match_condition"] = MatchConditions.IfNotModified
+
+    try:
+        return await container.patch_item(
+            item=item_id, partition_key=USER_ID, patch_operations=operations, **kwargs,
+        )
+    except CosmosResourceNotFoundError:
+        raise DocumentNotFound(item_id)
+    except CosmosHttpResponseError as e:
+        if e.status_code == 412:
+            raise PreconditionFailed(item_id)
+        raise
@@ -0,0 +1,608 @@
+import asyncio
+import json
+import re
+import time
+import uuid
+from collections import Counter
+from functools import lru_cache
+
+from azure.core import MatchConditions
+from azure.cosmos.exceptions import (
+    CosmosAccessConditionFailedError,
+    CosmosBatchOperationError,
+    CosmosHttpResponseError,
+    CosmosResourceExistsError,
+    CosmosResourceNotFoundError,
+)
+
+# In-memory stand-in for an azure.cosmos.aio ContainerProxy, for local runs and
+# benchmarks (COSMOS_BACKEND=memory). It implements the calls this app makes and
+# the SQL subset its queries use:
+#   SELECT * | SELECT c.a, c.b FROM c WHERE ... [ORDER BY c.x [ASC|DESC], ...]
+#   [OFFSET n LIMIT m], with AND/OR/NOT, = != <> < <= > >=, @parameters,
+#   IS_DEFINED, IS_NULL, ARRAY_CONTAINS, LOWER, UPPER, STARTSWITH, CONTAINS.
+# Every call counts as one round trip (queries: one per page) in .stats.
+
+QUERY_PAGE_SIZE = 1000  # items per simulated query page (continuation round trip)
+MAX_BATCH_OPERATIONS = 100
+
+
+class _Undefined:
+    def __repr__(self):
+        return "undefined"
+
+
+UNDEFINED = _Undefined()
+
+
+# --- SQL subset: tokenizer + compiler to Python closures ---
+
+_TOKEN = re.compile(
+    r"\s*(?:"
+    r"(?P<string>'(?:[^'\\]|\\.)*')"
+    r"|(?P<number>-?\d+(?:\.\d+)?)"
+    r"|(?P<param>@\w+)"
+    r"|(?P<op><>|!=|<=|>=|=|<|>|\(|\)|,|\.|\*|\[|\])"
+    r"|(?P<name>[A-Za-z_]\w*)"
+    r")"
+)
+
+
+def _tokenize(sql: str) -> list[tuple[str, object]]:
+    tokens = []
+    pos = 0
+    sql = sql.strip()
+    while pos < len(sql):
+        match = _TOKEN.match(sql, pos)
+        if not match or match.end() == pos:
+            raise _bad_request(f"Unsupported query syntax near: {sql[pos:pos + 20]!r}")
+        pos = match.end()
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == "string":
+            tokens.append(("value", re.sub(r"\\(.)", r"\1", text[1:-1])))
+        elif kind == "number":
+            tokens.append(("value", float(text) if "." in text else int(text)))
+        elif kind == "name" and text.upper() in _KEYWORDS:
+            tokens.append(("kw", text.upper()))
+        else:
+            tokens.append((kind, text))
+    return tokens
+
+
+_KEYWORDS = {
+    "SELECT", "FROM", "WHERE", "AND", "OR", "NOT", "ORDER", "BY", "ASC", "DESC",
+    "OFFSET", "LIMIT", "NULL", "TRUE", "FALSE", "AS",
+}
+
+
+def _same_kind(a, b) -> bool:
+    def kind(v):
+        if v is None:
+            return "null"
+        if isinstance(v, bool):
+            return "bool"
+        if isinstance(v, (int, float)):
+            return "number"
+        return type(v).__name__
+    return kind(a) == kind(b)
+
+
+def _compare(op: str, a, b):
+    if a is UNDEFINED or b is UNDEFINED:
+        return UNDEFINED
+    if op in ("=", "!=", "<>"):
+        equal = _same_kind(a, b) and a == b
+        return equal if op == "=" else not equal
+    if not _same_kind(a, b) or a is None or isinstance(a, (dict, list)):
+        return UNDEFINED
+    return {"<": a < b, "<=": a <= b, ">": a > b, ">=": a >= b}[op]
+
+
+def _and(a, b):
+    if a is False or b is False:
+        return False
+    if a is True and b is True:
+        return True
+    return UNDEFINED
+
+
+def _or(a, b):
+    if a is True or b is True:
+        return True
+    if a is False and b is False:
+        return False
+    return UNDEFINED
+
+
+def _not(a):
+    return (not a) if isinstance(a, bool) else UNDEFINED
+
+
+def _lower(v):
+    return v.lower() if isinstance(v, str) else UNDEFINED
+
+
+def _upper(v):
+    return v.upper() if isinstance(v, str) else UNDEFINED
+
+
+def _startswith(v, prefix):
+    return v.startswith(prefix) if isinstance(v, str) and isinstance(prefix, str) else UNDEFINED
+
+
+def _contains(v, part):
+    return part in v if isinstance(v, str) and isinstance(part, str) else UNDEFINED
+
+
+_FUNCTIONS = {
+    "IS_DEFINED": lambda v: v is not UNDEFINED,
+    "IS_NULL": lambda v: v is None,
+    "ARRAY_CONTAINS": lambda arr, v: v in arr if isinstance(arr, list) else UNDEFINED,
+    "LOWER": _lower,
+    "UPPER": _upper,
+    "STARTSWITH": _startswith,
+    "CONTAINS": _contains,
+}
+
+
+class _Parser:
+    def __init__(self, sql: str):
+        self.tokens = _tokenize(sql)
+        self.pos = 0
+        # The projection precedes "FROM c", so find the alias up front
+        self.alias = next(
+            (self.tokens[i + 1][1] for i, token in enumerate(self.tokens[:-1]) if token == ("kw", "FROM")),
+            None,
+        )
+
+    def peek(self, offset: int = 0):
+        index = self.pos + offset
+        return self.tokens[index] if index < len(self.tokens) else (None, None)
+
+    def take(self):
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    def accept(self, kind: str, value=None) -> bool:
+        token = self.peek()
+        if token[0] == kind and (value is None or token[1] == value):
+            self.pos += 1
+            return True
+        return False
+
+    def expect(self, kind: str, value=None):
+        if not self.accept(kind, value):
+            raise _bad_request(f"Expected {value or kind}, got {self.peek()[1]!r}")
+
+    # SELECT ... FROM c [WHERE] [ORDER BY] [OFFSET LIMIT]
+    def parse_query(self):
+        self.expect("kw", "SELECT")
+        projection = None
+        if not self.accept("op", "*"):
+            projection = [self.parse_projection_field()]
+            while self.accept("op", ","):
+                projection.append(self.parse_projection_field())
+        self.expect("kw", "FROM")
+        self.take()
+        where = self.parse_where_clause()
+        order = []
+        if self.accept("kw", "ORDER"):
+            self.expect("kw", "BY")
+            while True:
+                path = self.parse_path()
+                descending = self.accept("kw", "DESC")
+                if not descending:
+                    self.accept("kw", "ASC")
+                order.append((path, descending))
+                if not self.accept("op", ","):
+                    break
+        offset = limit = None
+        if self.accept("kw", "OFFSET"):
+            offset = self.parse_operand()
+            self.expect("kw", "LIMIT")
+            limit = self.parse_operand()
+        if self.peek()[0] is not None:
+            raise _bad_request(f"Unsupported query syntax near: {self.peek()[1]!r}")
+        return projection, where, order, offset, limit
+
+    # "FROM c WHERE <expr>", the form of patch filter predicates
+    def parse_predicate(self):
+        self.expect("kw", "FROM")
+        self.take()
+        where = self.parse_where_clause()
+        if self.peek()[0] is not None:
+            raise _bad_request(f"Unsupported predicate syntax near: {self.peek()[1]!r}")
+        return where
+
+    def parse_where_clause(self):
+        if self.accept("kw", "WHERE"):
+            return self.parse_or()
+        return lambda doc, params: True
+
+    def parse_projection_field(self):
+        path = self.parse_path()
+        name = path.names[-1] if path.names else self.alias
+        if self.accept("kw", "AS"):
+            name = self.take()[1]
+        return name, path
+
+    def parse_path(self):
+        kind, name = self.take()
+        if kind != "name" or name != self.alias:
+            raise _bad_request(f"Expected a property of '{self.alias}', got {name!r}")
+        names = []
+        while True:
+            if self.accept("op", "."):
+                names.append(self.take()[1])
+            elif self.accept("op", "["):
+                names.append(self.take()[1])
+                self.expect("op", "]")
+            else:
+                break
+        return _Path(names)
+
+    def parse_or(self):
+        left = self.parse_and()
+        while self.accept("kw", "OR"):
+            right = self.parse_and()
+            left = (lambda l, r: lambda doc, p: _or(l(doc, p), r(doc, p)))(left, right)
+        return left
+
+    def parse_and(self):
+        left = self.parse_not()
+        while self.accept("kw", "AND"):
+            right = self.parse_not()
+            left = (lambda l, r: lambda doc, p: _and(l(doc, p), r(doc, p)))(left, right)
+        return left
+
+    def parse_not(self):
+        if self.accept("kw", "NOT"):
+            inner = self.parse_not()
+            return lambda doc, p: _not(inner(doc, p))
+        return self.parse_comparison()
+
+    def parse_comparison(self):
+        left = self.parse_operand()
+        kind, op = self.peek()
+        if kind == "op" and op in ("=", "!=", "<>", "<", "<=", ">", ">="):
+            self.take()
+            right = self.parse_operand()
+            return lambda doc, p: _compare(op, left(doc, p), right(doc, p))
+        return left
+
+    def parse_operand(self):
+        kind, value = self.peek()
+        if kind == "op" and value == "(":
+            self.take()
+            inner = self.parse_or()
+            self.expect("op", ")")
+            return inner
+        if kind == "value":
+            self.take()
+            return lambda doc, p: value
+        if kind == "param":
+            self.take()
+            return lambda doc, p: p.get(value, UNDEFINED)
+        if kind == "kw" and value in ("NULL", "TRUE", "FALSE"):
+            self.take()
+            constant = {"NULL": None, "TRUE": True, "FALSE": False}[value]
+            return lambda doc, p: constant
+        if kind == "name" and value.upper() in _FUNCTIONS and self.peek(1) == ("op", "("):
+            self.take()
+            self.take()
+            args = [self.parse_or()]
+            while self.accept("op", ","):
+                args.append(self.parse_or())
+            self.expect("op", ")")
+            function = _FUNCTIONS[value.upper()]
+            return lambda doc, p: function(*(arg(doc, p) for arg in args))
+        if kind == "name":
+            path = self.parse_path()
+            return lambda doc, p: path.get(doc)
+        raise _bad_request(f"Unsupported expression near: {value!r}")
+
+
+class _Path:
+    def __init__(self, names: list[str]):
+        self.names = names
+
+    def get(self, doc):
+        value = doc
+        for name in self.names:
+            if not isinstance(value, dict) or name not in value:
+                return UNDEFINED
+            value = value[name]
+        return value
+
+
+@lru_cache(maxsize=256)
+def _compile_query(sql: str):
+    return _Parser(sql).parse_query()
+
+
+@lru_cache(maxsize=256)
+def _compile_predicate(sql: str):
+    return _Parser(sql).parse_predicate()
+
+
+def _sort_key(value):
+    # Cosmos orders across types: undefined < null < booleans < numbers < strings
+    if value is UNDEFINED:
+        return (0, 0)
+    if value is None:
+        return (1, 0)
+    if isinstance(value, bool):
+        return (2, value)
+    if isinstance(value, (int, float)):
+        return (3, value)
+    return (4, str(value))
+
+
+def _bad_request(message: str) -> CosmosHttpResponseError:
+    return CosmosHttpResponseError(status_code=400, message=message)
+
+
+def _clone(doc: dict) -> dict:
+    # Callers get their own copy, as after deserializing a real response
+    return json.loads(json.dumps(doc))
+
+
+# --- Patch operations ---
+
+def _split_path(path: str) -> list[str]:
+    if not path.startswith("/") or path == "/":
+        raise _bad_request(f"Invalid patch path: {path!r}")
+    return path[1:].split("/")
+
+
+def _array_index(array: list, name: str, path: str, allow_end: bool = False) -> int:
+    if name == "-" and allow_end:
+        return len(array)
+    if not name.isdigit() or int(name) > len(array) - (0 if allow_end else 1):
+        raise _bad_request(f"Patch path {path!r} has no such array index")
+    return int(name)
+
+
+def _apply_patch(doc: dict, operation: dict):
+    op = operation["op"]
+    path = operation["path"]
+    names = _split_path(path)
+    parent = doc
+    for name in names[:-1]:
+        if isinstance(parent, list):
+            parent = parent[_array_index(parent, name, path)]
+        elif isinstance(parent, dict) and name in parent:
+            parent = parent[name]
+        else:
+            raise _bad_request(f"Patch path {path!r} has no parent object")
+    name = names[-1]
+
+    if isinstance(parent, list):
+        # Array elements: "add" inserts ("-" appends), the others address an existing index
+        if op == "add":
+            parent.insert(_array_index(parent, name, path, allow_end=True), operation["value"])
+        elif op in ("set", "replace"):
+            parent[_array_index(parent, name, path)] = operation["value"]
+        elif op == "remove":
+            del parent[_array_index(parent, name, path)]
+        else:
+            raise _bad_request(f"Unsupported patch operation on an array element: {op!r}")
+        return
+    if not isinstance(parent, dict):
+        raise _bad_request(f"Patch path {path!r} has no parent object")
+
+    if op in ("set", "add"):
+        parent[name] = operation["value"]
+    elif op == "replace":
+        if name not in parent:
+            raise _bad_request(f"Patch replace target {path!r} does not exist")
+        parent[name] = operation["value"]
+    elif op == "remove":
+        if name not in parent:
+            raise _bad_request(f"Patch remove target {path!r} does not exist")
+        del parent[name]
+    elif op == "incr":
+        current = parent.get(name, 0)
+        if isinstance(current, bool) or not isinstance(current, (int, float)):
+            raise _bad_request(f"Patch incr target {path!r} is not a number")
+        parent[name] = current + operation["value"]
+    else:
+        raise _bad_request(f"Unsupported patch operation: {op!r}")
+
+
+class MemoryContainer:
+    """Async, single-container Cosmos stand-in keyed by (partition key, id)."""
+
+    def __init__(self, partition_key_path: str = "/userId", latency: float = 0.0):
+        self.partition_key_field = partition_key_path.lstrip("/")
+        self.latency = latency  # simulated seconds per round trip
+        self.stats: Counter = Counter()
+        # Time spent evaluating queries: server-side work on real Cosmos (indexed there,
+        # a full scan here), so benchmarks can leave it out of the app's own time
+        self.query_seconds = 0.0
+        self._items: dict[tuple, dict] = {}
+
+    # --- bookkeeping ---
+
+    @property
+    def round_trips(self) -> int:
+        return sum(self.stats.values())
+
+    def reset_stats(self):
+        self.stats.clear()
+        self.query_seconds = 0.0
+
+    async def _round_trip(self, operation: str):
+        self.stats[operation] += 1
+        await asyncio.sleep(self.latency)
+
+    def _key(self, item_id: str, partition_key) -> tuple:
+        return partition_key, item_id
+
+    def _stamp(self, doc: dict) -> dict:
+        doc["_etag"] = f'"{uuid.uuid4()}"'
+        doc["_ts"] = int(time.time())
+        return doc
+
+    def _check_etag(self, current: dict, etag, match_condition):
+        if etag and match_condition == MatchConditions.IfNotModified and current.get("_etag") != etag:
+            raise CosmosAccessConditionFailedError(
+                status_code=412, message="Precondition failed: ETag mismatch",
+            )
+
+    def _get(self, item_id: str, partition_key) -> dict:
+        doc = self._items.get(self._key(item_id, partition_key))
+        if doc is None:
+            raise CosmosResourceNotFoundError(status_code=404, message=f"Entity {item_id} not found")
+        return doc
+
+    # --- point operations (synchronous cores, shared with batches) ---
+
+    def _create(self, body: dict) -> dict:
+        key = self._key(body["id"], body.get(self.partition_key_field))
+        if key in self._items:
+            raise CosmosResourceExistsError(status_code=409, message=f"Entity {body['id']} already exists")
+        doc = self._stamp(_clone(body))
+        self._items[key] = doc
+        return _clone(doc)
+
+    def _upsert(self, body: dict) -> dict:
+        doc = self._stamp(_clone(body))
+        self._items[self._key(body["id"], body.get(self.partition_key_field))] = doc
+        return _clone(doc)
+
+    def _replace(self, item_id: str, body: dict, etag=None, match_condition=None) -> dict:
+        partition_key = body.get(self.partition_key_field)
+        current = self._get(item_id, partition_key)
+        self._check_etag(current, etag, match_condition)
+        doc = self._stamp(_clone(body))
+        self._items[self._key(item_id, partition_key)] = doc
+        return _clone(doc)
+
+    def _delete(self, item_id: str, partition_key, etag=None, match_condition=None):
+        current = self._get(item_id, partition_key)
+        self._check_etag(current, etag, match_condition)
+        del self._items[self._key(item_id, partition_key)]
+
+    def _patch(self, item_id: str, partition_key, patch_operations: list[dict],
+               filter_predicate: str | None = None, etag=None, match_condition=None) -> dict:
+        current = self._get(item_id, partition_key)
+        self._check_etag(current, etag, match_condition)
+        if filter_predicate and _compile_predicate(filter_predicate)(current, {}) is not True:
+            raise CosmosAccessConditionFailedError(
+                status_code=412, message="Precondition failed: filter predicate not satisfied",
+            )
+        doc = _clone(current)
+        for operation in patch_operations:
+            _apply_patch(doc, operation)
+        self._items[self._key(item_id, partition_key)] = self._stamp(doc)
+        return _clone(doc)
+
+    # --- ContainerProxy API ---
+
+    async def read_item(self, item: str, partition_key, **kwargs) -> dict:
+        await self._round_trip("read_item")
+        return _clone(self._get(item, partition_key))
+
+    async def create_item(self, body: dict, **kwargs) -> dict:
+        await self._round_trip("create_item")
+        return self._create(body)
+
+    async def upsert_item(self, body: dict, **kwargs) -> dict:
+        await self._round_trip("upsert_item")
+        return self._upsert(body)
+
+    async def replace_item(self, item, body: dict, etag=None, match_condition=None, **kwargs) -> dict:
+        await self._round_trip("replace_item")
+        item_id = item["id"] if isinstance(item, dict) else item
+        return self._replace(item_id, body, etag, match_condition)
+
+    async def delete_item(self, item, partition_key, etag=None, match_condition=None, **kwargs):
+        await self._round_trip("delete_item")
+        item_id = item["id"] if isinstance(item, dict) else item
+        self._delete(item_id, partition_key, etag, match_condition)
+
+    async def patch_item(self, item, partition_key, patch_operations: list[dict],
+                         filter_predicate: str | None = None, etag=None, match_condition=None,
+                         **kwargs) -> dict:
+        await self._round_trip("patch_item")
+        item_id = item["id"] if isinstance(item, dict) else item
+        return self._patch(item_id, partition_key, patch_operations, filter_predicate, etag, match_condition)
+
+    async def execute_item_batch(self, batch_operations: list, partition_key, **kwargs) -> list[dict]:
+        """Apply every operation or none (transactional, single partition)."""
+        await self._round_trip("execute_item_batch")
+        if len(batch_operations) > MAX_BATCH_OPERATIONS:
+            raise _bad_request(f"Batch exceeds {MAX_BATCH_OPERATIONS} operations")
+
+        # Previous version of every document the batch touches (None: didn't exist), for rollback
+        undo: dict[tuple, dict | None] = {}
+        results = []
+        for index, operation in enumerate(batch_operations):
+            name, args = operation[0], operation[1]
+            options = operation[2] if len(operation) > 2 else {}
+            item_id = args[0]["id"] if name in ("create", "upsert") else args[0]
+            key = self._key(item_id, partition_key)
+            if key not in undo:
+                undo[key] = self._items.get(key)
+            try:
+                if name == "create":
+                    resource = self._create(*args)
+                elif name == "upsert":
+                    resource = self._upsert(*args)
+                elif name == "replace":
+                    resource = self._replace(*args, **options)
+                elif name == "patch":
+                    resource = self._patch(args[0], partition_key, *args[1:], **options)
+                elif name == "read":
+                    resource = _clone(self._get(args[0], partition_key))
+                elif name == "delete":
+                    self._delete(args[0], partition_key, **options)
+                    resource = None
+                else:
+                    raise _bad_request(f"Unsupported batch operation: {name!r}")
+            except CosmosHttpResponseError as e:
+                for key, doc in undo.items():
+                    if doc is None:
+                        self._items.pop(key, None)
+                    else:
+                        self._items[key] = doc
+                raise CosmosBatchOperationError(
+                    error_index=index, headers={}, status_code=e.status_code,
+                    message=f"Batch operation {index} ({name}) failed: {e.message}",
+                    operation_responses=results,
+                )
+            results.append({"statusCode": 200, "resourceBody": resource})
+        return results
+
+    def query_items(self, query: str, parameters: list[dict] | None = None, **kwargs):
+        return self._query(query, parameters or [])
+
+    async def _query(self, query: str, parameters: list[dict]):
+        projection, where, order, offset, limit = _compile_query(query)
+        params = {param["name"]: param["value"] for param in parameters}
+
+        started = time.perf_counter()
+        matches = [doc for doc in self._items.values() if where(doc, params) is True]
+        for path, descending in reversed(order):
+            matches.sort(key=lambda doc: _sort_key(path.get(doc)), reverse=descending)
+        if offset is not None:
+            start = offset({}, params)
+            matches = matches[start:start + limit({}, params)]
+        self.query_seconds += time.perf_counter() - started
+
+        await self._round_trip("query_items")
+        for index, doc in enumerate(matches):
+            if index and index % QUERY_PAGE_SIZE == 0:
+                await self._round_trip("query_items")
+            if projection is None:
+                yield _clone(doc)
+            else:
+                row = {}
+                for name, path in projection:
+                    value = path.get(doc)
+                    if value is not UNDEFINED:
+                        row[name] = value
+                yield _clone(row)
@@ -6,6 +6,8 @@ logging.basicConfig(
     datefmt="%H:%M:%S",
 )
 
+import asyncio
+
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
@@ -17,9 +19,14 @@ from app.api.calendar_routes import router as calendar_router
 from app.api.weather_routes import router as weather_router
 from app.api.folder_routes import router as folder_router
 from app.api.gmail_routes import router as gmail_router
+from app.database.blob import close_blob_client
+from app.services.http_client import open_http_clients, close_http_clients
+from app.services import warmup
 
 logger = logging.getLogger("jarvis")
 
+_warmup_task: asyncio.Task | None = None
+
 app = FastAPI(
     title="Jarvis",
     description="Personal AI Voice Assistant",
@@ -55,6 +62,7 @@ app.include_router(gmail_router, prefix="/api")
 
 @app.on_event("startup")
 async def startup_log():
+    global _warmup_task
     logger.info("=== Jarvis Backend Starting ===")
 
     # Auth
@@ -102,9 +110,26 @@ async def startup_log():
     else:
         logger.warning("Weather: NOT CONFIGURED")
 
+    # Shared outbound HTTP connection pools
+    await open_http_clients()
+
+    # Warm-up runs after startup so /health answers at once; /ready waits for it
+    if config.WARMUP_ENABLED:
+        _warmup_task = asyncio.create_task(warmup.warm_up())
+    else:
+        warmup.mark_ready()
+
     logger.info("=== Startup Complete ===")
 
 
+@app.on_event("shutdown")
+async def shutdown():
+    if _warmup_task is not None:
+        _warmup_task.cancel()
+    await close_http_clients()
+    await close_blob_client()
+
+
 @app.get("/")
 async def root():
     return {"name": "Jarvis", "status": "running"}
@@ -114,6 +139,13 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+
+@app.get("/ready")
+async def readiness_check():
+    """503 until startup warm-up is done: point the load balancer's health probe here."""
+    readiness = warmup.readiness()
+    return JSONResponse(status_code=200 if readiness["ready"] else 503, content=readiness)
+
 @app.get("/guthib")
 async def health_check():
     return {"status": "you spelled it wrong"}
@@ -0,0 +1,253 @@
+import bisect
+import os
+import sqlite3
+import threading
+import time
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Every entry carries a version that increases on each write (including
+# clears), so a worker can validate its parsed in-process copy with one
+# cheap lookup instead of re-reading and re-parsing the value.
+#
+# Large collections (the expense set) are stored as rows instead, one per
+# item, under an entry that holds the collection's version:
+# - replace_rows loads the whole collection and starts a new generation
+#   (the entry's value).
+# - update_rows writes only the items that changed, stamped with the version
+#   they were written at. A deleted item keeps a row with no value.
+# So a worker catches up on a write by reading the rows changed since its
+# version, instead of the whole collection.
+
+
+class MemoryCacheBackend:
+    """Single-process store: for local development and one-worker setups."""
+
+    def __init__(self):
+        self._entries: dict[str, tuple[int, str | None]] = {}
+        self._rows: dict[str, dict[str, tuple[int, str | None]]] = {}
+        self._changes: dict[str, list[tuple[int, str]]] = {}  # (version, item id), in write order
+        self._lock = threading.RLock()
+
+    @contextmanager
+    def locked(self):
+        with self._lock:
+            yield
+
+    def read_version(self, key: str) -> int:
+        return self._entries.get(key, (0, None))[0]
+
+    def read(self, key: str) -> tuple[int, str | None]:
+        return self._entries.get(key, (0, None))
+
+    def write(self, key: str, raw: str | None, expected_version: int | None = None) -> int | None:
+        with self._lock:
+            version = self.read_version(key)
+            if expected_version is not None and version != expected_version:
+                return None
+            self._entries[key] = (version + 1, raw)
+            return version + 1
+
+    def read_rows(self, key: str) -> tuple[int, str | None, list[str]]:
+        """(version, generation, raw items); generation is None while nothing is loaded."""
+        with self._lock:
+            version, generation = self.read(key)
+            rows = self._rows.get(key, {})
+            return version, generation, [raw for _, raw in rows.values() if raw is not None]
+
+    def read_row_changes(self, key: str, since: int) -> tuple[int, str | None, list[tuple[str, str | None]]]:
+        """(version, generation, [(item id, raw or None if deleted)]) for rows written after since."""
+        with self._lock:
+            version, generation = self.read(key)
+            rows = self._rows.get(key, {})
+            changes = self._changes.get(key, [])
+            ids = {item_id for _, item_id in changes[bisect.bisect_right(changes, since, key=lambda c: c[0]):]}
+            return version, generation, [(item_id, rows[item_id][1]) for item_id in ids]
+
+    def replace_rows(self, key: str, rows: dict[str, str] | None, expected_version: int | None = None) -> int | None:
+        """Load a whole collection (None clears it). With expected_version, only if nobody wrote since."""
+        with self._lock:
+            version = self.read_version(key)
+            if expected_version is not None and version != expected_version:
+                return None
+            version += 1
+            self._rows[key] = {item_id: (version, raw) for item_id, raw in (rows or {}).items()}
+            self._changes[key] = []
+            self._entries[key] = (version, str(version) if rows is not None else None)
+            return version
+
+    def update_rows(self, key: str, rows: dict[str, str | None]) -> int:
+        """Write changed items (None deletes). While nothing is loaded only the version moves."""
+        with self._lock:
+            version, generation = self.read(key)
+            version += 1
+            self._entries[key] = (version, generation)
+            if generation is not None:
+                stored = self._rows.setdefault(key, {})
+                changes = self._changes.setdefault(key, [])
+                for item_id, raw in rows.items():
+                    stored[item_id] = (version, raw)
+                    changes.append((version, item_id))
+                if len(changes) > 2 * len(stored):
+                    # Only each item's latest write matters to read_row_changes
+                    changes[:] = sorted((item_version, item_id) for item_id, (item_version, _) in stored.items())
+            return version
+
+
+class SQLiteCacheBackend:
+    """Store shared by every gunicorn worker on the host: one SQLite file in WAL mode.
+
+    WAL lets readers proceed while a writer commits, and each write is a
+    transaction, so no worker ever sees a half-written value. Each thread
+    has its own connection (and transaction), so writes can run in a worker
+    thread, waiting for the lock there rather than on the event loop.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._thread = threading.local()  # conn, pid, in_transaction
+
+    @property
+    def _in_transaction(self) -> bool:
+        return getattr(self._thread, "in_transaction", False)
+
+    @_in_transaction.setter
+    def _in_transaction(self, value: bool):
+        self._thread.in_transaction = value
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections must not cross a fork: gunicorn forks workers after import
+        if getattr(self._thread, "conn", None) is None or self._thread.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, version INTEGER NOT NULL, value TEXT, updated_at REAL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rows ("
+                "key TEXT NOT NULL, id TEXT NOT NULL, version INTEGER NOT NULL, value TEXT, "
+                "PRIMARY KEY (key, id))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS rows_by_version ON rows (key, version)")
+            self._thread.conn = conn
+            self._thread.pid = os.getpid()
+            self._thread.in_transaction = False
+            logger.info("SQLite cache opened: %s (%s)", self.path, threading.current_thread().name)
+        return self._thread.conn
+
+    @contextmanager
+    def locked(self):
+        """Hold the database write lock, for read-modify-write sequences across workers."""
+        if self._in_transaction:
+            yield
+            return
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        self._in_transaction = True
+        try:
+            yield
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+        finally:
+            self._in_transaction = False
+
+    def read_version(self, key: str) -> int:
+        row = self._connection().execute(
+            "SELECT version FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def read(self, key: str) -> tuple[int, str | None]:
+        row = self._connection().execute(
+            "SELECT version, value FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        return (row[0], row[1]) if row else (0, None)
+
+    def write(self, key: str, raw: str | None, expected_version: int | None = None) -> int | None:
+        with self.locked():
+            version = self.read_version(key)
+            if expected_version is not None and version != expected_version:
+                return None
+            self._set_entry(key, version + 1, raw)
+            return version + 1
+
+    def _set_entry(self, key: str, version: int, raw: str | None):
+        self._connection().execute(
+            "INSERT INTO entries (key, version, value, updated_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET version = excluded.version, "
+            "value = excluded.value, updated_at = excluded.updated_at",
+            (key, version, raw, time.time()),
+        )
+
+    @contextmanager
+    def _snapshot(self):
+        """A read transaction: every query in it sees the same committed state."""
+        if self._in_transaction:
+            yield
+            return
+        conn = self._connection()
+        conn.execute("BEGIN")
+        try:
+            yield
+        finally:
+            conn.execute("COMMIT")
+
+    def read_rows(self, key: str) -> tuple[int, str | None, list[str]]:
+        with self._snapshot():
+            version, generation = self.read(key)
+            rows = self._connection().execute(
+                "SELECT value FROM rows WHERE key = ? AND value IS NOT NULL", (key,)
+            ).fetchall()
+            return version, generation, [row[0] for row in rows]
+
+    def read_row_changes(self, key: str, since: int) -> tuple[int, str | None, list[tuple[str, str | None]]]:
+        with self._snapshot():
+            version, generation = self.read(key)
+            rows = self._connection().execute(
+                "SELECT id, value FROM rows WHERE key = ? AND version > ?", (key, since)
+            ).fetchall()
+            return version, generation, [(row[0], row[1]) for row in rows]
+
+    def replace_rows(self, key: str, rows: dict[str, str] | None, expected_version: int | None = None) -> int | None:
+        with self.locked():
+            version = self.read_version(key)
+            if expected_version is not None and version != expected_version:
+                return None
+            version += 1
+            conn = self._connection()
+            conn.execute("DELETE FROM rows WHERE key = ?", (key,))
+            conn.executemany(
+                "INSERT INTO rows (key, id, version, value) VALUES (?, ?, ?, ?)",
+                ((key, item_id, version, raw) for item_id, raw in (rows or {}).items()),
+            )
+            self._set_entry(key, version, str(version) if rows is not None else None)
+            return version
+
+    def update_rows(self, key: str, rows: dict[str, str | None]) -> int:
+        with self.locked():
+            version, generation = self.read(key)
+            version += 1
+            if generation is not None:
+                self._connection().executemany(
+                    "INSERT INTO rows (key, id, version, value) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(key, id) DO UPDATE SET version = excluded.version, value = excluded.value",
+                    ((key, item_id, version, raw) for item_id, raw in rows.items()),
+                )
+            self._set_entry(key, version, generation)
+            return version
+
+
+def create_backend(name: str, cache_dir: str):
+    if name == "memory":
+        return MemoryCacheBackend()
+    if name == "sqlite":
+        return SQLiteCacheBackend(os.path.join(cache_dir, "cache.sqlite3"))
+    raise RuntimeError(f"Unknown CACHE_BACKEND '{name}' (expected 'sqlite' or 'memory')")
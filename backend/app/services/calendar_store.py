@@ -0,0 +1,274 @@
+"""Local copy of the primary Google Calendar, kept current with syncTokens.
+
+One full events.list, with recurring events expanded into instances, fills
+the store with the events of a window around today (CALENDAR_STORE_PAST_DAYS
+back, CALENDAR_STORE_FUTURE_DAYS ahead). After that only changes are fetched,
+using the nextSyncToken of the previous sync; once half the future part of
+the window has gone by, a full sync moves it forward. The store lives in
+data_cache, shared by all workers. Each worker keeps an interval index over
+it, so a date-range read costs two binary searches instead of a Google round
+trip. Reads reaching outside the window go to Google.
+
+Once the store exists, reads within the window never wait for Google. When
+it is older than SYNC_INTERVAL, the changes are fetched in the background and
+the current copy is served meanwhile. A sync that brings no changes only
+records when it ran, so the store and every worker's index are left as they
+are. The app's own creates, updates and deletes are written through to the
+store as soon as Google confirms them. A delete leaves a tombstone, so a sync
+that started before it can't bring the event back.
+"""
+
+import asyncio
+import bisect
+import logging
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from app import config
+from app.services import google_calendar
+from app.services.data_cache import (
+    bump_data_version, calendar_synced_at, get_calendar_cache, mark_calendar_synced, update_calendar_cache,
+)
+from app.services.google_api import GoogleApiError
+
+logger = logging.getLogger(__name__)
+
+CALENDAR_ID = "primary"
+TIMEZONE = "Europe/Rome"
+SYNC_INTERVAL = 30  # seconds before a read triggers a background sync
+PAGE_SIZE = 2500  # events.list maximum
+DAY = 86400
+
+# Store state: { "syncToken": str, "window": [start, end] (epoch seconds), "events": { id: event },
+#                "deleted": { id: time the app deleted it } }
+_lock = asyncio.Lock()
+_background_tasks: set[asyncio.Task] = set()
+_index = None  # (state it was built from, _IntervalIndex)
+
+
+def _timestamp(when: dict) -> float:
+    """An event's start or end ({"dateTime"}, or {"date"} for all-day events) in epoch seconds."""
+    if "dateTime" in when:
+        return datetime.fromisoformat(when["dateTime"]).timestamp()
+    return datetime.fromisoformat(when["date"]).replace(tzinfo=ZoneInfo(TIMEZONE)).timestamp()
+
+
+class _IntervalIndex:
+    """Events sorted by start. A range query only scans back as far as the longest event lasts."""
+
+    def __init__(self, events: list[dict]):
+        spans = sorted(
+            (_timestamp(event["start"]), _timestamp(event["end"]), event["id"], event)
+            for event in events
+            if "start" in event and "end" in event
+        )
+        self.starts = [span[0] for span in spans]
+        self.ends = [span[1] for span in spans]
+        self.events = [span[3] for span in spans]
+        self.max_duration = max((end - start for start, end, *_ in spans), default=0)
+
+    def overlapping(self, time_min: float, time_max: float) -> list[dict]:
+        """Events ending after time_min and starting before time_max (events.list semantics)."""
+        lo = bisect.bisect_left(self.starts, time_min - self.max_duration)
+        hi = bisect.bisect_left(self.starts, time_max)
+        return [self.events[i] for i in range(lo, hi) if self.ends[i] > time_min]
+
+
+def _index_for(state: dict) -> _IntervalIndex:
+    # data_cache hands out the same state object until the next write from any worker
+    global _index
+    if _index is None or _index[0] is not state:
+        _index = (state, _IntervalIndex(list(state["events"].values())))
+    return _index[1]
+
+
+def _window(now: float) -> list[float]:
+    return [now - config.CALENDAR_STORE_PAST_DAYS * DAY, now + config.CALENDAR_STORE_FUTURE_DAYS * DAY]
+
+
+def _in_window(event: dict, window: list[float]) -> bool:
+    return "start" in event and "end" in event and (
+        _timestamp(event["start"]) < window[1] and _timestamp(event["end"]) > window[0]
+    )
+
+
+def _apply(events: dict, changes: list[dict], window: list[float]) -> dict:
+    """Merge changed events (cancelled = deleted, and so are events moved out of the window).
+    The newer copy of an event wins, so a sync that started before one of the app's own
+    writes can't undo it."""
+    events = dict(events)
+    for event in changes:
+        current = events.get(event["id"])
+        if current is not None and event.get("updated", "") < current.get("updated", ""):
+            continue
+        if event.get("status") == "cancelled" or not _in_window(event, window):
+            events.pop(event["id"], None)
+        else:
+            events[event["id"]] = event
+    return events
+
+
+def _isoformat(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, ZoneInfo(TIMEZONE)).isoformat()
+
+
+async def _fetch(sync_token: str | None, window: list[float] | None = None) -> tuple[list[dict], str | None] | None:
+    """Every event of the window (or the changes since sync_token) and the next syncToken.
+
+    Returns None if Google no longer accepts sync_token.
+    """
+    items = []
+    page_token = None
+    while True:
+        try:
+            # Google rejects timeMin/timeMax next to a syncToken: changes come for every event
+            result = await google_calendar.list_events(
+                CALENDAR_ID, singleEvents=True, maxResults=PAGE_SIZE, timeZone=TIMEZONE,
+                syncToken=sync_token, pageToken=page_token,
+                timeMin=_isoformat(window[0]) if window else None, timeMax=_isoformat(window[1]) if window else None,
+            )
+        except GoogleApiError as e:
+            # Google answers 410 Gone when the syncToken expired or was invalidated
+            if sync_token and e.status == 410:
+                logger.info("Calendar store: syncToken expired")
+                return None
+            raise
+        items.extend(result.get("items", []))
+        page_token = result.get("nextPageToken")
+        if not page_token:
+            return items, result.get("nextSyncToken")
+
+
+def _needs_full_sync(state: dict | None, now: float) -> bool:
+    """No store yet, no syncToken to continue from, or the window has to move forward."""
+    if state is None or not state.get("syncToken") or "window" not in state:
+        return True
+    return state["window"][1] - now < config.CALENDAR_STORE_FUTURE_DAYS * DAY / 2
+
+
+async def sync(force: bool = False) -> dict:
+    """Bring the store up to date, falling back to a full sync when needed."""
+    async with _lock:
+        state = get_calendar_cache()
+        if state is not None and not force and time.time() - calendar_synced_at() < SYNC_INTERVAL:
+            return state
+
+        started = time.time()
+        fetched = None if _needs_full_sync(state, started) else await _fetch(state["syncToken"])
+        full = fetched is None
+        window = _window(started) if full else state["window"]
+        if full:
+            fetched = await _fetch(None, window)
+        changes, sync_token = fetched
+
+        if not full and not changes:
+            # Nothing to store: the syncToken in the store still leads to the same changes
+            await mark_calendar_synced(time.time())
+            return state
+
+        def _commit(current: dict | None) -> dict:
+            # Applied to the store as it is now: writes made during the fetch are kept
+            events = current["events"] if current is not None and not full else {}
+            # Events the app deleted after the fetch started may still be in it: skip them.
+            # Older tombstones are already reflected in what Google returned.
+            deleted = {
+                event_id: deleted_at
+                for event_id, deleted_at in (current or {}).get("deleted", {}).items()
+                if deleted_at >= started
+            }
+            fresh = [event for event in changes if event["id"] not in deleted]
+            return {"syncToken": sync_token, "window": window, "events": _apply(events, fresh, window),
+                    "deleted": deleted}
+
+        state = await update_calendar_cache(_commit)
+        await mark_calendar_synced(time.time())
+        bump_data_version("calendar")
+        logger.info(
+            "Calendar store: %s sync, %d event(s) %s, %d stored",
+            "full" if full else "incremental", len(changes), "loaded" if full else "changed", len(state["events"]),
+        )
+        return state
+
+
+async def _background_sync():
+    try:
+        await sync()
+    except Exception as e:
+        logger.warning("Calendar store: background sync failed: %s", e)
+
+
+def _sync_in_background():
+    if _lock.locked():
+        return  # a sync is already running in this worker
+    task = asyncio.create_task(_background_sync())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def list_events(time_min: datetime, time_max: datetime, query: str | None = None) -> list[dict]:
+    """Events overlapping [time_min, time_max), by start time; query matches title, description or location.
+
+    Only the very first read, and reads reaching outside the store's window,
+    wait for Google. The events are shared, treat them as read-only.
+    """
+    state = get_calendar_cache()
+    if state is None or "window" not in state:
+        state = await sync(force=True)
+    elif time.time() - calendar_synced_at() >= SYNC_INTERVAL:
+        _sync_in_background()
+
+    window = state["window"]
+    if time_min.timestamp() < window[0] or time_max.timestamp() > window[1]:
+        return await _fetch_range(time_min, time_max, query)
+
+    events = _index_for(state).overlapping(time_min.timestamp(), time_max.timestamp())
+    if query:
+        needle = query.lower()
+        events = [
+            event for event in events
+            if any(needle in (event.get(field) or "").lower() for field in ("summary", "description", "location"))
+        ]
+    return events
+
+
+async def _fetch_range(time_min: datetime, time_max: datetime, query: str | None) -> list[dict]:
+    """A date range read straight from Google, for ranges the store doesn't cover."""
+    items = []
+    page_token = None
+    while True:
+        result = await google_calendar.list_events(
+            CALENDAR_ID, singleEvents=True, orderBy="startTime", maxResults=PAGE_SIZE, timeZone=TIMEZONE,
+            timeMin=time_min.isoformat(), timeMax=time_max.isoformat(), q=query, pageToken=page_token,
+        )
+        items.extend(result.get("items", []))
+        page_token = result.get("nextPageToken")
+        if not page_token:
+            return items
+
+
+async def _write_through(upserts: list[dict] = (), deleted_ids: list[str] = ()):
+    def _update(state: dict | None) -> dict | None:
+        if state is None or "window" not in state:
+            return None  # nothing stored yet: the first read syncs in full
+        events = _apply(state["events"], upserts, state["window"])
+        deleted = {
+            event_id: deleted_at for event_id, deleted_at in state.get("deleted", {}).items()
+            if event_id not in events
+        }
+        for event_id in deleted_ids:
+            events.pop(event_id, None)
+            deleted[event_id] = time.time()
+        return {**state, "events": events, "deleted": deleted}
+
+    await update_calendar_cache(_update)
+    bump_data_version("calendar")
+
+
+async def record_event(event: dict):
+    """Write an event Google just created or updated through to the store."""
+    await _write_through(upserts=[event])
+
+
+async def record_deleted(event_id: str):
+    await _write_through(deleted_ids=[event_id])
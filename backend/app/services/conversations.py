@@ -0,0 +1,159 @@
+"""Chat sessions stored as Cosmos documents (type "conversation").
+
+Each turn is appended with one patch, so any worker can serve any turn of a
+session. Only the recent turns that fit in CONVERSATION_TOKEN_BUDGET are
+kept: when the window overflows, the oldest turns are folded into a running
+summary (every turn is summarized exactly once) and removed from the
+document, so the prompt, the document and the per-turn cost stay bounded
+however long the conversation gets.
+"""
+
+import logging
+import random
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable
+
+from azure.cosmos.exceptions import CosmosResourceNotFoundError
+
+from app import config
+from app.database.documents import (
+    USER_ID,
+    DocumentNotFound,
+    PreconditionFailed,
+    patch_document,
+)
+from app.utils.tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+CONVERSATION_TYPE = "conversation"
+TYPE_CONDITION = f"c.type = '{CONVERSATION_TYPE}'"
+TITLE_LENGTH = 60
+
+# (previous summary or None, turns to fold in) -> new summary
+Summarizer = Callable[[str | None, list[dict]], Awaitable[str]]
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _turn(role: str, text: str) -> dict:
+    return {"role": role, "text": text, "tokens": estimate_tokens(text), "at": _now()}
+
+
+def new_conversation_id() -> str:
+    return f"conv_{int(time.time())}_{random.randint(1000, 9999)}"
+
+
+async def create_conversation(container, title: str = "", conversation_id: str | None = None) -> dict:
+    """A new, empty conversation; conversation_id picks its ID ahead of creating it."""
+    now = _now()
+    conversation = {
+        "id": conversation_id or new_conversation_id(),
+        "userId": USER_ID,
+        "type": CONVERSATION_TYPE,
+        "title": title[:TITLE_LENGTH],
+        "summary": None,
+        "summarizedTurns": 0,
+        "turnCount": 0,
+        "turns": [],
+        "tokens": 0,
+        "createdAt": now,
+        "updatedAt": now,
+    }
+    return await container.create_item(body=conversation)
+
+
+async def get_conversation(container, conversation_id: str) -> dict:
+    """Raises DocumentNotFound if there is no such conversation."""
+    try:
+        conversation = await container.read_item(item=conversation_id, partition_key=USER_ID)
+    except CosmosResourceNotFoundError:
+        raise DocumentNotFound(conversation_id)
+    if conversation.get("type") != CONVERSATION_TYPE:
+        raise DocumentNotFound(conversation_id)
+    return conversation
+
+
+async def list_conversations(container) -> list[dict]:
+    """Conversation headers, most recently active first."""
+    query = (
+        "SELECT c.id, c.title, c.createdAt, c.updatedAt, c.turnCount "
+        f"FROM c WHERE {TYPE_CONDITION} ORDER BY c.updatedAt DESC"
+    )
+    return [item async for item in container.query_items(query=query, partition_key=USER_ID)]
+
+
+async def delete_conversation(container, conversation_id: str):
+    """Raises DocumentNotFound."""
+    await get_conversation(container, conversation_id)
+    try:
+        await container.delete_item(item=conversation_id, partition_key=USER_ID)
+    except CosmosResourceNotFoundError:
+        raise DocumentNotFound(conversation_id)
+
+
+async def append_turn(container, conversation: dict, message: str, reply: str) -> dict:
+    """Append a user message and the assistant's reply in one round trip; returns the updated document.
+
+    Concurrent appends from different workers don't conflict: each patch
+    applies atomically to the current document.
+    """
+    user_turn, assistant_turn = _turn("user", message), _turn("assistant", reply)
+    operations = [
+        {"op": "add", "path": "/turns/-", "value": user_turn},
+        {"op": "add", "path": "/turns/-", "value": assistant_turn},
+        {"op": "incr", "path": "/turnCount", "value": 2},
+        {"op": "incr", "path": "/tokens", "value": user_turn["tokens"] + assistant_turn["tokens"]},
+        {"op": "set", "path": "/updatedAt", "value": assistant_turn["at"]},
+    ]
+    if not conversation.get("title"):
+        # A new conversation is named after its first message
+        operations.append({"op": "set", "path": "/title", "value": message[:TITLE_LENGTH]})
+    try:
+        return await patch_document(container, conversation["id"], operations, condition=TYPE_CONDITION)
+    except PreconditionFailed:
+        raise DocumentNotFound(conversation["id"])
+
+
+def needs_compaction(conversation: dict) -> bool:
+    return conversation.get("tokens", 0) > config.CONVERSATION_TOKEN_BUDGET
+
+
+async def compact(container, conversation: dict, summarize: Summarizer) -> bool:
+    """Fold the oldest turns into the summary until the window is back to half its budget.
+
+    The write is conditional on the document's ETag: if another worker
+    appended or compacted meanwhile, nothing is written and the next turn
+    retries. Returns whether the document was compacted.
+    """
+    turns = conversation["turns"]
+    target = config.CONVERSATION_TOKEN_BUDGET // 2
+    remaining = conversation.get("tokens", 0)
+    cut = 0
+    # Cut on user-turn boundaries so the window never starts with a reply
+    while cut < len(turns) - 2 and remaining > target:
+        remaining -= turns[cut]["tokens"] + turns[cut + 1]["tokens"]
+        cut += 2
+    if cut == 0:
+        return False
+
+    summary = await summarize(conversation.get("summary"), turns[:cut])
+    try:
+        await patch_document(
+            container, conversation["id"],
+            [
+                {"op": "set", "path": "/summary", "value": summary},
+                {"op": "incr", "path": "/summarizedTurns", "value": cut},
+                {"op": "set", "path": "/turns", "value": turns[cut:]},
+                {"op": "set", "path": "/tokens", "value": remaining},
+            ],
+            etag=conversation["_etag"],
+        )
+    except (PreconditionFailed, DocumentNotFound):
+        logger.info("Conversation %s changed during compaction, will retry next turn", conversation["id"])
+        return False
+    logger.info("Conversation %s: folded %d turns into the summary", conversation["id"], cut)
+    return True
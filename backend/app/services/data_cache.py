@@ -1,64 +1,322 @@
+import asyncio
+import bisect
 import json
-import os
-import time
 import logging
 
+from app import config
+from app.services.cache_backends import create_backend
+
 logger = logging.getLogger(__name__)
 
-_CACHE_DIR = os.environ.get("CACHE_DIR", "/tmp/jarvis_cache")
-_EMAIL_CACHE_FILE = os.path.join(_CACHE_DIR, "emails.json")
-_EXPENSE_CACHE_FILE = os.path.join(_CACHE_DIR, "expenses.json")
+_GMAIL_MIRROR_KEY = "gmail_mirror"
+_EXPENSES_KEY = "expenses"
+_CLASSIFICATIONS_KEY = "email_classifications"
+_CALENDAR_KEY = "calendar_events"
+_CALENDAR_SYNCED_KEY = "calendar_synced"
 
+_backend = None
 
-def _ensure_cache_dir():
-    os.makedirs(_CACHE_DIR, exist_ok=True)
+# In-process tier: { key: (version, parsed value) }. A hit costs one version
+# lookup in the shared store; the value is only re-parsed after a write from
+# any worker. Values are shared between callers, treat them as read-only.
+_local: dict[str, tuple[int, object]] = {}
 
 
-def _read_cache(path: str) -> list[dict] | None:
-    try:
-        with open(path, "r") as f:
-            data = json.load(f)
-        return data.get("data")
-    except (FileNotFoundError, json.JSONDecodeError):
-        return None
+def _get_backend():
+    global _backend
+    if _backend is None:
+        _backend = create_backend(config.CACHE_BACKEND, config.CACHE_DIR)
+        logger.info("Data cache backend: %s", config.CACHE_BACKEND)
+    return _backend
+
+
+def _read_cache(key: str) -> list[dict] | dict | None:
+    backend = _get_backend()
+    local = _local.get(key)
+    if local is not None and local[0] == backend.read_version(key):
+        return local[1]
+    version, raw = backend.read(key)
+    value = json.loads(raw) if raw is not None else None
+    _local[key] = (version, value)
+    return value
+
+
+def _write_cache(key: str, value: list[dict] | dict | None, expected_version: int | None = None) -> bool:
+    """Atomically replace a value. With expected_version, only if nobody wrote since."""
+    raw = json.dumps(value) if value is not None else None
+    version = _get_backend().write(key, raw, expected_version)
+    if version is None:
+        return False
+    _local[key] = (version, value)
+    return True
+
+
+def _clear_cache(key: str):
+    # Clearing is a write too: the version bump invalidates every worker's copy
+    _write_cache(key, None)
+
+
+# --- Gmail mirror (inbox metadata + last historyId) ---
+
+def get_gmail_mirror_cache() -> dict | None:
+    return _read_cache(_GMAIL_MIRROR_KEY)
+
+
+async def set_gmail_mirror_cache(state: dict) -> None:
+    # In a thread: waiting for another worker's write never blocks the event loop
+    await asyncio.to_thread(_write_cache, _GMAIL_MIRROR_KEY, state)
+
+
+def clear_gmail_mirror_cache() -> None:
+    _clear_cache(_GMAIL_MIRROR_KEY)
 
 
-def _write_cache(path: str, items: list[dict]):
-    _ensure_cache_dir()
-    with open(path, "w") as f:
-        json.dump({"data": items, "timestamp": time.time()}, f)
+# --- Expense cache (write-through) ---
+# Holds the complete expense set once loaded, as one shared row per expense.
+# Each worker keeps it as an ExpenseSet sorted by (date, id). A write stores
+# only the expenses it changed, and every worker applies those rows to its
+# copy in place, so a write costs a binary search per expense, not a rebuild.
 
 
-def _clear_cache(path: str):
-    try:
-        os.remove(path)
-    except FileNotFoundError:
-        pass
+def _expense_sort_key(expense: dict) -> tuple[str, str]:
+    return expense.get("date", ""), expense["id"]
 
 
-# --- Email cache ---
+class ExpenseSet:
+    """Expenses sorted by (date, id), with an id index, updated in place.
 
-def get_emails_cache() -> list[dict] | None:
-    return _read_cache(_EMAIL_CACHE_FILE)
+    Stored oldest first so bisect works; read them with newest_first().
+    generation and version identify the shared state it mirrors: stamp
+    changes on every write. The expenses are shared, treat them as read-only.
+    """
 
+    def __init__(self, expenses: list[dict], generation: str | None = None, version: int = 0):
+        ordered = sorted(expenses, key=_expense_sort_key)
+        self._keys = [_expense_sort_key(expense) for expense in ordered]
+        self._items = ordered
+        # id -> sort key: bisect on the key finds the expense's current position
+        self._key_by_id = {expense["id"]: key for expense, key in zip(ordered, self._keys)}
+        self.generation = generation
+        self.version = version
 
-def set_emails_cache(emails: list[dict]) -> None:
-    _write_cache(_EMAIL_CACHE_FILE, emails)
+    @property
+    def stamp(self) -> tuple[str | None, int]:
+        return self.generation, self.version
 
+    def __len__(self) -> int:
+        return len(self._items)
 
-def clear_emails_cache() -> None:
-    _clear_cache(_EMAIL_CACHE_FILE)
+    def newest_first(self, before: tuple | None = None):
+        """Newest first; with before, only expenses whose (date, id) sorts before it (found by bisect)."""
+        end = len(self._keys) if before is None else bisect.bisect_left(self._keys, before)
+        for i in range(end - 1, -1, -1):
+            yield self._items[i]
 
+    def upsert(self, expense: dict):
+        self.remove(expense["id"])
+        key = _expense_sort_key(expense)
+        i = bisect.bisect_left(self._keys, key)
+        self._keys.insert(i, key)
+        self._items.insert(i, expense)
+        self._key_by_id[expense["id"]] = key
 
-# --- Expense cache ---
+    def remove(self, expense_id: str):
+        key = self._key_by_id.pop(expense_id, None)
+        if key is not None:
+            i = bisect.bisect_left(self._keys, key)
+            del self._keys[i]
+            del self._items[i]
 
-def get_expenses_cache() -> list[dict] | None:
-    return _read_cache(_EXPENSE_CACHE_FILE)
+    def apply(self, changes):
+        """Apply (expense id, expense or None if deleted) pairs."""
+        for expense_id, expense in changes:
+            if expense is None:
+                self.remove(expense_id)
+            else:
+                self.upsert(expense)
 
 
-def set_expenses_cache(expenses: list[dict]) -> None:
-    _write_cache(_EXPENSE_CACHE_FILE, expenses)
+# This worker's copy of the resident set (None while it isn't loaded)
+_expenses: ExpenseSet | None = None
+
+
+def get_expenses_cache() -> ExpenseSet | None:
+    """The resident expenses, caught up with every worker's writes.
+
+    A hit costs one version lookup. After a write from another worker only
+    the rows it changed are read, and the whole set only after a reload.
+    """
+    global _expenses
+    backend = _get_backend()
+    if _expenses is not None:
+        if _expenses.version == backend.read_version(_EXPENSES_KEY):
+            return _expenses
+        version, generation, changes = backend.read_row_changes(_EXPENSES_KEY, _expenses.version)
+        if generation is not None and generation == _expenses.generation:
+            _expenses.apply((expense_id, json.loads(raw) if raw is not None else None) for expense_id, raw in changes)
+            _expenses.version = version
+            return _expenses
+
+    version, generation, rows = backend.read_rows(_EXPENSES_KEY)
+    _expenses = ExpenseSet([json.loads(raw) for raw in rows], generation, version) if generation is not None else None
+    return _expenses
+
+
+def _expense_rows(expenses: list[dict]) -> dict[str, str]:
+    return {expense["id"]: json.dumps(expense) for expense in expenses}
+
+
+async def set_expenses_cache(expenses: list[dict], expected_version: int | None = None) -> ExpenseSet | None:
+    """Make expenses the resident set. With expected_version, only if nobody wrote since (None otherwise)."""
+    global _expenses
+    # Serialising and storing the whole set runs in a thread, holding the store's lock off the event loop
+    version = await asyncio.to_thread(
+        lambda: _get_backend().replace_rows(_EXPENSES_KEY, _expense_rows(expenses), expected_version)
+    )
+    if version is None:
+        return None
+    _expenses = ExpenseSet(expenses, str(version), version)
+    return _expenses
 
 
 def clear_expenses_cache() -> None:
-    _clear_cache(_EXPENSE_CACHE_FILE)
+    global _expenses
+    _get_backend().replace_rows(_EXPENSES_KEY, None)
+    _expenses = None
+
+
+def expenses_version() -> int:
+    """Changes on every expense write in any worker; lets loaders detect a racing write."""
+    return _get_backend().read_version(_EXPENSES_KEY)
+
+
+async def apply_expenses_delta(upserts: list[dict] | None = None, deleted_ids: list[str] | None = None) -> None:
+    """Store created/updated expenses and drop deleted ones, atomically across workers.
+
+    Only the changed rows are written, in a thread: waiting for another
+    worker's write never blocks the event loop. While the set isn't resident
+    only the version is bumped: the next read loads it fresh.
+    """
+    changes = {expense["id"]: expense for expense in upserts or []}
+    changes.update((expense_id, None) for expense_id in deleted_ids or [])
+    if not changes:
+        return
+    rows = {expense_id: json.dumps(expense) if expense is not None else None for expense_id, expense in changes.items()}
+    version = await asyncio.to_thread(_get_backend().update_rows, _EXPENSES_KEY, rows)
+    # Apply in place when no other write came in between; otherwise the next read catches up
+    if _expenses is not None and _expenses.version == version - 1:
+        _expenses.apply(changes.items())
+        _expenses.version = version
+
+
+def filter_expenses(
+    expenses: ExpenseSet,
+    category: str | None = None,
+    start_date: str | None = None,
+    end_date: str | None = None,
+    folder_id: str | None = None,
+    payment_method: str | None = None,
+    limit: int | None = None,
+    after: tuple[str, str] | None = None,
+) -> list[dict]:
+    """Apply expense query filters in memory, newest first (copies).
+
+    Matches the Cosmos filters: case-insensitive category and payment method,
+    inclusive date bounds, exact folder. Ties on date are ordered by id so
+    after=(date, id) is a stable keyset cursor: only expenses past it are returned.
+    The scan starts at the cursor (or end_date), so a page costs the same at any depth.
+    """
+    category = category.lower() if category else None
+    payment_method = payment_method.lower() if payment_method else None
+    # Every (date, id) key of a date up to end_date sorts before (end_date + "\0",)
+    bounds = [bound for bound in (after, (end_date + "\0",) if end_date else None) if bound]
+    matches = []
+    for expense in expenses.newest_first(before=min(bounds) if bounds else None):
+        if category and (expense.get("category") or "").lower() != category:
+            continue
+        if payment_method and (expense.get("paymentMethod") or "").lower() != payment_method:
+            continue
+        if start_date and expense.get("date", "") < start_date:
+            break  # newest first: every remaining expense is older
+        if end_date and not "" < expense.get("date", "") <= end_date:
+            continue
+        if folder_id and expense.get("folderId") != folder_id:
+            continue
+        matches.append(dict(expense))
+        if limit is not None and len(matches) >= limit:
+            break
+    return matches
+
+
+# --- Email classification cache (message ID -> category) ---
+
+def get_classification_cache() -> dict | None:
+    return _read_cache(_CLASSIFICATIONS_KEY)
+
+
+def update_classification_cache(update) -> dict:
+    """Replace the cache with update(current or None), atomically across workers.
+
+    update returns None to leave the cache as it is.
+    """
+    with _get_backend().locked():
+        current = get_classification_cache()
+        classifications = update(current)
+        if classifications is None:
+            return current or {}
+        _write_cache(_CLASSIFICATIONS_KEY, classifications)
+        return classifications
+
+
+# --- Calendar event store (primary calendar + last syncToken) ---
+
+def get_calendar_cache() -> dict | None:
+    return _read_cache(_CALENDAR_KEY)
+
+
+async def update_calendar_cache(update) -> dict | None:
+    """Replace the store with update(current state or None), atomically across workers.
+
+    update returns None to leave the store as it is. Runs in a thread, so
+    waiting for another worker's write never blocks the event loop.
+    """
+    def _update():
+        with _get_backend().locked():
+            current = get_calendar_cache()
+            state = update(current)
+            if state is None:
+                return current
+            _write_cache(_CALENDAR_KEY, state)
+            return state
+
+    return await asyncio.to_thread(_update)
+
+
+def calendar_synced_at() -> float:
+    """When the store was last brought up to date; kept apart so a sync with no changes doesn't rewrite it."""
+    synced = _read_cache(_CALENDAR_SYNCED_KEY)
+    return synced["at"] if synced else 0.0
+
+
+async def mark_calendar_synced(at: float) -> None:
+    await asyncio.to_thread(_write_cache, _CALENDAR_SYNCED_KEY, {"at": at})
+
+
+def clear_calendar_cache() -> None:
+    _clear_cache(_CALENDAR_KEY)
+
+
+# --- Data versions (folders, calendar) ---
+# Bare counters for data this cache doesn't hold: every write, from any worker,
+# bumps the domain's counter. The response cache keys answers on them.
+
+def _version_key(domain: str) -> str:
+    return f"version:{domain}"
+
+
+def bump_data_version(domain: str) -> None:
+    _get_backend().write(_version_key(domain), None)
+
+
+def data_version(domain: str) -> int:
+    return _get_backend().read_version(_version_key(domain))
@@ -1,7 +1,8 @@
-import hashlib
+import asyncio
 import json
 import logging
-import time
+from collections import OrderedDict
+from itertools import islice
 
 from openai import AsyncAzureOpenAI
 
@@ -11,6 +12,7 @@ from app.config import (
     AZURE_OPENAI_DEPLOYMENT,
     AZURE_OPENAI_API_VERSION,
 )
+from app.services.data_cache import get_classification_cache, update_classification_cache
 
 logger = logging.getLogger(__name__)
 
@@ -23,78 +25,166 @@ SYSTEM_PROMPT = """You are an email classifier. Classify each email into exactly
 Respond with a JSON object mapping the email number to its category.
 Example: {"1": "people", "2": "tldr", "3": "other"}"""
 
-# In-memory cache: { cache_key: { "classifications": {...}, "timestamp": float } }
-_cache = {}
-CACHE_TTL = 300  # 5 minutes
+CATEGORIES = {"people", "tldr", "other"}
+
+# Chunking: keep each prompt within INPUT_TOKEN_BUDGET (estimated at ~4 chars
+# per token) and give every email enough output tokens for its '"12": "people"'
+# entry, so large pages are never truncated.
+INPUT_TOKEN_BUDGET = 1500
+MAX_EMAILS_PER_CHUNK = 25
+OUTPUT_TOKENS_PER_EMAIL = 8
+MAX_CONCURRENT_CHUNKS = 4
+MAX_RETRIES = 1  # extra passes for emails the model left out
+
+_client = None
+
+# Per-message cache: { message_id: category }, in LRU order (oldest first).
+# A message's category never changes, so entries have no TTL; the oldest are
+# evicted past MAX_CACHED. Shared by all workers through data_cache: every
+# change is merged into the current cache under its lock.
+MAX_CACHED = 2000
+
+
+def _remember(classified: dict[str, str], used: list[str]) -> dict[str, str]:
+    """Store new classifications and mark used ones most recent. Returns the merged cache.
+
+    A read that only hits the cache is written back only once a used entry has
+    drifted into the older half, where it could be evicted.
+    """
+    def _update(current: dict | None) -> dict | None:
+        current = current or {}
+        if not classified:
+            recent = set(islice(reversed(current), MAX_CACHED // 2))
+            if all(email_id in recent for email_id in used if email_id in current):
+                return None
+        cache = OrderedDict(current)
+        for email_id in used:
+            if email_id in cache:
+                cache.move_to_end(email_id)
+        for email_id, category in classified.items():
+            cache[email_id] = category
+            cache.move_to_end(email_id)
+        while len(cache) > MAX_CACHED:
+            cache.popitem(last=False)
+        return dict(cache)
+
+    return update_classification_cache(_update)
+
+
+def _get_client() -> AsyncAzureOpenAI:
+    """Return the shared Azure OpenAI client, creating it lazily."""
+    global _client
+    if _client is None:
+        _client = AsyncAzureOpenAI(
+            azure_endpoint=AZURE_OPENAI_ENDPOINT,
+            api_key=AZURE_OPENAI_KEY,
+            api_version=AZURE_OPENAI_API_VERSION,
+        )
+    return _client
+
+
+def _format_line(i: int, email: dict) -> str:
+    sender = email.get("from", "")
+    subject = email.get("subject", "")
+    snippet = email.get("snippet", "")[:120]
+    return f"{i}. From: {sender} | Subject: {subject} | Snippet: {snippet}"
+
+
+def _chunk_emails(emails: list[dict]) -> list[list[dict]]:
+    """Split emails into chunks that fit the per-request token budget."""
+    chunks = []
+    current = []
+    current_tokens = 0
+    for email in emails:
+        tokens = len(_format_line(len(current) + 1, email)) // 4 + 1
+        if current and (current_tokens + tokens > INPUT_TOKEN_BUDGET or len(current) >= MAX_EMAILS_PER_CHUNK):
+            chunks.append(current)
+            current = []
+            current_tokens = 0
+        current.append(email)
+        current_tokens += tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+async def _classify_chunk(emails: list[dict]) -> dict[str, str]:
+    """Classify one chunk with Azure OpenAI. Returns {email_id: category} for answered emails."""
+    user_message = "\n".join(_format_line(i, email) for i, email in enumerate(emails, 1))
+
+    response = await _get_client().chat.completions.create(
+        model=AZURE_OPENAI_DEPLOYMENT,
+        messages=[
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": user_message},
+        ],
+        response_format={"type": "json_object"},
+        max_tokens=OUTPUT_TOKENS_PER_EMAIL * len(emails) + 16,
+        temperature=0,
+    )
+
+    raw = response.choices[0].message.content
+    classifications = json.loads(raw)
+
+    id_to_category = {}
+    for i, email in enumerate(emails, 1):
+        cat = classifications.get(str(i))
+        if cat in CATEGORIES:
+            id_to_category[email.get("id")] = cat
+    return id_to_category
 
 
-def _make_cache_key(emails: list[dict]) -> str:
-    """Build a cache key from sorted email IDs."""
-    ids = sorted(e.get("id", "") for e in emails)
-    return hashlib.md5("|".join(ids).encode()).hexdigest()
+async def _classify_with_llm(emails: list[dict]) -> dict[str, str]:
+    """Classify emails in concurrent chunks, retrying emails missing from the answers."""
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_CHUNKS)
+
+    async def _run(chunk):
+        async with semaphore:
+            try:
+                return await _classify_chunk(chunk)
+            except Exception as e:
+                logger.error("Email classification chunk of %d failed: %s", len(chunk), e)
+                return {}
+
+    id_to_category = {}
+    pending = emails
+    for attempt in range(MAX_RETRIES + 1):
+        chunks = _chunk_emails(pending)
+        for result in await asyncio.gather(*(_run(chunk) for chunk in chunks)):
+            id_to_category.update(result)
+        pending = [e for e in pending if e.get("id") not in id_to_category]
+        if not pending:
+            break
+        logger.warning("classify_emails: %d emails missing after pass %d", len(pending), attempt + 1)
+
+    return id_to_category
 
 
 async def classify_emails(emails: list[dict]) -> list[dict]:
-    """Classify emails into categories using Azure OpenAI (with cache)."""
+    """Classify emails into categories using Azure OpenAI (cached per message ID)."""
     if not emails:
         return emails
 
-    # Check cache
-    cache_key = _make_cache_key(emails)
-    cached = _cache.get(cache_key)
-    if cached and (time.time() - cached["timestamp"]) < CACHE_TTL:
+    cache = get_classification_cache() or {}
+    unseen = [e for e in emails if e.get("id") not in cache]
+
+    classified = {}
+    if unseen:
+        logger.info("classify_emails: %d cached, classifying %d new emails",
+                    len(emails) - len(unseen), len(unseen))
+        try:
+            classified = await _classify_with_llm(unseen)
+        except Exception as e:
+            # Unclassified emails fall back to "other" and are retried next time
+            logger.error("Email classification failed: %s", e, exc_info=True)
+    else:
         logger.info("classify_emails: cache hit (%d emails)", len(emails))
-        id_to_category = cached["classifications"]
-        for email in emails:
-            email["category"] = id_to_category.get(email.get("id"), "other")
-        return emails
-
-    logger.info("classify_emails: cache miss, classifying %d emails", len(emails))
-
-    lines = []
-    for i, email in enumerate(emails, 1):
-        sender = email.get("from", "")
-        subject = email.get("subject", "")
-        snippet = email.get("snippet", "")[:120]
-        lines.append(f"{i}. From: {sender} | Subject: {subject} | Snippet: {snippet}")
-
-    user_message = "\n".join(lines)
-
-    try:
-        client = AsyncAzureOpenAI(
-            azure_endpoint=AZURE_OPENAI_ENDPOINT,
-            api_key=AZURE_OPENAI_KEY,
-            api_version=AZURE_OPENAI_API_VERSION,
-        )
-
-        response = await client.chat.completions.create(
-            model=AZURE_OPENAI_DEPLOYMENT,
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": user_message},
-            ],
-            response_format={"type": "json_object"},
-            max_tokens=256,
-            temperature=0,
-        )
-
-        raw = response.choices[0].message.content
-        classifications = json.loads(raw)
-
-        # Map by email ID for cache storage
-        id_to_category = {}
-        for i, email in enumerate(emails, 1):
-            cat = classifications.get(str(i), "other")
-            email["category"] = cat
-            id_to_category[email.get("id")] = cat
 
-        # Store in cache
-        _cache[cache_key] = {"classifications": id_to_category, "timestamp": time.time()}
-        logger.info("classify_emails: cached %d classifications", len(emails))
+    used = [e.get("id") for e in emails if e.get("id") in cache]
+    # The merge holds the shared store's lock: keep it off the event loop
+    cache = await asyncio.to_thread(_remember, classified, used)
 
-    except Exception as e:
-        logger.error("Email classification failed: %s", e, exc_info=True)
-        for email in emails:
-            email["category"] = "other"
+    for email in emails:
+        email["category"] = cache.get(email.get("id"), "other")
 
     return emails
@@ -0,0 +1,106 @@
+import asyncio
+import base64
+import json
+import logging
+
+from app.services.data_cache import (
+    ExpenseSet,
+    expenses_version,
+    filter_expenses,
+    get_expenses_cache,
+    set_expenses_cache,
+)
+
+logger = logging.getLogger(__name__)
+
+USER_ID = "fede"
+
+_load_lock = asyncio.Lock()
+
+
+async def _load_expenses(container) -> ExpenseSet:
+    """Read every expense once and make the set resident in the cache."""
+    query = (
+        "SELECT * FROM c WHERE c.userId = @userId "
+        "AND (c.type = 'expense' OR NOT IS_DEFINED(c.type))"
+    )
+    params = [{"name": "@userId", "value": USER_ID}]
+
+    version = expenses_version()
+    items = []
+    async for item in container.query_items(query=query, parameters=params):
+        items.append(item)
+
+    # A write that landed while we were reading isn't in items: don't cache a stale set
+    expenses = await set_expenses_cache(items, expected_version=version)
+    if expenses is None:
+        return ExpenseSet(items)
+    logger.info("Expense cache loaded: %d expenses", len(items))
+    return expenses
+
+
+async def get_all_expenses(container) -> ExpenseSet:
+    """The complete expense set, from the write-through cache (loaded on first use)."""
+    expenses = get_expenses_cache()
+    if expenses is not None:
+        return expenses
+    async with _load_lock:
+        expenses = get_expenses_cache()
+        if expenses is None:
+            expenses = await _load_expenses(container)
+    return expenses
+
+
+async def find_expenses(
+    container,
+    category: str | None = None,
+    start_date: str | None = None,
+    end_date: str | None = None,
+    folder_id: str | None = None,
+    payment_method: str | None = None,
+    limit: int | None = None,
+    after: tuple[str, str] | None = None,
+) -> list[dict]:
+    """Filtered expenses, newest first, answered in memory."""
+    return filter_expenses(
+        await get_all_expenses(container),
+        category=category,
+        start_date=start_date,
+        end_date=end_date,
+        folder_id=folder_id,
+        payment_method=payment_method,
+        limit=limit,
+        after=after,
+    )
+
+
+# --- Keyset pagination ---
+# The cursor is the (date, id) of the last expense on the previous page, so
+# every page costs the same however far back it is (no OFFSET to skip over).
+
+def encode_cursor(expense: dict) -> str:
+    raw = json.dumps([expense.get("date", ""), expense["id"]]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    """Raises ValueError for a cursor this server didn't produce."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        date, expense_id = json.loads(raw)
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(date, str) or not isinstance(expense_id, str):
+        raise ValueError("Invalid cursor")
+    return date, expense_id
+
+
+async def find_expenses_page(container, limit: int, cursor: str | None = None,
+                             **filters) -> tuple[list[dict], str | None]:
+    """One page of filtered expenses plus the cursor of the next page (None on the last)."""
+    after = decode_cursor(cursor) if cursor else None
+    items = await find_expenses(container, limit=limit + 1, after=after, **filters)
+    if len(items) <= limit:
+        return items, None
+    items = items[:limit]
+    return items, encode_cursor(items[-1])
@@ -0,0 +1,83 @@
+from collections import OrderedDict
+
+from app.services.data_cache import filter_expenses
+from app.services.expense_queries import get_all_expenses
+
+# Recent summaries, keyed on the resident expense set's stamp (every write
+# moves it) plus the filters. Only the summaries are kept, never expenses,
+# and entries for an older stamp are dropped as soon as the stamp moves.
+MAX_MEMOIZED = 32
+_memo: OrderedDict[tuple, dict] = OrderedDict()
+
+
+def _add(groups: dict, key: str, amount: float):
+    groups[key] = groups.get(key, 0) + amount
+
+
+def _rounded(groups: dict) -> dict:
+    return {key: round(value, 2) for key, value in groups.items()}
+
+
+def summarize_expenses(expenses: list[dict]) -> dict:
+    """Roll expenses up into totals per category, month, category-month and day.
+
+    Amounts are summed across currencies (as the dashboard shows them);
+    "totals" keeps the per-currency split.
+    """
+    total = 0
+    totals: dict[str, float] = {}
+    by_category: dict[str, float] = {}
+    by_month: dict[str, float] = {}
+    by_day: dict[str, float] = {}
+    by_category_month: dict[str, dict[str, float]] = {}
+
+    for expense in expenses:
+        amount = expense.get("amount", 0)
+        category = (expense.get("category") or "uncategorized").lower()
+        date = expense.get("date", "")
+        month = date[:7] if len(date) >= 7 else "unknown"
+
+        total += amount
+        _add(totals, expense.get("currency", "EUR"), amount)
+        _add(by_category, category, amount)
+        _add(by_month, month, amount)
+        _add(by_day, date or "unknown", amount)
+        _add(by_category_month.setdefault(month, {}), category, amount)
+
+    return {
+        "count": len(expenses),
+        "total": round(total, 2),
+        "totals": _rounded(totals),
+        "byCategory": _rounded(by_category),
+        "byMonth": _rounded(by_month),
+        "byDay": _rounded(by_day),
+        "byCategoryMonth": {month: _rounded(groups) for month, groups in by_category_month.items()},
+    }
+
+
+async def get_expense_summary(
+    container,
+    start_date: str | None = None,
+    end_date: str | None = None,
+    category: str | None = None,
+    folder_id: str | None = None,
+) -> dict:
+    """Summary of the matching expenses, computed from the resident expense cache."""
+    expenses = await get_all_expenses(container)
+    key = (expenses.stamp, start_date, end_date, category, folder_id)
+    memoized = _memo.get(key)
+    if memoized is not None:
+        _memo.move_to_end(key)
+        return memoized
+
+    summary = summarize_expenses(filter_expenses(
+        expenses, category=category, start_date=start_date, end_date=end_date, folder_id=folder_id,
+    ))
+    if expenses.generation is None:
+        return summary  # a set loaded during a racing write isn't cached: nothing to key on
+    if _memo and next(iter(_memo))[0] != expenses.stamp:
+        _memo.clear()
+    _memo[key] = summary
+    while len(_memo) > MAX_MEMOIZED:
+        _memo.popitem(last=False)
+    return summary
@@ -0,0 +1,87 @@
+import logging
+
+from azure.cosmos.exceptions import CosmosResourceNotFoundError
+
+from app.database.documents import (
+    DocumentNotFound,
+    PreconditionFailed,
+    patch_document,
+    set_operations,
+)
+from app.services.data_cache import apply_expenses_delta
+from app.services.folder_stats import record_expense_change
+
+logger = logging.getLogger(__name__)
+
+USER_ID = "fede"
+
+# Fields that feed folder stats: changing them needs the previous values
+STATS_FIELDS = ("amount", "currency", "folderId")
+# Read + conditional patch attempts when another edit lands in between
+MAX_ATTEMPTS = 3
+
+
+async def create_expense(container, expense: dict) -> dict:
+    """Create an expense, counting it in its folder's stats and the expense cache."""
+    created = await container.create_item(body=expense)
+    await record_expense_change(container, None, expense)
+    await apply_expenses_delta(upserts=[created])
+    return expense
+
+
+async def delete_expense(container, expense_id: str) -> dict:
+    """Delete an expense and return it. Raises DocumentNotFound."""
+    try:
+        expense = await container.read_item(item=expense_id, partition_key=USER_ID)
+        if expense.get("type", "expense") != "expense":
+            raise DocumentNotFound(expense_id)
+        await container.delete_item(item=expense_id, partition_key=USER_ID)
+    except CosmosResourceNotFoundError:
+        raise DocumentNotFound(expense_id)
+    await record_expense_change(container, expense, None)
+    await apply_expenses_delta(deleted_ids=[expense_id])
+    return expense
+
+
+async def update_expense_fields(container, expense_id: str, updates: dict,
+                                etag: str | None = None) -> dict:
+    """Patch only the given fields of an expense and return the updated document.
+
+    Edits that leave amount, currency and folderId alone are a single patch.
+    Edits that touch them read the expense first (for the folder stats delta)
+    and patch on that read's ETag, retrying if a concurrent edit got in first.
+    Raises DocumentNotFound, or PreconditionFailed when the caller's etag is stale.
+    """
+    operations = set_operations(updates)
+
+    if not any(field in updates for field in STATS_FIELDS):
+        try:
+            after = await patch_document(container, expense_id, operations, doc_type="expense", etag=etag)
+        except PreconditionFailed:
+            if etag:
+                raise
+            raise DocumentNotFound(expense_id)  # the ID belongs to a folder
+        await apply_expenses_delta(upserts=[after])
+        return after
+
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        try:
+            before = await container.read_item(item=expense_id, partition_key=USER_ID)
+        except CosmosResourceNotFoundError:
+            raise DocumentNotFound(expense_id)
+        if before.get("type", "expense") != "expense":
+            raise DocumentNotFound(expense_id)
+        if etag and before.get("_etag") != etag:
+            raise PreconditionFailed(expense_id)
+
+        try:
+            after = await patch_document(container, expense_id, operations, etag=before.get("_etag"))
+        except PreconditionFailed:
+            if etag or attempt == MAX_ATTEMPTS:
+                raise
+            logger.info("Expense %s changed during update, retrying (%d)", expense_id, attempt)
+            continue
+
+        await record_expense_change(container, before, after)
+        await apply_expenses_delta(upserts=[after])
+        return after
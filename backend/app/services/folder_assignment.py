@@ -0,0 +1,202 @@
+import asyncio
+import logging
+
+from app.database.documents import TYPE_PREDICATES, patch_document, sql_string
+from app.services.data_cache import apply_expenses_delta
+from app.services.folder_stats import add_expense_delta, apply_deltas, record_expense_change
+
+logger = logging.getLogger(__name__)
+
+USER_ID = "fede"
+
+# Cosmos transactional batches are limited to 100 operations per partition key
+BATCH_SIZE = 100
+# Per-item fallback when a batch is rejected (e.g. one expense deleted meanwhile)
+MAX_CONCURRENT_PATCHES = 10
+# Conditional patch rounds when expenses move concurrently
+MAX_ATTEMPTS = 3
+
+
+async def _fetch_expenses(container, expense_ids: list[str]) -> dict[str, dict]:
+    """Load many expenses in one single-partition query instead of N point reads."""
+    query = (
+        "SELECT * FROM c WHERE c.userId = @userId AND ARRAY_CONTAINS(@ids, c.id) "
+        "AND (c.type = 'expense' OR NOT IS_DEFINED(c.type))"
+    )
+    params = [
+        {"name": "@userId", "value": USER_ID},
+        {"name": "@ids", "value": expense_ids},
+    ]
+    found = {}
+    async for item in container.query_items(query=query, parameters=params):
+        found[item["id"]] = item
+    return found
+
+
+async def _patch_each(container, operations: list[tuple]) -> dict[str, tuple[dict | None, Exception | None]]:
+    """Patch items one by one with bounded concurrency. Returns {id: (patched document, error)}."""
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_PATCHES)
+
+    async def _patch(item_id, patch_operations, condition):
+        async with semaphore:
+            try:
+                return item_id, (await container.patch_item(
+                    item=item_id, partition_key=USER_ID, patch_operations=patch_operations,
+                    filter_predicate=condition,
+                ), None)
+            except Exception as e:
+                return item_id, (None, e)
+
+    return dict(await asyncio.gather(*(_patch(*operation) for operation in operations)))
+
+
+async def _patch_all(container, operations: list[tuple]) -> dict[str, tuple[dict | None, Exception | None]]:
+    """Apply (id, patch operations, filter predicate) in transactional batches, falling back
+    to per-item patches on failure. Returns {id: (patched document, error)}."""
+    results: dict[str, tuple[dict | None, Exception | None]] = {}
+    for i in range(0, len(operations), BATCH_SIZE):
+        chunk = operations[i:i + BATCH_SIZE]
+        try:
+            responses = await container.execute_item_batch(
+                batch_operations=[
+                    ("patch", (item_id, ops), {"filter_predicate": condition})
+                    for item_id, ops, condition in chunk
+                ],
+                partition_key=USER_ID,
+            )
+            results.update(
+                (item_id, (response["resourceBody"], None))
+                for (item_id, _, _), response in zip(chunk, responses)
+            )
+        except Exception as e:
+            logger.warning("Batch of %d patches rejected (%s), retrying per item", len(chunk), e)
+            results.update(await _patch_each(container, chunk))
+    return results
+
+
+def _in_folder(folder_id: str | None) -> str:
+    """Filter predicate: the expense is (still) in folder_id, or in no folder when None."""
+    if folder_id is None:
+        condition = "(NOT IS_DEFINED(c.folderId) OR IS_NULL(c.folderId))"
+    else:
+        condition = f"c.folderId = {sql_string(folder_id)}"
+    return f"FROM c WHERE {TYPE_PREDICATES['expense']} AND {condition}"
+
+
+def _precondition_failed(error: Exception | None) -> bool:
+    return getattr(error, "status_code", None) == 412
+
+
+async def set_expenses_folder(container, expense_ids: list[str], folder_id: str | None,
+                              only_from_folder: str | None = None) -> list[dict]:
+    """Assign expenses to folder_id (or unassign them when folder_id is None).
+
+    only_from_folder restricts an unassign to expenses currently in that folder.
+    Returns one result per requested ID, in order:
+    {"id", "status": "updated" | "unchanged" | "not_found" | "failed", "error"},
+    plus "expense" (the document after the change) for expenses that exist.
+
+    Each patch only applies if the expense is still in the folder it was read
+    in, and the stats delta is taken from the patched documents. So a
+    concurrent move of the same expense is never counted twice or lost: the
+    expenses it moved are re-read and retried.
+    """
+    expense_ids = list(dict.fromkeys(expense_ids))
+    expenses = await _fetch_expenses(container, expense_ids) if expense_ids else {}
+
+    statuses: dict[str, dict] = {}
+    deltas: dict = {}
+    pending = expense_ids
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        operations = []
+        for expense_id in pending:
+            expense = expenses.get(expense_id)
+            if expense is None:
+                statuses[expense_id] = {"id": expense_id, "status": "not_found", "error": None}
+            elif expense.get("folderId") == folder_id or (
+                only_from_folder is not None and expense.get("folderId") != only_from_folder
+            ):
+                statuses[expense_id] = {"id": expense_id, "status": "unchanged", "error": None, "expense": expense}
+            elif folder_id is None:
+                operations.append((expense_id, [{"op": "remove", "path": "/folderId"}],
+                                   _in_folder(expense.get("folderId"))))
+            else:
+                operations.append((expense_id, [{"op": "set", "path": "/folderId", "value": folder_id}],
+                                   _in_folder(expense.get("folderId"))))
+
+        results = await _patch_all(container, operations) if operations else {}
+
+        moved = []
+        for expense_id, (after, error) in results.items():
+            if error is None:
+                # The predicate guarantees the folder it left; amounts come from the patched document
+                add_expense_delta(deltas, {**after, "folderId": expenses[expense_id].get("folderId")}, -1)
+                add_expense_delta(deltas, after, +1)
+                statuses[expense_id] = {"id": expense_id, "status": "updated", "error": None, "expense": after}
+            elif _precondition_failed(error) and attempt < MAX_ATTEMPTS:
+                moved.append(expense_id)
+            else:
+                statuses[expense_id] = {
+                    "id": expense_id, "status": "failed", "error": str(error), "expense": expenses[expense_id],
+                }
+        if not moved:
+            break
+
+        logger.info("%d expense(s) moved during folder assignment, retrying (%d)", len(moved), attempt)
+        fresh = await _fetch_expenses(container, moved)
+        for expense_id in moved:
+            expenses[expense_id] = fresh.get(expense_id)
+        pending = moved
+
+    await apply_deltas(container, deltas)
+    await apply_expenses_delta(upserts=[r["expense"] for r in statuses.values() if r["status"] == "updated"])
+    return [statuses[expense_id] for expense_id in expense_ids]
+
+
+async def remove_from_folder(container, expense_id: str, folder_id: str) -> dict:
+    """Take one expense out of folder_id with a single conditional patch.
+
+    Returns the updated expense. Raises DocumentNotFound, or PreconditionFailed
+    when the expense isn't in that folder. The patch response carries every
+    field the stats delta needs, so no read is required.
+    """
+    after = await patch_document(
+        container, expense_id, [{"op": "remove", "path": "/folderId"}],
+        doc_type="expense", condition=f"c.folderId = {sql_string(folder_id)}",
+    )
+    await record_expense_change(container, {**after, "folderId": folder_id}, after)
+    await apply_expenses_delta(upserts=[after])
+    return after
+
+
+async def unassign_folder(container, folder_id: str) -> list[dict]:
+    """Remove folder_id from every expense in it (used when deleting the folder).
+
+    No stats are written: the folder document is about to be deleted.
+    """
+    query = (
+        "SELECT * FROM c WHERE c.userId = @userId AND c.folderId = @folderId "
+        "AND (c.type = 'expense' OR NOT IS_DEFINED(c.type))"
+    )
+    params = [
+        {"name": "@userId", "value": USER_ID},
+        {"name": "@folderId", "value": folder_id},
+    ]
+    expenses = {}
+    async for item in container.query_items(query=query, parameters=params):
+        expenses[item["id"]] = item
+
+    operations = [
+        (expense_id, [{"op": "remove", "path": "/folderId"}], _in_folder(folder_id)) for expense_id in expenses
+    ]
+    results = await _patch_all(container, operations) if operations else {}
+    await apply_expenses_delta(upserts=[after for after, error in results.values() if error is None])
+    # A failed precondition means the expense already left the folder: nothing to undo
+    return [
+        {
+            "id": expense_id,
+            "status": "updated" if error is None else "unchanged" if _precondition_failed(error) else "failed",
+            "error": str(error) if error is not None and not _precondition_failed(error) else None,
+        }
+        for expense_id, (_, error) in results.items()
+    ]
@@ -0,0 +1,158 @@
+# Per-folder expense aggregates, stored on the folder document:
+#   expenseCount, total (all currencies, as the UI shows it),
+#   totals ({currency: sum}) and lastActivity.
+# Every expense write reports the expense before/after the change and the
+# difference is applied with Cosmos patch "incr" operations, so listing
+# folders never scans expenses. reconcile_folder_stats() repairs drift.
+
+import logging
+from datetime import datetime, timezone
+
+from app.services.data_cache import bump_data_version
+
+logger = logging.getLogger(__name__)
+
+USER_ID = "fede"
+
+STATS_FIELDS = ("expenseCount", "total", "totals", "lastActivity")
+
+# Cosmos transactional batches are limited to 100 operations
+STATS_BATCH_SIZE = 100
+
+
+def empty_stats() -> dict:
+    return {"expenseCount": 0, "total": 0, "totals": {}, "lastActivity": None}
+
+
+def add_expense_delta(deltas: dict, expense: dict | None, sign: int):
+    """Accumulate an expense's contribution (sign=+1 added, -1 removed) into deltas."""
+    if not expense or not expense.get("folderId"):
+        return
+    delta = deltas.setdefault(expense["folderId"], {"count": 0, "totals": {}})
+    currency = expense.get("currency", "EUR")
+    delta["count"] += sign
+    delta["totals"][currency] = delta["totals"].get(currency, 0) + sign * expense.get("amount", 0)
+
+
+def _patch_operations(delta: dict, now: str) -> list[dict]:
+    total = sum(delta["totals"].values())
+    operations = [
+        {"op": "incr", "path": "/expenseCount", "value": delta["count"]},
+        {"op": "incr", "path": "/total", "value": total},
+        {"op": "set", "path": "/lastActivity", "value": now},
+    ]
+    for currency, amount in delta["totals"].items():
+        operations.append({"op": "incr", "path": f"/totals/{currency}", "value": amount})
+    return operations
+
+
+async def _patch_folder(container, folder_id: str, operations: list[dict]):
+    try:
+        await container.patch_item(item=folder_id, partition_key=USER_ID, patch_operations=operations)
+    except Exception as e:
+        # Folder deleted meanwhile, or a legacy folder without a "totals"
+        # object: recompute this folder from its expenses instead.
+        logger.warning("Folder stats patch failed for %s (%s), reconciling", folder_id, e)
+        await reconcile_folder_stats(container, folder_id)
+
+
+async def apply_deltas(container, deltas: dict):
+    """Patch every affected folder document with its accumulated delta.
+
+    Several folders go out as one transactional batch (a bulk move touches
+    every source folder); if the batch is rejected each folder is retried alone.
+    """
+    now = datetime.now(timezone.utc).isoformat()
+    patches = [
+        (folder_id, _patch_operations(delta, now))
+        for folder_id, delta in deltas.items()
+        if delta["count"] != 0 or any(delta["totals"].values())
+    ]
+    if len(patches) == 1:
+        await _patch_folder(container, *patches[0])
+        return
+
+    for i in range(0, len(patches), STATS_BATCH_SIZE):
+        chunk = patches[i:i + STATS_BATCH_SIZE]
+        try:
+            await container.execute_item_batch(
+                batch_operations=[("patch", (folder_id, ops)) for folder_id, ops in chunk],
+                partition_key=USER_ID,
+            )
+        except Exception as e:
+            logger.warning("Folder stats batch rejected (%s), patching folders one by one", e)
+            for folder_id, ops in chunk:
+                await _patch_folder(container, folder_id, ops)
+
+
+async def record_expense_change(container, before: dict | None, after: dict | None):
+    """Update folder stats for one expense write (create: before=None, delete: after=None)."""
+    deltas: dict = {}
+    add_expense_delta(deltas, before, -1)
+    add_expense_delta(deltas, after, +1)
+    await apply_deltas(container, deltas)
+
+
+async def reconcile_folder_stats(container, folder_id: str | None = None) -> int:
+    """Recompute stats from expenses for one folder (or all). Returns folders repaired."""
+    folder_query = "SELECT * FROM c WHERE c.userId = @userId AND c.type = 'folder'"
+    folder_params = [{"name": "@userId", "value": USER_ID}]
+    stats_query = (
+        "SELECT c.folderId, c.amount, c.currency, c.createdAt FROM c "
+        "WHERE c.userId = @userId AND IS_DEFINED(c.folderId) AND c.folderId != null "
+        "AND (c.type = 'expense' OR NOT IS_DEFINED(c.type))"
+    )
+    stats_params = [{"name": "@userId", "value": USER_ID}]
+    if folder_id:
+        folder_query += " AND c.id = @folderId"
+        folder_params.append({"name": "@folderId", "value": folder_id})
+        stats_query += " AND c.folderId = @folderId"
+        stats_params.append({"name": "@folderId", "value": folder_id})
+
+    stats_map: dict[str, dict] = {}
+    async for item in container.query_items(query=stats_query, parameters=stats_params):
+        stats = stats_map.setdefault(item["folderId"], empty_stats())
+        currency = item.get("currency", "EUR")
+        stats["expenseCount"] += 1
+        stats["total"] += item.get("amount", 0)
+        stats["totals"][currency] = stats["totals"].get(currency, 0) + item.get("amount", 0)
+        if item.get("createdAt") and (stats["lastActivity"] or "") < item["createdAt"]:
+            stats["lastActivity"] = item["createdAt"]
+
+    repaired = 0
+    async for folder in container.query_items(query=folder_query, parameters=folder_params):
+        stats = stats_map.get(folder["id"], empty_stats())
+        stats["lastActivity"] = folder.get("lastActivity") or stats["lastActivity"]
+        current = {field: folder.get(field) for field in STATS_FIELDS}
+        if _same_stats(current, stats):
+            continue
+        folder.update(stats)
+        await container.replace_item(item=folder["id"], body=folder)
+        repaired += 1
+
+    if repaired:
+        bump_data_version("folders")
+        logger.info("Folder stats reconciled: %d folder(s) repaired", repaired)
+    return repaired
+
+
+def _same_stats(current: dict, expected: dict) -> bool:
+    if current["expenseCount"] != expected["expenseCount"]:
+        return False
+    if current["total"] is None or round(current["total"], 2) != round(expected["total"], 2):
+        return False
+    if current["totals"] is None:
+        return False
+    totals = current["totals"]
+    currencies = set(totals) | set(expected["totals"])
+    return all(
+        round(totals.get(c, 0), 2) == round(expected["totals"].get(c, 0), 2) for c in currencies
+    )
+
+
+def public_stats(folder: dict) -> dict:
+    """Round float totals accumulated through incremental patches."""
+    folder["expenseCount"] = folder.get("expenseCount", 0)
+    folder["total"] = round(folder.get("total", 0), 2)
+    folder["totals"] = {c: round(v, 2) for c, v in (folder.get("totals") or {}).items()}
+    return folder
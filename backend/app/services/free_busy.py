@@ -0,0 +1,138 @@
+"""Free/busy engine: free slots over several days and calendars.
+
+Busy periods from one freebusy call (every calendar, the whole date range)
+are merged into an IntervalSet and subtracted from the working-hours
+windows of each day. All arithmetic is done on aware UTC datetimes, so DST
+changes and calendars in other timezones need no special casing. Working
+hours are wall-clock times in the user's timezone, so on a DST day the
+window "09:00-18:00" is still nine hours from 09:00 local.
+"""
+
+import bisect
+from datetime import date, datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from app.services.google_calendar import query_freebusy
+
+Interval = tuple[datetime, datetime]  # aware, UTC, start < end
+
+# Working-hours templates: weekdays (Monday = 0) the working hours apply to
+WORKING_DAYS = {
+    "all": frozenset(range(7)),
+    "weekdays": frozenset(range(5)),
+    "weekends": frozenset((5, 6)),
+}
+
+# Longest range one freebusy call covers
+MAX_RANGE_DAYS = 31
+
+
+def _utc(value: datetime) -> datetime:
+    return value.astimezone(timezone.utc)
+
+
+def parse_time(value: str) -> datetime:
+    """An RFC 3339 timestamp from the Calendar API, in UTC."""
+    return _utc(datetime.fromisoformat(value))
+
+
+class IntervalSet:
+    """Disjoint intervals sorted by start: overlapping and touching inputs are merged."""
+
+    def __init__(self, intervals=()):
+        merged: list[list[datetime]] = []
+        for start, end in sorted((_utc(s), _utc(e)) for s, e in intervals if s < e):
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        self.intervals: list[Interval] = [(start, end) for start, end in merged]
+        self._ends = [end for _, end in self.intervals]
+
+    def __len__(self) -> int:
+        return len(self.intervals)
+
+    def overlapping(self, start: datetime, end: datetime) -> list[Interval]:
+        """Intervals intersecting [start, end)."""
+        first = bisect.bisect_right(self._ends, start)
+        result = []
+        for interval in self.intervals[first:]:
+            if interval[0] >= end:
+                break
+            result.append(interval)
+        return result
+
+    def gaps(self, start: datetime, end: datetime) -> list[Interval]:
+        """The parts of [start, end) no interval covers."""
+        start, end = _utc(start), _utc(end)
+        free = []
+        cursor = start
+        for busy_start, busy_end in self.overlapping(start, end):
+            if busy_start > cursor:
+                free.append((cursor, busy_start))
+            cursor = max(cursor, busy_end)
+        if cursor < end:
+            free.append((cursor, end))
+        return free
+
+
+def working_windows(start_date: date, end_date: date, tz: ZoneInfo, day_start: time, day_end: time,
+                    days: str = "all") -> list[Interval]:
+    """Each day's working hours between start_date and end_date (inclusive), in UTC."""
+    if days not in WORKING_DAYS:
+        raise ValueError(f"Unknown working days '{days}' (expected one of: {', '.join(WORKING_DAYS)})")
+    if day_start >= day_end:
+        raise ValueError("Working hours must end after they start")
+    windows = []
+    day = start_date
+    while day <= end_date:
+        if day.weekday() in WORKING_DAYS[days]:
+            windows.append((
+                _utc(datetime.combine(day, day_start, tzinfo=tz)),
+                _utc(datetime.combine(day, day_end, tzinfo=tz)),
+            ))
+        day += timedelta(days=1)
+    return windows
+
+
+def free_slots(windows: list[Interval], busy: IntervalSet, min_duration: timedelta = timedelta(0)) -> list[Interval]:
+    """Free parts of the windows at least min_duration long, in order."""
+    return [
+        slot
+        for window_start, window_end in windows
+        for slot in busy.gaps(window_start, window_end)
+        if slot[1] - slot[0] >= min_duration
+    ]
+
+
+def meeting_slots(free: list[Interval], duration: timedelta, count: int) -> list[Interval]:
+    """The first count meeting times of the given length, back to back within each free slot."""
+    slots = []
+    for start, end in free:
+        while start + duration <= end:
+            if len(slots) >= count:
+                return slots
+            slots.append((start, start + duration))
+            start += duration
+    return slots
+
+
+async def query_busy(time_min: datetime, time_max: datetime, calendar_ids: list[str]) -> tuple[IntervalSet, dict]:
+    """Busy periods of every calendar between time_min and time_max, from one freebusy call.
+
+    Returns the merged busy intervals and {calendar id: error reason} for
+    calendars Google couldn't read.
+    """
+    body = {
+        "timeMin": _utc(time_min).isoformat(),
+        "timeMax": _utc(time_max).isoformat(),
+        "items": [{"id": calendar_id} for calendar_id in calendar_ids],
+    }
+    result = await query_freebusy(body)
+
+    busy, errors = [], {}
+    for calendar_id, calendar in result.get("calendars", {}).items():
+        if calendar.get("errors"):
+            errors[calendar_id] = calendar["errors"][0].get("reason", "unknown")
+        busy.extend((parse_time(slot["start"]), parse_time(slot["end"])) for slot in calendar.get("busy", []))
+    return IntervalSet(busy), errors
@@ -1,47 +1,99 @@
+import asyncio
 import base64
 import logging
 from email.mime.text import MIMEText
 
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-
-from app import config
+from app.services import google_api
 
 logger = logging.getLogger(__name__)
 
-_service = None
+GMAIL_PATH = "/gmail/v1/users/me"
+
+# Message fetches in flight at once (they share the pooled HTTP/2 connection)
+FETCH_CONCURRENCY = 20
+
+METADATA_HEADERS = ["From", "To", "Subject", "Date"]
+
+
+async def list_messages(q: str = "", max_results: int = 20, label_ids: list[str] | None = None) -> dict:
+    return await google_api.request("GET", f"{GMAIL_PATH}/messages", params={
+        "q": q, "maxResults": max_results, "labelIds": label_ids,
+    })
+
+
+async def get_message(message_id: str, fmt: str = "full", metadata_headers: list[str] | None = None) -> dict:
+    return await google_api.request("GET", f"{GMAIL_PATH}/messages/{message_id}", params={
+        "format": fmt, "metadataHeaders": metadata_headers,
+    })
+
+
+async def send_message(raw: str, thread_id: str | None = None) -> dict:
+    body = {"raw": raw}
+    if thread_id:
+        body["threadId"] = thread_id
+    return await google_api.request("POST", f"{GMAIL_PATH}/messages/send", json=body)
+
+
+async def get_profile() -> dict:
+    return await google_api.request("GET", f"{GMAIL_PATH}/profile")
+
+
+async def list_history(start_history_id: str, history_types: list[str], page_token: str | None = None) -> dict:
+    return await google_api.request("GET", f"{GMAIL_PATH}/history", params={
+        "startHistoryId": start_history_id, "historyTypes": history_types, "pageToken": page_token,
+    })
 
-SCOPES = [
-    "https://www.googleapis.com/auth/gmail.modify",
-    "https://www.googleapis.com/auth/gmail.send",
-]
 
+async def fetch_messages(message_ids, fmt="metadata", metadata_headers=None):
+    """Fetch many messages concurrently, preserving input order.
 
-def get_gmail_service():
-    """Return the Gmail API v1 service, creating it lazily."""
-    global _service
+    Returns one dict per requested ID: {"id", "message", "error", "status"}.
+    Exactly one of "message" / "error" is set, so callers can report failures
+    per item. status is the HTTP status of a failed fetch (0 if Gmail couldn't
+    be reached), so callers can tell a gone message from a transient error.
+    """
+    if metadata_headers is None and fmt == "metadata":
+        metadata_headers = METADATA_HEADERS
 
-    if _service is not None:
-        return _service
+    semaphore = asyncio.Semaphore(FETCH_CONCURRENCY)
 
-    if not config.GOOGLE_CLIENT_ID or not config.GOOGLE_CLIENT_SECRET or not config.GOOGLE_REFRESH_TOKEN:
-        raise RuntimeError(
-            "Gmail not configured. "
-            "Set GOOGLE_CLIENT_ID, GOOGLE_CLIENT_SECRET, and GOOGLE_REFRESH_TOKEN in .env"
-        )
+    async def _fetch(message_id):
+        async with semaphore:
+            try:
+                return message_id, (await get_message(message_id, fmt, metadata_headers), None)
+            except Exception as e:
+                return message_id, (None, e)
 
-    creds = Credentials(
-        token=None,
-        refresh_token=config.GOOGLE_REFRESH_TOKEN,
-        token_uri="https://oauth2.googleapis.com/token",
-        client_id=config.GOOGLE_CLIENT_ID,
-        client_secret=config.GOOGLE_CLIENT_SECRET,
-        scopes=SCOPES,
-    )
+    # Duplicate IDs are fetched once
+    responses = dict(await asyncio.gather(*(_fetch(i) for i in dict.fromkeys(message_ids))))
 
-    _service = build("gmail", "v1", credentials=creds)
-    logger.info("Gmail service initialized")
-    return _service
+    results = []
+    for message_id in message_ids:
+        msg, error = responses[message_id]
+        if error is not None:
+            logger.warning("Failed to fetch email %s: %s", message_id, error)
+        results.append({
+            "id": message_id,
+            "message": msg,
+            "error": str(error) if error is not None else None,
+            "status": getattr(error, "status", 0) if error is not None else None,
+        })
+    return results
+
+
+def _parse_metadata(msg):
+    """Extract list-view fields (no body) from a Gmail API message dict."""
+    headers = {h["name"].lower(): h["value"] for h in msg.get("payload", {}).get("headers", [])}
+    return {
+        "id": msg.get("id"),
+        "threadId": msg.get("threadId"),
+        "snippet": msg.get("snippet", ""),
+        "labelIds": msg.get("labelIds", []),
+        "from": headers.get("from", ""),
+        "to": headers.get("to", ""),
+        "subject": headers.get("subject", ""),
+        "date": headers.get("date", ""),
+    }
 
 
 def _parse_message(msg):
@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import time
+
+from app.services.gmail import fetch_messages, get_profile, list_history, list_messages, _parse_metadata
+from app.services.google_api import GoogleApiError
+from app.services.data_cache import get_gmail_mirror_cache, set_gmail_mirror_cache
+
+logger = logging.getLogger(__name__)
+
+MIRROR_LABEL = "INBOX"
+MIRROR_SIZE = 100  # newest N inbox messages kept locally
+SYNC_INTERVAL = 60  # seconds before a read triggers a history sync
+
+HISTORY_TYPES = ["messageAdded", "messageDeleted", "labelAdded", "labelRemoved"]
+
+# Mirror state: { "historyId": str, "messages": { id: metadata }, "pending": [id], "syncedAt": float }
+# pending holds inbox messages whose fetch failed transiently: the next sync
+# retries them, since historyId has already moved past the records adding them.
+# The state lives in data_cache, so every worker serves the latest sync.
+_lock = asyncio.Lock()
+
+
+def _sorted_messages(messages: dict) -> list[dict]:
+    return sorted(messages.values(), key=lambda m: int(m.get("internalDate") or 0), reverse=True)
+
+
+def _to_entry(msg: dict) -> dict:
+    entry = _parse_metadata(msg)
+    entry["internalDate"] = msg.get("internalDate", "0")
+    return entry
+
+
+def _is_permanent(status: int) -> bool:
+    # 404: deleted meanwhile. Other 4xx won't succeed on retry either; 429 will.
+    return 400 <= status < 500 and status != 429
+
+
+async def _fetch_entries(message_ids: list[str]) -> tuple[dict, list[str]]:
+    """Metadata entries for the messages, plus the IDs to retry on the next sync."""
+    entries, pending = {}, []
+    for result in await fetch_messages(message_ids):
+        if result["message"] is not None:
+            entries[result["id"]] = _to_entry(result["message"])
+        elif not _is_permanent(result["status"]):
+            pending.append(result["id"])
+    return entries, pending
+
+
+async def _full_sync() -> dict:
+    """Rebuild the mirror from scratch: profile + list + one batched hydration."""
+    # Read historyId first so changes made while listing are replayed next sync
+    profile = await get_profile()
+    result = await list_messages(label_ids=[MIRROR_LABEL], max_results=MIRROR_SIZE)
+    ids = [m["id"] for m in result.get("messages", [])]
+    messages, pending = await _fetch_entries(ids)
+
+    logger.info(
+        "Gmail mirror: full sync, %d messages, %d to retry (historyId=%s)",
+        len(messages), len(pending), profile["historyId"],
+    )
+    return {"historyId": profile["historyId"], "messages": messages, "pending": pending, "syncedAt": time.time()}
+
+
+async def _refill(messages: dict, pending: list[str]) -> tuple[dict, list[str]]:
+    """Inbox messages older than the oldest kept, to bring the mirror back to MIRROR_SIZE."""
+    needed = MIRROR_SIZE - len(messages) - len(pending)
+    seconds = [int(m.get("internalDate") or 0) // 1000 for m in messages.values()]
+    oldest = min(seconds, default=None)
+    # before: counts in whole seconds, so messages kept from that second are listed again
+    query = f"before:{oldest + 1}" if oldest is not None else ""
+    result = await list_messages(q=query, label_ids=[MIRROR_LABEL], max_results=needed + seconds.count(oldest))
+    known = set(messages) | set(pending)
+    ids = [m["id"] for m in result.get("messages", []) if m["id"] not in known][:needed]
+    return await _fetch_entries(ids) if ids else ({}, [])
+
+
+async def _incremental_sync(state: dict) -> dict | None:
+    """Apply history since state["historyId"]. Returns None if the ID expired."""
+    records = []
+    history_id = state["historyId"]
+    page_token = None
+    while True:
+        try:
+            result = await list_history(state["historyId"], HISTORY_TYPES, page_token)
+        except GoogleApiError as e:
+            # Gmail answers 404 when startHistoryId is too old to replay
+            if e.status == 404:
+                logger.info("Gmail mirror: historyId %s expired", state["historyId"])
+                return None
+            raise
+        records.extend(result.get("history", []))
+        history_id = result.get("historyId", history_id)
+        page_token = result.get("nextPageToken")
+        if not page_token:
+            break
+
+    messages = dict(state["messages"])
+    # Ordered set of inbox messages to fetch, starting with the previous sync's failures
+    to_fetch = dict.fromkeys(state.get("pending", []))
+    removed = False  # whether deletes or archives shrank the mirror
+
+    for record in records:
+        for added in record.get("messagesAdded", []):
+            msg = added["message"]
+            if MIRROR_LABEL in msg.get("labelIds", []) and msg["id"] not in messages:
+                to_fetch[msg["id"]] = None
+        for deleted in record.get("messagesDeleted", []):
+            removed |= messages.pop(deleted["message"]["id"], None) is not None
+            to_fetch.pop(deleted["message"]["id"], None)
+        for change in record.get("labelsAdded", []):
+            msg_id = change["message"]["id"]
+            if msg_id in messages:
+                labels = messages[msg_id]["labelIds"]
+                new_labels = labels + [l for l in change["labelIds"] if l not in labels]
+                messages[msg_id] = {**messages[msg_id], "labelIds": new_labels}
+            elif MIRROR_LABEL in change["labelIds"]:
+                to_fetch[msg_id] = None
+        for change in record.get("labelsRemoved", []):
+            msg_id = change["message"]["id"]
+            if MIRROR_LABEL in change["labelIds"]:
+                to_fetch.pop(msg_id, None)
+            if msg_id in messages:
+                if MIRROR_LABEL in change["labelIds"]:
+                    messages.pop(msg_id)
+                    removed = True
+                else:
+                    new_labels = [l for l in messages[msg_id]["labelIds"] if l not in change["labelIds"]]
+                    messages[msg_id] = {**messages[msg_id], "labelIds": new_labels}
+
+    # A message added then deleted/archived in the same window was dropped from to_fetch above
+    to_fetch = [i for i in to_fetch if i not in messages]
+    fetched, pending = {}, []
+    if to_fetch:
+        fetched, pending = await _fetch_entries(to_fetch)
+        messages.update(fetched)
+        messages = {
+            m["id"]: m for m in _sorted_messages(messages)[:MIRROR_SIZE]
+            if MIRROR_LABEL in m.get("labelIds", [])
+        }
+    refilled = {}
+    if removed and len(messages) + len(pending) < MIRROR_SIZE:
+        # Only after a removal: an inbox smaller than the mirror would otherwise be listed every sync
+        refilled, refill_pending = await _refill(messages, pending)
+        messages.update(refilled)
+        pending += refill_pending
+
+    logger.info(
+        "Gmail mirror: %d history records applied, %d new and %d older messages fetched, %d to retry (historyId=%s)",
+        len(records), len(fetched), len(refilled), len(pending), history_id,
+    )
+    return {"historyId": history_id, "messages": messages, "pending": pending, "syncedAt": time.time()}
+
+
+async def sync(force: bool = False) -> dict:
+    """Bring the mirror up to date, falling back to a full resync when needed."""
+    async with _lock:
+        # Read after taking the lock: another worker may have just synced
+        state = get_gmail_mirror_cache()
+        if state is not None and not force and time.time() - state.get("syncedAt", 0) < SYNC_INTERVAL:
+            return state
+
+        new_state = None
+        if state is not None:
+            new_state = await _incremental_sync(state)
+        if new_state is None:
+            new_state = await _full_sync()
+
+        await set_gmail_mirror_cache(new_state)
+        return new_state
+
+
+async def get_inbox(max_results: int = 20, refresh: bool = False) -> list[dict]:
+    """Return the newest inbox messages from the mirror (copies, newest first)."""
+    state = await sync(force=refresh)
+    return [dict(m) for m in _sorted_messages(state["messages"])[:max_results]]
+
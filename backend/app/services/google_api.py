@@ -0,0 +1,109 @@
+"""Async client for the Google REST APIs (Gmail, Calendar).
+
+Calls go straight to the JSON endpoints over the pooled "google" HTTP client
+(HTTP/2 when available). Any number of calls can be in flight at once
+without tying up a thread each, and no transport is shared across threads.
+The OAuth access token comes from GOOGLE_REFRESH_TOKEN. It is refreshed
+shortly before it expires, and once more if Google rejects it.
+"""
+
+import asyncio
+import logging
+import time
+
+import httpx
+
+from app import config
+from app.services.http_client import get_http_client
+
+logger = logging.getLogger(__name__)
+
+TOKEN_URL = "https://oauth2.googleapis.com/token"
+REFRESH_MARGIN = 60  # seconds before expiry a token is refreshed
+
+_token: str | None = None
+_token_expiry = 0.0
+_token_lock = asyncio.Lock()
+
+
+class GoogleApiError(Exception):
+    """A Google API call failed. status is the HTTP status, 0 if Google couldn't be reached."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"{status} {message}" if status else message)
+        self.status = status
+
+
+def _error_message(response: httpx.Response) -> str:
+    try:
+        error = response.json().get("error")
+    except ValueError:
+        return response.text[:200]
+    if isinstance(error, dict):
+        return error.get("message", "")
+    # The token endpoint answers {"error": "invalid_grant", "error_description": ...}
+    return f"{error}: {response.json().get('error_description', '')}"
+
+
+async def _access_token(rejected: str | None = None) -> str:
+    """A valid access token. rejected is a token Google just refused: it is replaced even if not expired."""
+    global _token, _token_expiry
+
+    async with _token_lock:
+        # Concurrent calls that got a 401 refresh once: the rest reuse the new token
+        if _token and _token != rejected and time.time() < _token_expiry - REFRESH_MARGIN:
+            return _token
+
+        if not config.GOOGLE_CLIENT_ID or not config.GOOGLE_CLIENT_SECRET or not config.GOOGLE_REFRESH_TOKEN:
+            raise RuntimeError(
+                "Google APIs not configured. "
+                "Set GOOGLE_CLIENT_ID, GOOGLE_CLIENT_SECRET, and GOOGLE_REFRESH_TOKEN in .env"
+            )
+
+        try:
+            response = await get_http_client("google").post(TOKEN_URL, data={
+                "client_id": config.GOOGLE_CLIENT_ID,
+                "client_secret": config.GOOGLE_CLIENT_SECRET,
+                "refresh_token": config.GOOGLE_REFRESH_TOKEN,
+                "grant_type": "refresh_token",
+            })
+        except httpx.HTTPError as e:
+            raise GoogleApiError(0, f"token refresh failed: {e}") from e
+        if response.status_code != 200:
+            raise GoogleApiError(response.status_code, f"token refresh failed: {_error_message(response)}")
+
+        payload = response.json()
+        _token = payload["access_token"]
+        _token_expiry = time.time() + payload.get("expires_in", 3600)
+        logger.info("Google access token refreshed (expires in %ss)", payload.get("expires_in", 3600))
+        return _token
+
+
+async def warm_up():
+    """Fetch the first access token before the first call needs it."""
+    await _access_token()
+
+
+async def request(method: str, path: str, params: dict | None = None, json: dict | None = None) -> dict:
+    """Call a Google API endpoint and return the decoded JSON body ({} when there is none).
+
+    None-valued params are left out; list values become repeated parameters.
+    Raises GoogleApiError.
+    """
+    client = get_http_client("google")
+    params = {key: value for key, value in (params or {}).items() if value is not None}
+    token = await _access_token()
+    for attempt in range(2):
+        try:
+            response = await client.request(
+                method, path, params=params, json=json, headers={"Authorization": f"Bearer {token}"},
+            )
+        except httpx.HTTPError as e:
+            raise GoogleApiError(0, f"{method} {path}: {e}") from e
+        if response.status_code != 401 or attempt:
+            break
+        token = await _access_token(rejected=token)
+
+    if response.status_code >= 400:
+        raise GoogleApiError(response.status_code, _error_message(response))
+    return response.json() if response.content else {}
@@ -1,37 +1,36 @@
-import logging
+from urllib.parse import quote
 
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
+from app.services import google_api
 
-from app import config
+CALENDAR_PATH = "/calendar/v3"
 
-logger = logging.getLogger(__name__)
 
-_service = None
+def _events_path(calendar_id: str, event_id: str | None = None) -> str:
+    # Calendar IDs are email-like and may contain '#' (e.g. holiday calendars)
+    path = f"{CALENDAR_PATH}/calendars/{quote(calendar_id, safe='')}/events"
+    return f"{path}/{quote(event_id, safe='')}" if event_id else path
 
 
-def get_calendar_service():
-    """Return the Google Calendar API v3 service, creating it lazily."""
-    global _service
+async def list_events(calendar_id: str = "primary", **params) -> dict:
+    """events.list; params are the API's query parameters (timeMin, syncToken, pageToken...)."""
+    return await google_api.request("GET", _events_path(calendar_id), params=params)
 
-    if _service is not None:
-        return _service
 
-    if not config.GOOGLE_CLIENT_ID or not config.GOOGLE_CLIENT_SECRET or not config.GOOGLE_REFRESH_TOKEN:
-        raise RuntimeError(
-            "Google Calendar not configured. "
-            "Set GOOGLE_CLIENT_ID, GOOGLE_CLIENT_SECRET, and GOOGLE_REFRESH_TOKEN in .env"
-        )
+async def get_event(event_id: str, calendar_id: str = "primary") -> dict:
+    return await google_api.request("GET", _events_path(calendar_id, event_id))
 
-    creds = Credentials(
-        token=None,
-        refresh_token=config.GOOGLE_REFRESH_TOKEN,
-        token_uri="https://oauth2.googleapis.com/token",
-        client_id=config.GOOGLE_CLIENT_ID,
-        client_secret=config.GOOGLE_CLIENT_SECRET,
-        scopes=["https://www.googleapis.com/auth/calendar"],
-    )
 
-    _service = build("calendar", "v3", credentials=creds)
-    logger.info("Google Calendar service initialized")
-    return _service
+async def insert_event(body: dict, calendar_id: str = "primary") -> dict:
+    return await google_api.request("POST", _events_path(calendar_id), json=body)
+
+
+async def update_event(event_id: str, body: dict, calendar_id: str = "primary") -> dict:
+    return await google_api.request("PUT", _events_path(calendar_id, event_id), json=body)
+
+
+async def delete_event(event_id: str, calendar_id: str = "primary") -> None:
+    await google_api.request("DELETE", _events_path(calendar_id, event_id))
+
+
+async def query_freebusy(body: dict) -> dict:
+    return await google_api.request("POST", f"{CALENDAR_PATH}/freeBusy", json=body)
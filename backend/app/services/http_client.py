@@ -0,0 +1,78 @@
+import importlib.util
+import logging
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# HTTP/2 needs the optional "h2" package (httpx[http2]); fall back to HTTP/1.1
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# One pooled client per upstream host, each with its own limits and timeouts
+CLIENT_PROFILES = {
+    "openweathermap": {
+        "base_url": "https://api.openweathermap.org",
+        "timeout": 10.0,
+        "connect_timeout": 5.0,
+        "max_connections": 10,
+        "max_keepalive": 5,
+    },
+    "google": {
+        "base_url": "https://www.googleapis.com",  # Gmail and Calendar; the token endpoint is passed in full
+        "timeout": 30.0,
+        "connect_timeout": 5.0,
+        "max_connections": 20,
+        "max_keepalive": 10,
+    },
+    "azure_speech": {
+        "base_url": "",  # region-specific host, callers pass the full URL
+        "timeout": 10.0,
+        "connect_timeout": 5.0,
+        "max_connections": 5,
+        "max_keepalive": 2,
+    },
+}
+
+KEEPALIVE_EXPIRY = 60  # seconds an idle pooled connection is kept open
+
+_clients: dict[str, httpx.AsyncClient] = {}
+
+
+def _build_client(name: str) -> httpx.AsyncClient:
+    profile = CLIENT_PROFILES[name]
+    return httpx.AsyncClient(
+        base_url=profile["base_url"],
+        http2=HTTP2_AVAILABLE,
+        timeout=httpx.Timeout(profile["timeout"], connect=profile["connect_timeout"]),
+        limits=httpx.Limits(
+            max_connections=profile["max_connections"],
+            max_keepalive_connections=profile["max_keepalive"],
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        ),
+    )
+
+
+def get_http_client(name: str) -> httpx.AsyncClient:
+    """Return the shared client for an upstream, creating it lazily if startup didn't."""
+    client = _clients.get(name)
+    if client is None or client.is_closed:
+        client = _build_client(name)
+        _clients[name] = client
+    return client
+
+
+async def open_http_clients():
+    """Create every pooled client up front (called at app startup)."""
+    for name in CLIENT_PROFILES:
+        get_http_client(name)
+    logger.info(
+        "HTTP clients ready: %s (http2=%s)", ", ".join(CLIENT_PROFILES), HTTP2_AVAILABLE
+    )
+
+
+async def close_http_clients():
+    """Close every pooled client and its connections (called at app shutdown)."""
+    for name, client in list(_clients.items()):
+        await client.aclose()
+        _clients.pop(name, None)
+    logger.info("HTTP clients closed")
@@ -0,0 +1,119 @@
+"""Startup warm-up and readiness.
+
+Everything the app otherwise builds on the first request is created at
+startup, all at once:
+- the Google access token
+- the Gmail mirror and the calendar store
+- the Cosmos container and the resident expense set
+- the Blob client
+- the orchestrator agents
+So the first chat or inbox load after a deploy or scale-out doesn't pay for
+them one after another.
+
+/ready answers 503 until warm-up has finished or WARMUP_TIMEOUT has passed;
+/health only says the process is up. A component that fails or times out
+doesn't keep the worker out of rotation: its first request builds it
+lazily, as before.
+"""
+
+import asyncio
+import logging
+import time
+
+from app import config
+from app.database import blob
+from app.database.cosmos import get_expenses_container
+from app.services import calendar_store, gmail_mirror, google_api
+from app.services.expense_queries import get_all_expenses
+
+logger = logging.getLogger(__name__)
+
+_ready = False
+_total_ms: int | None = None
+# { component: {"status": "warming" | "ok" | "failed" | "timeout" | "skipped", "ms", "error"} }
+_components: dict[str, dict] = {}
+
+
+def _google_configured() -> bool:
+    return bool(config.GOOGLE_CLIENT_ID and config.GOOGLE_CLIENT_SECRET and config.GOOGLE_REFRESH_TOKEN)
+
+
+def _cosmos_configured() -> bool:
+    return config.COSMOS_BACKEND == "memory" or bool(config.COSMOS_ENDPOINT and config.COSMOS_KEY)
+
+
+def _openai_configured() -> bool:
+    return bool(config.AZURE_OPENAI_ENDPOINT and config.AZURE_OPENAI_KEY and config.AZURE_OPENAI_DEPLOYMENT)
+
+
+async def _warm_cosmos():
+    # Loading the resident expense set also fetches the container's metadata
+    await get_all_expenses(await get_expenses_container())
+
+
+async def _warm_agent():
+    from app.agents.orchestrator import get_agent
+
+    # Building the agents is synchronous: keep it off the event loop while the rest warms up.
+    # get_agent is locked, so a request arriving meanwhile waits for this build instead of starting its own.
+    await asyncio.to_thread(get_agent)
+
+
+# name -> (is it configured, coroutine function warming it)
+COMPONENTS = {
+    "google_token": (_google_configured, google_api.warm_up),
+    "gmail_mirror": (_google_configured, gmail_mirror.sync),
+    "calendar_store": (_google_configured, calendar_store.sync),
+    "cosmos": (_cosmos_configured, _warm_cosmos),
+    "blob": (lambda: bool(config.AZURE_STORAGE_CONNECTION_STRING), blob.warm_up),
+    "agent": (_openai_configured, _warm_agent),
+}
+
+
+async def _run(name: str, warm):
+    started = time.perf_counter()
+    try:
+        await warm()
+    except Exception as e:
+        logger.warning("Warm-up: %s failed: %s", name, e)
+        _components[name] = {"status": "failed", "ms": round((time.perf_counter() - started) * 1000), "error": str(e)}
+        return
+    _components[name] = {"status": "ok", "ms": round((time.perf_counter() - started) * 1000)}
+
+
+async def warm_up():
+    """Warm every configured component concurrently, then mark the worker ready."""
+    global _ready, _total_ms
+
+    started = time.perf_counter()
+    tasks = {}
+    for name, (configured, warm) in COMPONENTS.items():
+        if not configured():
+            _components[name] = {"status": "skipped"}
+            continue
+        _components[name] = {"status": "warming"}
+        tasks[name] = asyncio.create_task(_run(name, warm))
+
+    if tasks:
+        _, pending = await asyncio.wait(tasks.values(), timeout=config.WARMUP_TIMEOUT)
+        for name, task in tasks.items():
+            if task in pending:
+                # Left running: a late finish still records its outcome
+                _components[name] = {"status": "timeout", "ms": round(config.WARMUP_TIMEOUT * 1000)}
+
+    _total_ms = round((time.perf_counter() - started) * 1000)
+    _ready = True
+    logger.info(
+        "Warm-up done in %d ms: %s", _total_ms,
+        ", ".join(f"{name}={c['status']}" + (f" ({c['ms']} ms)" if "ms" in c else "") for name, c in _components.items()),
+    )
+
+
+def mark_ready():
+    """Warm-up disabled: ready as soon as the app starts."""
+    global _ready
+    _ready = True
+
+
+def readiness() -> dict:
+    return {"ready": _ready, "totalMs": _total_ms, "components": {name: dict(c) for name, c in _components.items()}}
@@ -1,12 +1,76 @@
+import asyncio
 import logging
-
-import httpx
+import time
+from collections import OrderedDict
 
 from app import config
+from app.services.http_client import get_http_client
 
 logger = logging.getLogger(__name__)
 
-BASE_URL = "https://api.openweathermap.org"
+# --- Caches ---
+# Coordinates are snapped to a GRID_STEP-degree grid (~2 km), so nearby GPS
+# fixes from the navbar widget and agent turns share one cache entry.
+GRID_STEP = 0.02
+CURRENT_TTL = 600  # OpenWeatherMap refreshes current conditions every ~10 min
+FORECAST_TTL = 1800
+GEOCODE_CACHE_SIZE = 256  # city coordinates don't change, keep them LRU-bounded
+WEATHER_CACHE_SIZE = 256  # grid cells per cache; expired cells are swept on insert too
+FORECAST_MAX_DAYS = 5
+
+# { cell: (fetched at, value) }, oldest fetch first
+_current_cache: OrderedDict[tuple, tuple[float, dict]] = OrderedDict()
+_forecast_cache: OrderedDict[tuple, tuple[float, list[dict]]] = OrderedDict()
+_geocode_cache: OrderedDict[str, dict] = OrderedDict()
+_inflight: dict[tuple, asyncio.Task] = {}
+
+
+def _grid_cell(lat: float, lon: float) -> tuple[int, int]:
+    return round(lat / GRID_STEP), round(lon / GRID_STEP)
+
+
+def _cell_center(cell: tuple[int, int]) -> tuple[float, float]:
+    return round(cell[0] * GRID_STEP, 4), round(cell[1] * GRID_STEP, 4)
+
+
+async def _single_flight(key: tuple, factory):
+    """Run factory() once per key; concurrent callers with the same key share the result."""
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(factory())
+        _inflight[key] = task
+
+        def _done(finished: asyncio.Task):
+            if _inflight.get(key) is finished:
+                del _inflight[key]
+            # Retrieve the error even when every caller was cancelled: the callers that
+            # still wait get it from the shield, and asyncio doesn't log it as never retrieved
+            if not finished.cancelled():
+                finished.exception()
+
+        task.add_done_callback(_done)
+    # Shield so one cancelled caller doesn't cancel the upstream call for the others
+    return await asyncio.shield(task)
+
+
+def _get_fresh(cache: OrderedDict, key, ttl: float):
+    entry = cache.get(key)
+    if entry is not None and time.time() - entry[0] < ttl:
+        return entry[1]
+    cache.pop(key, None)
+    return None
+
+
+def _put(cache: OrderedDict, key, value, ttl: float):
+    """Store a fresh value, dropping expired entries and then the oldest past WEATHER_CACHE_SIZE."""
+    now = time.time()
+    cache[key] = (now, value)
+    cache.move_to_end(key)
+    # Entries are in fetch order, so the expired ones are all at the front
+    while cache and now - next(iter(cache.values()))[0] >= ttl:
+        cache.popitem(last=False)
+    while len(cache) > WEATHER_CACHE_SIZE:
+        cache.popitem(last=False)
 
 
 def _get_api_key() -> str:
@@ -16,23 +80,21 @@ def _get_api_key() -> str:
     return key
 
 
-async def get_current_weather(lat: float, lon: float) -> dict:
-    """Get current weather for coordinates. Returns dict with temp, description, icon, city, feels_like."""
+async def _fetch_current_weather(lat: float, lon: float) -> dict:
     logger.info("Fetching current weather for lat=%.4f, lon=%.4f", lat, lon)
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(
-            f"{BASE_URL}/data/2.5/weather",
-            params={
-                "lat": lat,
-                "lon": lon,
-                "appid": _get_api_key(),
-                "units": "metric",
-                "lang": "en",
-            },
-            timeout=10,
-        )
-        resp.raise_for_status()
-        data = resp.json()
+    client = get_http_client("openweathermap")
+    resp = await client.get(
+        "/data/2.5/weather",
+        params={
+            "lat": lat,
+            "lon": lon,
+            "appid": _get_api_key(),
+            "units": "metric",
+            "lang": "en",
+        },
+    )
+    resp.raise_for_status()
+    data = resp.json()
 
     city = data.get("name", "")
     weather = data["weather"][0]
@@ -51,23 +113,21 @@ async def get_current_weather(lat: float, lon: float) -> dict:
     return result
 
 
-async def get_forecast(lat: float, lon: float, days: int = 5) -> list[dict]:
-    """Get multi-day forecast. Returns list of daily summaries."""
-    logger.info("Fetching %d-day forecast for lat=%.4f, lon=%.4f", days, lat, lon)
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(
-            f"{BASE_URL}/data/2.5/forecast",
-            params={
-                "lat": lat,
-                "lon": lon,
-                "appid": _get_api_key(),
-                "units": "metric",
-                "lang": "en",
-            },
-            timeout=10,
-        )
-        resp.raise_for_status()
-        data = resp.json()
+async def _fetch_forecast(lat: float, lon: float) -> list[dict]:
+    logger.info("Fetching forecast for lat=%.4f, lon=%.4f", lat, lon)
+    client = get_http_client("openweathermap")
+    resp = await client.get(
+        "/data/2.5/forecast",
+        params={
+            "lat": lat,
+            "lon": lon,
+            "appid": _get_api_key(),
+            "units": "metric",
+            "lang": "en",
+        },
+    )
+    resp.raise_for_status()
+    data = resp.json()
 
     # Group 3-hour slots by date, pick midday (12:00) or first available per day
     daily: dict[str, dict] = {}
@@ -79,7 +139,7 @@ async def get_forecast(lat: float, lon: float, days: int = 5) -> list[dict]:
             daily[date] = item
 
     result = []
-    for date, item in list(daily.items())[:days]:
+    for date, item in list(daily.items())[:FORECAST_MAX_DAYS]:
         weather = item["weather"][0]
         result.append({
             "date": date,
@@ -96,21 +156,19 @@ async def get_forecast(lat: float, lon: float, days: int = 5) -> list[dict]:
     return result
 
 
-async def geocode_city(city: str) -> dict:
-    """Geocode a city name to lat/lon. Returns dict with lat, lon, name, country."""
+async def _fetch_geocode(city: str) -> dict:
     logger.info("Geocoding city: %s", city)
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(
-            f"{BASE_URL}/geo/1.0/direct",
-            params={
-                "q": city,
-                "limit": 1,
-                "appid": _get_api_key(),
-            },
-            timeout=10,
-        )
-        resp.raise_for_status()
-        data = resp.json()
+    client = get_http_client("openweathermap")
+    resp = await client.get(
+        "/geo/1.0/direct",
+        params={
+            "q": city,
+            "limit": 1,
+            "appid": _get_api_key(),
+        },
+    )
+    resp.raise_for_status()
+    data = resp.json()
 
     if not data:
         logger.warning("City not found: %s", city)
@@ -126,6 +184,52 @@ async def geocode_city(city: str) -> dict:
     return result
 
 
+async def get_current_weather(lat: float, lon: float) -> dict:
+    """Get current weather for coordinates. Returns dict with temp, description, icon, city, feels_like."""
+    cell = _grid_cell(lat, lon)
+    cached = _get_fresh(_current_cache, cell, CURRENT_TTL)
+    if cached is None:
+        async def _load():
+            result = await _fetch_current_weather(*_cell_center(cell))
+            _put(_current_cache, cell, result, CURRENT_TTL)
+            return result
+
+        cached = await _single_flight(("current", cell), _load)
+    return dict(cached)
+
+
+async def get_forecast(lat: float, lon: float, days: int = 5) -> list[dict]:
+    """Get multi-day forecast. Returns list of daily summaries."""
+    cell = _grid_cell(lat, lon)
+    cached = _get_fresh(_forecast_cache, cell, FORECAST_TTL)
+    if cached is None:
+        async def _load():
+            result = await _fetch_forecast(*_cell_center(cell))
+            _put(_forecast_cache, cell, result, FORECAST_TTL)
+            return result
+
+        cached = await _single_flight(("forecast", cell), _load)
+    return [dict(day) for day in cached[:days]]
+
+
+async def geocode_city(city: str) -> dict:
+    """Geocode a city name to lat/lon. Returns dict with lat, lon, name, country."""
+    key = city.strip().lower()
+    cached = _geocode_cache.get(key)
+    if cached is None:
+        async def _load():
+            result = await _fetch_geocode(city)
+            _geocode_cache[key] = result
+            if len(_geocode_cache) > GEOCODE_CACHE_SIZE:
+                _geocode_cache.popitem(last=False)
+            return result
+
+        cached = await _single_flight(("geocode", key), _load)
+    else:
+        _geocode_cache.move_to_end(key)
+    return dict(cached)
+
+
 async def get_weather_by_city(city: str) -> dict:
     """Geocode a city name then get current weather."""
     location = await geocode_city(city)
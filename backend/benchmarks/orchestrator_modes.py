@@ -0,0 +1,150 @@
+"""Nested vs flat orchestrator: end-to-end latency, LLM calls and tokens per turn.
+
+Runs the same single-turn requests through both ORCHESTRATOR_MODE values on
+the configured Azure OpenAI deployment (credentials from .env) and counts
+every chat completion, including the ones specialists make inside nested
+mode. Expense turns run against the in-memory Cosmos stand-in; --remote
+adds weather, calendar and gmail turns, which call the real services.
+
+    cd backend
+    python -m benchmarks.orchestrator_modes --repeat 3
+    python -m benchmarks.orchestrator_modes --remote
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+# Imported first: selects the in-memory stand-ins before any app module reads the config
+from benchmarks.run import _seed  # noqa: I001
+
+from agent_framework.azure import AzureOpenAIChatClient
+
+from app import config
+from app.agents.orchestrator import build_agent
+from app.database.cosmos import get_expenses_container
+from app.services.folder_stats import reconcile_folder_stats
+
+EXPENSE_TURNS = [
+    "Add an expense of 12 euros for lunch, category food, paid by card",
+    "How much did I spend on food this month?",
+    "Show my transport expenses from the last 30 days",
+    "List my expense folders",
+    "Create a folder called Benchmark trip",
+]
+
+REMOTE_TURNS = [
+    "What's the weather in Rome right now?",
+    "What's on my calendar tomorrow?",
+    "Do I have any unread emails?",
+]
+
+
+class CountingClient(AzureOpenAIChatClient):
+    """Chat client that counts completions and tokens (streaming ones included)."""
+
+    def reset(self):
+        self.calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    def _count(self, response):
+        usage = response.usage_details or {}
+        self.calls += 1
+        self.input_tokens += usage.get("input_token_count") or 0
+        self.output_tokens += usage.get("output_token_count") or 0
+        return response
+
+    def _inner_get_response(self, *, messages, options, stream=False, **kwargs):
+        result = super()._inner_get_response(messages=messages, options=options, stream=stream, **kwargs)
+        if stream:
+            return result.with_result_hook(self._count)
+
+        async def _counted():
+            return self._count(await result)
+
+        return _counted()
+
+
+def _create_client() -> CountingClient:
+    if not config.AZURE_OPENAI_KEY or not config.AZURE_OPENAI_ENDPOINT or not config.AZURE_OPENAI_DEPLOYMENT:
+        raise SystemExit("Azure OpenAI not configured: set AZURE_OPENAI_ENDPOINT, AZURE_OPENAI_KEY "
+                         "and AZURE_OPENAI_DEPLOYMENT in .env")
+    client = CountingClient(
+        api_version=config.AZURE_OPENAI_API_VERSION,
+        api_key=config.AZURE_OPENAI_KEY,
+        endpoint=config.AZURE_OPENAI_ENDPOINT,
+        deployment_name=config.AZURE_OPENAI_DEPLOYMENT,
+    )
+    client.reset()
+    return client
+
+
+async def _run_mode(mode: str, turns: list[str], repeat: int) -> dict[str, dict]:
+    client = _create_client()
+    agent = build_agent(client, mode)
+    results = {}
+    for turn in turns:
+        latencies, calls, input_tokens, output_tokens = [], [], [], []
+        for _ in range(repeat):
+            client.reset()
+            started = time.perf_counter()
+            # A fresh thread per run: every sample starts from the same (empty) history
+            await agent.run(turn, thread=agent.get_new_thread())
+            latencies.append(time.perf_counter() - started)
+            calls.append(client.calls)
+            input_tokens.append(client.input_tokens)
+            output_tokens.append(client.output_tokens)
+        results[turn] = {
+            "latency": statistics.median(latencies),
+            "calls": statistics.mean(calls),
+            "input": statistics.mean(input_tokens),
+            "output": statistics.mean(output_tokens),
+        }
+    return results
+
+
+def _print_report(turns: list[str], nested: dict, flat: dict):
+    print(f"\n{'turn':52} {'mode':7} {'p50 s':>7} {'LLM calls':>10} {'tokens in':>10} {'tokens out':>11}")
+    for turn in turns:
+        for mode, results in (("nested", nested), ("flat", flat)):
+            r = results[turn]
+            print(f"{turn[:52]:52} {mode:7} {r['latency']:7.2f} {r['calls']:10.1f} "
+                  f"{r['input']:10.0f} {r['output']:11.0f}")
+
+    def total(results, field):
+        return sum(results[turn][field] for turn in turns)
+
+    print("\nTotals (flat / nested):")
+    for field, label in (("latency", "latency"), ("calls", "LLM calls"), ("input", "input tokens"),
+                         ("output", "output tokens")):
+        n, f = total(nested, field), total(flat, field)
+        ratio = f"{f / n:.0%}" if n else "-"
+        print(f"  {label:14} {f:10.1f} / {n:10.1f}  ({ratio})")
+
+
+async def _main(args):
+    container = await get_expenses_container()
+    _seed(container, args.expenses, random.Random(args.seed))
+    await reconcile_folder_stats(container)
+
+    turns = EXPENSE_TURNS + (REMOTE_TURNS if args.remote else [])
+    nested = await _run_mode("nested", turns, args.repeat)
+    flat = await _run_mode("flat", turns, args.repeat)
+    _print_report(turns, nested, flat)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per turn and mode")
+    parser.add_argument("--expenses", type=int, default=500, help="expenses seeded into the stand-in")
+    parser.add_argument("--remote", action="store_true", help="also run weather, calendar and gmail turns")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""Expense/folder benchmarks against the in-memory Cosmos stand-in.
+
+Drives the expense and folder routes (through the ASGI app) and the agent
+tools at realistic data sizes, and reports latency plus Cosmos round trips
+per call. Each scenario has a round-trip budget: going over it (an N+1 loop
+sneaking in) makes the run exit non-zero. Writes also have a latency budget
+on their median app time: wall time minus the stand-in's query evaluation,
+which real Cosmos does server-side against its index. It catches a write
+that grows with the number of expenses (re-sorting or re-serialising the
+resident set). It is checked only without simulated latency.
+
+    cd backend
+    python -m benchmarks.run                      # 10k and 100k documents
+    python -m benchmarks.run --sizes 20000 --iterations 50 --latency-ms 5
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+# Select the stand-ins before any app module reads the config
+os.environ["COSMOS_BACKEND"] = "memory"
+os.environ["CACHE_BACKEND"] = "memory"
+
+import httpx  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+
+from app.auth.jwt import get_current_user  # noqa: E402
+from app.api.expense_routes import router as expense_router  # noqa: E402
+from app.api.folder_routes import router as folder_router  # noqa: E402
+from app.agents.tools import expenses as expense_tools  # noqa: E402
+from app.agents.tools import folders as folder_tools  # noqa: E402
+from app.database.cosmos import get_expenses_container  # noqa: E402
+from app.database.memory_container import QUERY_PAGE_SIZE  # noqa: E402
+from app.services.data_cache import clear_expenses_cache  # noqa: E402
+from app.services.folder_stats import empty_stats, reconcile_folder_stats  # noqa: E402
+
+USER_ID = "fede"
+CATEGORIES = ["shopping", "transport", "food", "presents", "car", "medical", "subscription"]
+FOLDER_COUNT = 20
+HISTORY_DAYS = 3 * 365
+
+
+def _build_app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(expense_router, prefix="/api")
+    app.include_router(folder_router, prefix="/api")
+    app.dependency_overrides[get_current_user] = lambda: {"sub": USER_ID}
+    return app
+
+
+def _seed(container, size: int, rng: random.Random) -> dict:
+    """Load folders and expenses straight into the stand-in (no round trips counted)."""
+    today = date.today()
+    folder_ids = [f"fld_bench_{i}" for i in range(FOLDER_COUNT)]
+    for i, folder_id in enumerate(folder_ids):
+        container._create({
+            "id": folder_id, "userId": USER_ID, "type": "folder", "name": f"Folder {i}",
+            "description": "", "imageUrl": "", "createdAt": today.isoformat(), **empty_stats(),
+        })
+
+    expense_ids = []
+    for i in range(size):
+        expense_id = f"exp_bench_{i}"
+        expense = {
+            "id": expense_id, "userId": USER_ID, "type": "expense",
+            "amount": round(rng.uniform(1, 200), 2), "currency": "EUR",
+            "description": f"Expense {i}", "category": rng.choice(CATEGORIES),
+            "date": (today - timedelta(days=rng.randrange(HISTORY_DAYS))).isoformat(),
+            "paymentMethod": rng.choice(["card", "cash"]), "createdVia": "bench",
+            "createdAt": today.isoformat(),
+        }
+        if rng.random() < 0.3:
+            expense["folderId"] = rng.choice(folder_ids)
+        container._create(expense)
+        expense_ids.append(expense_id)
+    return {"folder_ids": folder_ids, "expense_ids": expense_ids}
+
+
+# Median app milliseconds a write may take, at any size
+WRITE_MS = 25
+BULK_WRITE_MS = 50  # 50 expenses in one call
+
+
+class Scenario:
+    def __init__(self, name: str, run, budget=None, cold: bool = False, max_ms: float | None = None):
+        self.name = name
+        self.run = run  # async callable(iteration) -> None
+        self.budget = budget  # max round trips per call (int, callable(size) or None)
+        self.cold = cold  # clear the expense cache before every call
+        self.max_ms = max_ms  # max median app ms per call (None: not checked)
+
+
+def _scenarios(client: httpx.AsyncClient, data: dict, rng: random.Random) -> list[Scenario]:
+    folder_ids = data["folder_ids"]
+    expense_ids = data["expense_ids"]
+    today = date.today()
+    month_ago = (today - timedelta(days=30)).isoformat()
+    deep_cursor = {}
+
+    def pick_expense():
+        return rng.choice(expense_ids)
+
+    async def get(url, **params):
+        response = await client.get(url, params=params)
+        response.raise_for_status()
+        return response.json()
+
+    async def list_deep_page(_):
+        # Page 20 of the full listing: the cost must not depend on depth
+        if "cursor" not in deep_cursor:
+            cursor = None
+            for _ in range(19):
+                cursor = (await get("/api/expenses", limit=50, **({"cursor": cursor} if cursor else {})))["next"]
+            deep_cursor["cursor"] = cursor
+        await get("/api/expenses", limit=50, cursor=deep_cursor["cursor"])
+
+    async def create_expense(i):
+        response = await client.post("/api/expenses", json={
+            "amount": 12.5, "description": f"Bench {i}", "category": "food",
+            "date": today.isoformat(), "folderId": rng.choice(folder_ids),
+        })
+        response.raise_for_status()
+        expense_ids.append(response.json()["expense"]["id"])
+
+    async def patch_description(_):
+        response = await client.patch(f"/api/expenses/{pick_expense()}", json={"description": "Edited"})
+        response.raise_for_status()
+
+    async def patch_amount(_):
+        response = await client.patch(f"/api/expenses/{pick_expense()}", json={"amount": 42.0})
+        response.raise_for_status()
+
+    async def delete_expense(_):
+        expense_id = expense_ids.pop()
+        response = await client.delete(f"/api/expenses/{expense_id}")
+        response.raise_for_status()
+
+    async def assign_many(_):
+        ids = rng.sample(expense_ids, 50)
+        response = await client.post(f"/api/folders/{rng.choice(folder_ids)}/expenses", json={"expenseIds": ids})
+        response.raise_for_status()
+
+    async def remove_from_folder(_):
+        folder_id = rng.choice(folder_ids)
+        page = await get(f"/api/folders/{folder_id}/expenses", limit=1)
+        if page["expenses"]:
+            response = await client.delete(f"/api/folders/{folder_id}/expenses/{page['expenses'][0]['id']}")
+            response.raise_for_status()
+
+    async def rename_folder(i):
+        response = await client.put(f"/api/folders/{rng.choice(folder_ids)}", data={"name": f"Renamed {i}"})
+        response.raise_for_status()
+
+    return [
+        Scenario("GET /expenses (cold cache)", lambda _: get("/api/expenses"),
+                 budget=lambda size: math.ceil(size / QUERY_PAGE_SIZE) + 1, cold=True),
+        Scenario("GET /expenses", lambda _: get("/api/expenses"), budget=0),
+        Scenario("GET /expenses?category&date", lambda _: get(
+            "/api/expenses", category="food", start_date=month_ago, end_date=today.isoformat()), budget=0),
+        Scenario("GET /expenses page 20", list_deep_page, budget=0),
+        Scenario("GET /expenses/summary", lambda _: get("/api/expenses/summary"), budget=0),
+        Scenario("GET /folders", lambda _: get("/api/folders"), budget=1),
+        Scenario("GET /folders/{id}/expenses", lambda _: get(
+            f"/api/folders/{rng.choice(folder_ids)}/expenses"), budget=0),
+        Scenario("POST /expenses", create_expense, budget=2, max_ms=WRITE_MS),
+        Scenario("PATCH /expenses (description)", patch_description, budget=1, max_ms=WRITE_MS),
+        Scenario("PATCH /expenses (amount)", patch_amount, budget=3, max_ms=WRITE_MS),
+        Scenario("DELETE /expenses", delete_expense, budget=3, max_ms=WRITE_MS),
+        Scenario("POST /folders/{id}/expenses (50)", assign_many, budget=6, max_ms=BULK_WRITE_MS),
+        Scenario("DELETE /folders/{id}/expenses/{id}", remove_from_folder, budget=2, max_ms=WRITE_MS),
+        Scenario("PUT /folders/{id} (name)", rename_folder, budget=1, max_ms=WRITE_MS),
+        Scenario("tool query_expenses", lambda _: expense_tools.query_expenses.func(
+            category="food", start_date=month_ago), budget=0),
+        Scenario("tool get_expense_summary", lambda _: expense_tools.get_expense_summary.func(
+            group_by="month"), budget=0),
+        Scenario("tool update_expense (amount)", lambda _: expense_tools.update_expense.func(
+            expense_id=pick_expense(), amount=7.0), budget=3, max_ms=WRITE_MS),
+        Scenario("tool list_folders", lambda _: folder_tools.list_folders.func(), budget=1),
+        Scenario("tool query_folder_expenses", lambda _: folder_tools.query_folder_expenses.func(
+            folder_id=rng.choice(folder_ids)), budget=1),
+        Scenario("tool add_expense_to_folder", lambda _: folder_tools.add_expense_to_folder.func(
+            expense_id=pick_expense(), folder_id=rng.choice(folder_ids)), budget=4, max_ms=WRITE_MS),
+    ]
+
+
+async def _measure(container, scenario: Scenario, iterations: int) -> tuple[list[float], list[float], list[int]]:
+    latencies, app_latencies, trips = [], [], []
+    await scenario.run(-1)  # warm-up (loads caches, compiles queries)
+    for i in range(iterations):
+        if scenario.cold:
+            clear_expenses_cache()
+        container.reset_stats()
+        started = time.perf_counter()
+        await scenario.run(i)
+        elapsed = time.perf_counter() - started
+        latencies.append(elapsed * 1000)
+        app_latencies.append((elapsed - container.query_seconds) * 1000)
+        trips.append(container.round_trips)
+    return latencies, app_latencies, trips
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def _run_size(size: int, iterations: int, latency_ms: float, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    container = await get_expenses_container()
+    container._items.clear()
+    container.latency = latency_ms / 1000
+    clear_expenses_cache()
+
+    data = _seed(container, size, rng)
+    await reconcile_folder_stats(container)
+    container.reset_stats()
+
+    print(f"\n== {size:,} expenses, {FOLDER_COUNT} folders, {iterations} iterations"
+          f", {latency_ms:g} ms simulated per round trip ==")
+    print(f"{'scenario':40} {'p50 ms':>9} {'p95 ms':>9} {'app p50':>9} {'ms budget':>9} "
+          f"{'trips/call':>11} {'budget':>7}")
+
+    failures = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=_build_app()),
+                                 base_url="http://bench") as client:
+        for scenario in _scenarios(client, data, rng):
+            latencies, app_latencies, trips = await _measure(container, scenario, iterations)
+            budget = scenario.budget(size) if callable(scenario.budget) else scenario.budget
+            worst = max(trips)
+            over = budget is not None and worst > budget
+            app_ms = statistics.median(app_latencies)
+            max_ms = scenario.max_ms if not latency_ms else None
+            slow = max_ms is not None and app_ms > max_ms
+            print(f"{scenario.name:40} {statistics.median(latencies):9.2f} {_percentile(latencies, 95):9.2f} "
+                  f"{app_ms:9.2f} {'-' if max_ms is None else max_ms:>9} "
+                  f"{statistics.mean(trips):11.1f} {'-' if budget is None else budget:>7}"
+                  f"{'  OVER BUDGET' if over else ''}{'  TOO SLOW' if slow else ''}")
+            if over:
+                failures.append(f"{size:,} docs: {scenario.name} used {worst} round trips (budget {budget})")
+            if slow:
+                failures.append(f"{size:,} docs: {scenario.name} took {app_ms:.1f} app ms (budget {max_ms} ms)")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000", help="comma-separated expense counts")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="simulated latency per round trip")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    failures = []
+    for size in (int(s) for s in args.sizes.split(",")):
+        failures += asyncio.run(_run_size(size, args.iterations, args.latency_ms, args.seed))
+
+    if failures:
+        print("\nBudget exceeded:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print("\nAll scenarios within their budgets.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""Tokens each tool call adds to the agent context: previous prose output vs compact records.
+
+Calls the real tools on the same data: expense/folder tools against the
+in-memory Cosmos stand-in, calendar/gmail tools against canned Google API
+responses. The "before" column re-renders each result with the prose
+formatting the tools used before the compact record format.
+Tokens are counted with tiktoken (o200k_base) when installed, otherwise
+estimated at four characters per token.
+
+    cd backend
+    python -m benchmarks.tool_tokens
+    TOOL_TOKEN_BUDGET=300 python -m benchmarks.tool_tokens
+"""
+
+import asyncio
+import base64
+import random
+from datetime import date, timedelta
+
+# Imported first: selects the in-memory stand-ins before any app module reads the config
+from benchmarks.run import _seed  # noqa: I001
+
+from app.agents.tools import calendar as calendar_tools
+from app.agents.tools import expenses as expense_tools
+from app.agents.tools import folders as folder_tools
+from app.agents.tools import gmail as gmail_tools
+from app.database.cosmos import get_expenses_container
+from app.services.expense_queries import find_expenses
+from app.services import google_calendar
+from app.services.folder_stats import public_stats, reconcile_folder_stats
+from app.services.gmail import _parse_message, _parse_metadata
+from app.utils.tokens import estimate_tokens
+
+try:
+    import tiktoken
+
+    _encoding = tiktoken.get_encoding("o200k_base")
+
+    def count_tokens(text: str) -> int:
+        return len(_encoding.encode(text))
+
+    TOKENIZER = "tiktoken o200k_base"
+except ImportError:
+    count_tokens = estimate_tokens
+    TOKENIZER = "estimate (4 chars/token)"
+
+TODAY = date.today()
+
+
+# --- Canned Google data ---
+
+def _events(count: int) -> list[dict]:
+    rng = random.Random(1)
+    events = []
+    for i in range(count):
+        day = TODAY + timedelta(days=i // 3)
+        hour = 9 + (i % 3) * 3
+        events.append({
+            "id": f"evt{i:04d}abcdefghijklmnop",
+            "summary": rng.choice(["Team sync", "Dentist", "Lunch with Marco", "Project review", "Gym"]),
+            "start": {"dateTime": f"{day}T{hour:02d}:00:00+01:00"},
+            "end": {"dateTime": f"{day}T{hour + 1:02d}:00:00+01:00"},
+            "location": rng.choice(["", "Via del Corso 12, Roma", "Google Meet"]),
+            "description": "Agenda: " + "discuss the next steps and open points. " * 8,
+            "status": "confirmed",
+        })
+    return events
+
+
+def _gmail_message(i: int, body_chars: int) -> dict:
+    body = ("Hi Fede,\n\n" + "thanks for the update on the project, see the notes below.\n" * (body_chars // 60)
+            + "\n-- \nBest regards\n")[:body_chars]
+    return {
+        "id": f"18c{i:013d}",
+        "threadId": f"18c{i:013d}",
+        "snippet": body[:120],
+        "labelIds": ["INBOX", "UNREAD"] if i % 3 == 0 else ["INBOX"],
+        "payload": {
+            "headers": [
+                {"name": "From", "value": f"Sender {i} <sender{i}@example.com>"},
+                {"name": "To", "value": "fede@example.com"},
+                {"name": "Subject", "value": f"Quarterly report follow-up number {i}"},
+                {"name": "Date", "value": "Mon, 2 Mar 2026 09:30:00 +0100"},
+            ],
+            "body": {"data": base64.urlsafe_b64encode(body.encode()).decode()},
+        },
+    }
+
+
+def _fake_google(events: list[dict], messages: list[dict]):
+    """Point the calendar and gmail tools at the canned data instead of the Google APIs."""
+    by_id = {m["id"]: m for m in messages}
+
+    async def list_events(calendar_id="primary", **params):
+        return {"items": events, "nextSyncToken": "benchmark"}
+
+    async def list_messages(q="", max_results=20, label_ids=None):
+        return {"messages": [{"id": i} for i in list(by_id)[:max_results]], "resultSizeEstimate": len(by_id)}
+
+    async def get_message(message_id, fmt="full", metadata_headers=None):
+        return by_id[message_id]
+
+    async def fetch_messages(ids):
+        return [{"id": i, "message": by_id[i], "error": None} for i in ids]
+
+    async def get_inbox(max_results):
+        return [_parse_metadata(m) for m in messages[:max_results]]
+
+    google_calendar.list_events = list_events
+    gmail_tools.list_messages = list_messages
+    gmail_tools.get_message = get_message
+    gmail_tools.fetch_messages = fetch_messages
+    gmail_tools.get_inbox = get_inbox
+
+
+# --- The tools' previous prose formatting, on the same data ---
+
+def _prose_expenses(items: list[dict]) -> str:
+    lines = [f"Found {len(items)} expense{'s' if len(items) != 1 else ''}:"]
+    for item in items:
+        lines.append(
+            f"- {item.get('date', 'unknown date')}: {item.get('amount', 0)} {item.get('currency', 'EUR')} "
+            f"for {item.get('description', 'No description')} "
+            f"(category: {item.get('category', 'uncategorized')}, id: {item.get('id', '')})"
+        )
+    return "\n".join(lines)
+
+
+def _prose_folders(folders: list[dict]) -> str:
+    lines = [f"You have {len(folders)} folder{'s' if len(folders) != 1 else ''}:"]
+    for folder in folders:
+        stats = public_stats(folder)
+        desc = folder.get("description")
+        desc_part = f" - {desc}" if desc else ""
+        totals = ", ".join(f"{amount:.2f} {cur}" for cur, amount in stats["totals"].items()) or "0.00 EUR"
+        lines.append(
+            f"- {folder['name']}{desc_part}: "
+            f"{stats['expenseCount']} expense{'s' if stats['expenseCount'] != 1 else ''}, "
+            f"{totals} total (id: {folder['id']})"
+        )
+    return "\n".join(lines)
+
+
+def _prose_events(events: list[dict]) -> str:
+    lines = [f"Found {len(events)} event{'s' if len(events) != 1 else ''}:"]
+    for event in events:
+        line = f"- {event['summary']}: {event['start']['dateTime']} to {event['end']['dateTime']}"
+        if event.get("location"):
+            line += f" at {event['location']}"
+        lines.append(line + f" (id: {event['id']})")
+    return "\n".join(lines)
+
+
+def _prose_email_list(messages: list[dict], with_status: bool) -> str:
+    lines = [f"Found {len(messages)} email{'s' if len(messages) != 1 else ''}:"]
+    for msg in messages:
+        parsed = _parse_metadata(msg)
+        status = " [unread]" if with_status and "UNREAD" in parsed["labelIds"] else ""
+        lines.append(f"- From: {parsed['from']}, Subject: {parsed['subject']}, "
+                     f"Date: {parsed['date']}{status} (id: {parsed['id']})")
+    return "\n".join(lines)
+
+
+def _prose_email(msg: dict) -> str:
+    parsed = _parse_message(msg)
+    return "\n".join([
+        f"From: {parsed['from']}", f"To: {parsed['to']}", f"Subject: {parsed['subject']}",
+        f"Date: {parsed['date']}", f"Body: {parsed['body'][:3000] if parsed['body'] else parsed['snippet']}",
+        f"ID: {parsed['id']}", f"Thread ID: {parsed['threadId']}",
+    ])
+
+
+async def _main():
+    container = await get_expenses_container()
+    data = _seed(container, 5000, random.Random(42))
+    await reconcile_folder_stats(container)
+    month_ago = (TODAY - timedelta(days=30)).isoformat()
+    folder_id = data["folder_ids"][0]
+
+    events = _events(20)
+    messages = [_gmail_message(i, 6000) for i in range(10)]
+    _fake_google(events, messages)
+
+    folders = [f async for f in container.query_items(
+        query="SELECT * FROM c WHERE c.type = 'folder' ORDER BY c.createdAt DESC", partition_key="fede")]
+    month_items = await find_expenses(container, start_date=month_ago, limit=20)
+    folder_items = await find_expenses(container, folder_id=folder_id)
+
+    calls = [
+        ("query_expenses (last 30 days, 20)", _prose_expenses(month_items),
+         expense_tools.query_expenses.func(start_date=month_ago)),
+        ("query_folder_expenses", _prose_expenses(folder_items),
+         folder_tools.query_folder_expenses.func(folder_id=folder_id)),
+        ("list_folders", _prose_folders(folders), folder_tools.list_folders.func()),
+        ("list_events (20)", _prose_events(events),
+         calendar_tools.list_events.func(start_date=TODAY.isoformat(), end_date=(TODAY + timedelta(days=7)).isoformat())),
+        ("search_emails (10)", _prose_email_list(messages, with_status=False),
+         gmail_tools.search_emails.func(query="report")),
+        ("list_recent_emails (10)", _prose_email_list(messages, with_status=True),
+         gmail_tools.list_recent_emails.func()),
+        ("read_email (6000-char body)", _prose_email(messages[0]),
+         gmail_tools.read_email.func(email_id=messages[0]["id"])),
+    ]
+
+    print(f"Tokens per tool result ({TOKENIZER})\n")
+    print(f"{'tool call':38} {'before':>8} {'after':>8} {'saved':>7}")
+    before_total = after_total = 0
+    for name, before_text, call in calls:
+        after_text = await call
+        before, after = count_tokens(before_text), count_tokens(after_text)
+        before_total += before
+        after_total += after
+        print(f"{name:38} {before:8d} {after:8d} {1 - after / before:7.0%}")
+    print(f"{'total':38} {before_total:8d} {after_total:8d} {1 - after_total / before_total:7.0%}")
+
+
+def main():
+    asyncio.run(_main())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
-import React, { useState, useMemo } from 'react';
+import React, { useState, useMemo, useEffect } from 'react';
 import { ResponsivePie } from '@nivo/pie';
 import { ResponsiveBar } from '@nivo/bar';
+import { api } from '../../services/api.js';
 import './ExpensesDashboard.css';
 
 const PERIODS = [
@@ -95,33 +96,62 @@ function CenteredMetric({ centerX, centerY, total }) {
   );
 }
 
-function ExpensesDashboard({ expenses, categories, hidePeriodFilter = false }) {
+// Without an `expenses` prop the dashboard asks the server for rollups of the
+// selected period (or of `folderId`), so the payload stays flat however long
+// the history is.
+function ExpensesDashboard({ expenses, categories, hidePeriodFilter = false, folderId, refreshKey }) {
   const [period, setPeriod] = useState('30d');
   const [selectedDay, setSelectedDay] = useState(null);
+  const [summary, setSummary] = useState(null);
+  const [remoteDayExpenses, setRemoteDayExpenses] = useState([]);
 
+  const serverMode = expenses === undefined;
   const { start, end } = useMemo(() => getDateRange(period), [period]);
 
+  useEffect(() => {
+    if (!serverMode) return;
+    let cancelled = false;
+    const range = hidePeriodFilter ? {} : { startDate: formatDate(start), endDate: formatDate(end) };
+    api.getExpenseSummary({ ...range, folderId })
+      .then(data => { if (!cancelled) setSummary(data.summary); })
+      .catch(err => console.error('Failed to load expense summary:', err));
+    return () => { cancelled = true; };
+  }, [serverMode, start, end, hidePeriodFilter, folderId, refreshKey]);
+
   // Filter expenses by selected period (skip when period filter is hidden)
   const filteredExpenses = useMemo(() => {
+    if (serverMode) return [];
     if (hidePeriodFilter) return expenses;
     const startStr = formatDate(start);
     const endStr = formatDate(end);
     return expenses.filter(e => e.date >= startStr && e.date <= endStr);
-  }, [expenses, start, end, hidePeriodFilter]);
-
-  const total = useMemo(
-    () => filteredExpenses.reduce((sum, e) => sum + e.amount, 0),
-    [filteredExpenses]
-  );
+  }, [serverMode, expenses, start, end, hidePeriodFilter]);
 
-  // Donut chart data
-  const donutData = useMemo(() => {
-    const totals = {};
+  // Per-category and per-day totals, from the server rollups or the local list
+  const { count, total, categoryTotals, dailyTotals } = useMemo(() => {
+    if (serverMode) {
+      return {
+        count: summary?.count || 0,
+        total: summary?.total || 0,
+        categoryTotals: summary?.byCategory || {},
+        dailyTotals: summary?.byDay || {},
+      };
+    }
+    const byCategory = {};
+    const byDay = {};
+    let sum = 0;
     filteredExpenses.forEach(e => {
       const cat = (e.category || 'other').toLowerCase();
-      totals[cat] = (totals[cat] || 0) + e.amount;
+      byCategory[cat] = (byCategory[cat] || 0) + e.amount;
+      byDay[e.date] = (byDay[e.date] || 0) + e.amount;
+      sum += e.amount;
     });
-    return Object.entries(totals)
+    return { count: filteredExpenses.length, total: sum, categoryTotals: byCategory, dailyTotals: byDay };
+  }, [serverMode, summary, filteredExpenses]);
+
+  // Donut chart data
+  const donutData = useMemo(() => {
+    return Object.entries(categoryTotals)
       .sort(([, a], [, b]) => b - a)
       .map(([id, value]) => ({
         id,
@@ -129,20 +159,15 @@ function ExpensesDashboard({ expenses, categories, hidePeriodFilter = false }) {
         value: Math.round(value * 100) / 100,
         color: categories[id]?.color || '#64748b',
       }));
-  }, [filteredExpenses, categories]);
+  }, [categoryTotals, categories]);
 
   // Bar chart data
   const barData = useMemo(() => {
-    const dailyTotals = {};
-    filteredExpenses.forEach(e => {
-      dailyTotals[e.date] = (dailyTotals[e.date] || 0) + e.amount;
-    });
-
     // When period filter is hidden, derive range from actual data
     let barStart = start;
     let barEnd = end;
-    if (hidePeriodFilter && filteredExpenses.length > 0) {
-      const dates = filteredExpenses.map(e => e.date).sort();
+    const dates = Object.keys(dailyTotals).filter(d => d !== 'unknown').sort();
+    if (hidePeriodFilter && dates.length > 0) {
       barStart = new Date(dates[0] + 'T00:00:00');
       barEnd = new Date(dates[dates.length - 1] + 'T00:00:00');
     }
@@ -153,7 +178,17 @@ function ExpensesDashboard({ expenses, categories, hidePeriodFilter = false }) {
       day: parseInt(date.slice(8), 10).toString(),
       amount: Math.round((dailyTotals[date] || 0) * 100) / 100,
     }));
-  }, [filteredExpenses, start, end, hidePeriodFilter]);
+  }, [dailyTotals, start, end, hidePeriodFilter]);
+
+  // Server mode only ships totals: load the selected day's expenses on demand
+  useEffect(() => {
+    if (!serverMode || !selectedDay) return;
+    let cancelled = false;
+    api.getExpenses({ startDate: selectedDay, endDate: selectedDay, folderId, limit: 200 })
+      .then(data => { if (!cancelled) setRemoteDayExpenses(data.expenses); })
+      .catch(err => console.error('Failed to load day expenses:', err));
+    return () => { cancelled = true; };
+  }, [serverMode, selectedDay, folderId, refreshKey]);
 
   // Determine which tick labels to show on x-axis
   const barTickValues = useMemo(() => {
@@ -175,10 +210,11 @@ function ExpensesDashboard({ expenses, categories, hidePeriodFilter = false }) {
   // Expenses for selected day popup
   const dayExpenses = useMemo(() => {
     if (!selectedDay) return [];
-    return filteredExpenses
+    const source = serverMode ? remoteDayExpenses : filteredExpenses;
+    return source
       .filter(e => e.date === selectedDay)
       .sort((a, b) => b.amount - a.amount);
-  }, [filteredExpenses, selectedDay]);
+  }, [serverMode, remoteDayExpenses, filteredExpenses, selectedDay]);
 
   const handleBarClick = (bar) => {
     if (bar.data.amount > 0) {
@@ -223,7 +259,7 @@ function ExpensesDashboard({ expenses, categories, hidePeriodFilter = false }) {
         <div className="dashboard-card-header">
           <span className="dashboard-card-title">By Category</span>
           <span className="dashboard-card-subtitle">
-            {filteredExpenses.length} expense{filteredExpenses.length !== 1 ? 's' : ''}
+            {count} expense{count !== 1 ? 's' : ''}
           </span>
         </div>
         <div className="donut-chart-container">
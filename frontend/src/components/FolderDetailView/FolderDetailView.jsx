@@ -3,11 +3,14 @@ import ExpenseCard from '../ExpenseCard/ExpenseCard.jsx';
 import ExpensesDashboard from '../ExpensesDashboard/ExpensesDashboard.jsx';
 import ExpenseModal from '../ExpenseModal/ExpenseModal.jsx';
 import AddToFolderModal from '../AddToFolderModal/AddToFolderModal.jsx';
+import { useLoadMoreSentinel } from '../../hooks/usePagedExpenses.js';
 import './FolderDetailView.css';
 
 function FolderDetailView({
   folder,
   expenses,
+  hasMoreExpenses = false,
+  onLoadMoreExpenses,
   allExpenses,
   categories,
   onBack,
@@ -34,10 +37,10 @@ function FolderDetailView({
     return expenses.filter(e => getCatKey(e) === filter);
   }, [expenses, filter]);
 
-  const total = useMemo(
-    () => expenses.reduce((sum, e) => sum + e.amount, 0),
-    [expenses]
-  );
+  // Expenses arrive a page at a time: header figures come from the folder's stats
+  const total = folder.total ?? expenses.reduce((sum, e) => sum + e.amount, 0);
+  const expenseCount = folder.expenseCount ?? expenses.length;
+  const loadMoreRef = useLoadMoreSentinel(onLoadMoreExpenses, hasMoreExpenses);
 
   const unassignedExpenses = useMemo(() => {
     return allExpenses
@@ -102,7 +105,7 @@ function FolderDetailView({
         </div>
         <div className="folder-detail-header-right">
           <span className="folder-detail-count">
-            {expenses.length} expense{expenses.length !== 1 ? 's' : ''}
+            {expenseCount} expense{expenseCount !== 1 ? 's' : ''}
           </span>
           <div className="view-toggle">
             <button
@@ -187,12 +190,18 @@ function FolderDetailView({
                   </div>
                 ))
               )}
+              {hasMoreExpenses && <div ref={loadMoreRef} className="expenses-load-more" />}
             </div>
           </>
         )}
 
         {view === 'dashboard' && (
-          <ExpensesDashboard expenses={expenses} categories={categories} hidePeriodFilter />
+          <ExpensesDashboard
+            folderId={folder.id}
+            categories={categories}
+            hidePeriodFilter
+            refreshKey={expenses}
+          />
         )}
       </div>
 
@@ -0,0 +1,81 @@
+import { useState, useRef, useCallback, useEffect } from 'react';
+
+// Pages through a cursor-paginated expense listing. As soon as a page is shown
+// the next one is requested in the background, so scrolling to the end of the
+// list appends it without waiting on the network.
+export function usePagedExpenses(fetchPage, { enabled = true } = {}) {
+  const [expenses, setExpenses] = useState([]);
+  const [loading, setLoading] = useState(enabled);
+  const [hasMore, setHasMore] = useState(false);
+  const nextCursor = useRef(null);
+  const prefetched = useRef(null);
+  const generation = useRef(0);
+
+  const prefetch = useCallback((cursor) => {
+    prefetched.current = cursor ? { cursor, promise: fetchPage(cursor) } : null;
+    // Errors surface when the page is actually needed
+    prefetched.current?.promise.catch(() => {});
+  }, [fetchPage]);
+
+  const reload = useCallback(async () => {
+    const gen = ++generation.current;
+    setLoading(true);
+    try {
+      const data = await fetchPage(null);
+      if (gen !== generation.current) return;
+      setExpenses(data.expenses);
+      nextCursor.current = data.next;
+      setHasMore(Boolean(data.next));
+      prefetch(data.next);
+    } catch (err) {
+      console.error('Failed to load expenses:', err);
+    } finally {
+      if (gen === generation.current) setLoading(false);
+    }
+  }, [fetchPage, prefetch]);
+
+  const loadMore = useCallback(async () => {
+    const cursor = nextCursor.current;
+    if (!cursor) return;
+    nextCursor.current = null; // one in-flight page at a time
+    const gen = generation.current;
+    try {
+      const pending = prefetched.current?.cursor === cursor
+        ? prefetched.current.promise
+        : fetchPage(cursor);
+      const data = await pending;
+      if (gen !== generation.current) return;
+      setExpenses((prev) => [...prev, ...data.expenses]);
+      nextCursor.current = data.next;
+      setHasMore(Boolean(data.next));
+      prefetch(data.next);
+    } catch (err) {
+      nextCursor.current = cursor;
+      prefetched.current = null;
+      console.error('Failed to load more expenses:', err);
+    }
+  }, [fetchPage, prefetch]);
+
+  useEffect(() => {
+    if (enabled) reload();
+  }, [enabled, reload]);
+
+  return { expenses, setExpenses, loading, hasMore, loadMore, reload };
+}
+
+// Calls onVisible whenever the element given to the returned callback ref
+// scrolls into view (a callback ref, so remounting the list re-attaches it)
+export function useLoadMoreSentinel(onVisible, active) {
+  const [element, setElement] = useState(null);
+
+  useEffect(() => {
+    if (!element || !active || !onVisible) return undefined;
+    const observer = new IntersectionObserver((entries) => {
+      if (entries.some((e) => e.isIntersecting)) onVisible();
+    }, { rootMargin: '400px' });
+    observer.observe(element);
+    return () => observer.disconnect();
+  }, [element, onVisible, active]);
+
+  return setElement;
+}
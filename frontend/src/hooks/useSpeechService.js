@@ -410,6 +410,26 @@ export function useSpeechService() {
     }
   }, []);
 
+  /**
+   * Stream AI response from backend, calling onSentence for each complete
+   * sentence as soon as it arrives (lets TTS start before the turn ends)
+   */
+  const getAIResponseStream = useCallback(async (text, onSentence) => {
+    setIsProcessing(true);
+
+    try {
+      return await api.streamMessage(text, (event, payload) => {
+        if (event === 'sentence') onSentence(payload.text);
+      });
+    } catch (err) {
+      console.error('AI response error:', err);
+      setError(err.message);
+      return null;
+    } finally {
+      setIsProcessing(false);
+    }
+  }, []);
+
   /**
    * Get frequency data for voice-reactive visualizer.
    * Returns a 64-element array when listening (real mic data) or speaking (simulated).
@@ -486,6 +506,7 @@ export function useSpeechService() {
     wasInterrupted,
     clearInterrupted,
     getAIResponse,
+    getAIResponseStream,
     getFrequencyData
   };
 }
@@ -5,8 +5,8 @@
  *
  * 1. User taps robot → start session (wake up)
  * 2. User speaks → Azure STT recognizes text
- * 3. Text sent to backend → AI responds
- * 4. Azure TTS speaks response (mic paused to prevent echo)
+ * 3. Text sent to backend → AI response streams back sentence by sentence
+ * 4. Azure TTS speaks each sentence as it arrives (mic paused to prevent echo)
  * 5. Mic resumes after TTS finishes → ready for next input
  * 6. User taps robot again → stop session (sleep)
  * 7. Mic button toggles mute/unmute during active session
@@ -39,7 +39,7 @@ export function useVoiceChat() {
     stopSpeaking,
     wasInterrupted,
     clearInterrupted,
-    getAIResponse,
+    getAIResponseStream,
     getFrequencyData
   } = useSpeechService();
 
@@ -87,49 +87,51 @@ export function useVoiceChat() {
         content: text
       });
 
-      // Get AI response
-      const response = await getAIResponse(text);
-
-      // Check if interrupted during processing (session stopped) - don't speak if so
-      if (wasInterrupted()) {
-        // Still show the response in chat even if we skip speaking
-        if (response) {
-          addMessage({
-            role: 'assistant',
-            content: response.text,
-            agent: response.agent
+      // Speak sentences in order as they stream in
+      let speechQueue = Promise.resolve();
+      let startedSpeaking = false;
+      const canSpeak = () => isSessionActiveRef.current && !wasInterrupted();
+
+      const onSentence = (sentence) => {
+        if (!canSpeak()) return;
+        if (!startedSpeaking) {
+          startedSpeaking = true;
+          // Mute mic during TTS to prevent echo (especially on iPhone)
+          speechQueue = speechQueue.then(async () => {
+            await pauseListening();
+            setStatus('speaking');
           });
         }
-        setStatus('listening');
-        return;
-      }
+        speechQueue = speechQueue.then(() => (canSpeak() ? speak(sentence) : undefined));
+      };
 
-      if (response && isSessionActiveRef.current) {
-        // Add assistant message to chat
+      // Get AI response (streamed)
+      const response = await getAIResponseStream(text, onSentence);
+
+      if (response) {
+        // Show the response in chat even if speaking was interrupted
         addMessage({
           role: 'assistant',
           content: response.text,
           agent: response.agent
         });
-        setActiveAgent(response.agent);
-
-        // Mute mic during TTS to prevent echo (especially on iPhone)
-        await pauseListening();
+        if (isSessionActiveRef.current) setActiveAgent(response.agent);
+      }
 
-        // Speak the response
-        setStatus('speaking');
-        await speak(response.text);
+      // Wait for the remaining queued sentences to finish playing
+      await speechQueue;
 
-        // Resume mic after TTS finishes
-        if (isSessionActiveRef.current && !wasInterrupted()) {
-          await resumeListening();
-          setStatus('listening');
-        }
+      // Resume mic after TTS finishes
+      if (isSessionActiveRef.current && !wasInterrupted()) {
+        if (startedSpeaking) await resumeListening();
+        setStatus('listening');
+      } else if (wasInterrupted()) {
+        setStatus('listening');
       }
     } finally {
       isProcessingRef.current = false;
     }
-  }, [addMessage, getAIResponse, speak, setActiveAgent, wasInterrupted, clearInterrupted, pauseListening, resumeListening]);
+  }, [addMessage, getAIResponseStream, speak, setActiveAgent, wasInterrupted, clearInterrupted, pauseListening, resumeListening]);
 
   /**
    * Handle partial transcription (live preview while user speaks)
@@ -8,6 +8,7 @@ import FolderModal from '../../components/FolderModal/FolderModal.jsx';
 import FolderDetailView from '../../components/FolderDetailView/FolderDetailView.jsx';
 import AddToFolderModal from '../../components/AddToFolderModal/AddToFolderModal.jsx';
 import { useSwipe } from '../../hooks/useSwipe.js';
+import { usePagedExpenses, useLoadMoreSentinel } from '../../hooks/usePagedExpenses.js';
 import './ExpensesPage.css';
 
 const CATEGORIES = {
@@ -21,8 +22,6 @@ const CATEGORIES = {
 };
 
 function ExpensesPage() {
-  const [expenses, setExpenses] = useState([]);
-  const [loading, setLoading] = useState(true);
   const [filter, setFilter] = useState(null);
   const [modalOpen, setModalOpen] = useState(false);
   const [editingExpense, setEditingExpense] = useState(null);
@@ -52,17 +51,29 @@ function ExpensesPage() {
     }),
   });
 
-  const fetchExpenses = useCallback(async () => {
-    setLoading(true);
-    try {
-      const data = await api.getExpenses({});
-      setExpenses(data.expenses);
-    } catch (err) {
-      console.error('Failed to load expenses:', err);
-    } finally {
-      setLoading(false);
-    }
-  }, []);
+  // Cursor-paginated listings: all expenses, and the open folder's expenses
+  const fetchExpensePage = useCallback((cursor) => api.getExpenses({ cursor }), []);
+  const {
+    expenses,
+    setExpenses,
+    loading,
+    hasMore,
+    loadMore,
+    reload: fetchExpenses,
+  } = usePagedExpenses(fetchExpensePage);
+  const loadMoreRef = useLoadMoreSentinel(loadMore, hasMore && !loading);
+
+  const fetchFolderPage = useCallback(
+    (cursor) => api.getFolderExpenses(activeFolderId, { cursor }),
+    [activeFolderId]
+  );
+  const folderPages = usePagedExpenses(fetchFolderPage, { enabled: activeFolderId !== null });
+
+  // Reload every listing that may show the changed expenses
+  const refreshExpenses = () => {
+    fetchExpenses();
+    if (activeFolderId !== null) folderPages.reload();
+  };
 
   const fetchFolders = useCallback(async () => {
     try {
@@ -74,9 +85,8 @@ function ExpensesPage() {
   }, []);
 
   useEffect(() => {
-    fetchExpenses();
     fetchFolders();
-  }, [fetchExpenses, fetchFolders]);
+  }, [fetchFolders]);
 
   // Normalize category for consistent lookups
   const getCatKey = (e) => (e.category || 'other').toLowerCase();
@@ -99,10 +109,7 @@ function ExpensesPage() {
   );
 
   // Expenses belonging to the active folder
-  const folderExpenses = useMemo(
-    () => activeFolderId ? expenses.filter(e => e.folderId === activeFolderId) : [],
-    [expenses, activeFolderId]
-  );
+  const folderExpenses = activeFolderId ? folderPages.expenses : [];
 
   // Unassigned expenses (no folderId)
   const unassignedExpenses = useMemo(
@@ -129,7 +136,7 @@ function ExpensesPage() {
     }
     setModalOpen(false);
     setEditingExpense(null);
-    fetchExpenses();
+    refreshExpenses();
     fetchFolders();
   };
 
@@ -138,6 +145,7 @@ function ExpensesPage() {
     try {
       await api.deleteExpense(id);
       setExpenses((prev) => prev.filter((e) => e.id !== id));
+      folderPages.setExpenses((prev) => prev.filter((e) => e.id !== id));
       fetchFolders();
     } catch (err) {
       console.error('Failed to delete expense:', err);
@@ -246,7 +254,7 @@ function ExpensesPage() {
     try {
       await api.assignExpensesToFolder(activeFolderId, expenseIds);
       setAddToFolderModalOpen(false);
-      fetchExpenses();
+      refreshExpenses();
       fetchFolders();
     } catch (err) {
       console.error('Failed to assign expenses:', err);
@@ -257,7 +265,7 @@ function ExpensesPage() {
     if (!activeFolderId) return;
     try {
       await api.removeExpenseFromFolder(activeFolderId, expenseId);
-      fetchExpenses();
+      refreshExpenses();
       fetchFolders();
     } catch (err) {
       console.error('Failed to remove expense from folder:', err);
@@ -294,6 +302,8 @@ function ExpensesPage() {
         <FolderDetailView
           folder={activeFolder}
           expenses={folderExpenses}
+          hasMoreExpenses={folderPages.hasMore}
+          onLoadMoreExpenses={folderPages.loadMore}
           allExpenses={expenses}
           categories={CATEGORIES}
           onBack={() => setActiveFolderId(null)}
@@ -481,6 +491,7 @@ function ExpensesPage() {
                 />
               ))
             )}
+            {hasMore && <div ref={loadMoreRef} className="expenses-load-more" />}
           </div>
         </>
       )}
@@ -492,7 +503,7 @@ function ExpensesPage() {
             <p>Loading...</p>
           </div>
         ) : (
-          <ExpensesDashboard expenses={expenses} categories={CATEGORIES} />
+          <ExpensesDashboard categories={CATEGORIES} refreshKey={expenses} />
         )
       )}
 
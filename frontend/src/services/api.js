@@ -32,6 +32,15 @@ async function fetchWithAuth(url, options = {}) {
   return response;
 }
 
+// Server-side conversation this page's chat belongs to; the backend starts
+// one on the first message and returns its ID with every reply
+let conversationId = null;
+
+function rememberConversation(response, data) {
+  if (response.status === 404) conversationId = null; // deleted meanwhile: next turn starts a new one
+  if (data?.conversationId) conversationId = data.conversationId;
+}
+
 export const api = {
   async getSpeechToken() {
     const response = await fetchWithAuth('/api/speech-token');
@@ -42,10 +51,62 @@ export const api = {
   async sendMessage(text) {
     const response = await fetchWithAuth('/api/chat', {
       method: 'POST',
-      body: JSON.stringify({ message: text }),
+      body: JSON.stringify({ message: text, conversationId }),
     });
+    rememberConversation(response);
     if (!response.ok) throw new Error('Failed to send message');
-    return response.json();
+    const data = await response.json();
+    rememberConversation(response, data);
+    return data;
+  },
+
+  /**
+   * Stream a chat turn over SSE. onEvent(event, payload) is called for
+   * 'agent', 'progress' and 'sentence' events; resolves with the final
+   * { text, agent, cached } once the 'done' event arrives.
+   */
+  async streamMessage(text, onEvent) {
+    const response = await fetchWithAuth('/api/chat/stream', {
+      method: 'POST',
+      body: JSON.stringify({ message: text, conversationId }),
+    });
+    rememberConversation(response);
+    if (!response.ok || !response.body) throw new Error('Failed to send message');
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let result = null;
+
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      let sep;
+      while ((sep = buffer.indexOf('\n\n')) !== -1) {
+        const raw = buffer.slice(0, sep);
+        buffer = buffer.slice(sep + 2);
+
+        let event = 'message';
+        let data = '';
+        for (const line of raw.split('\n')) {
+          if (line.startsWith('event: ')) event = line.slice(7);
+          else if (line.startsWith('data: ')) data += line.slice(6);
+        }
+        const payload = data ? JSON.parse(data) : {};
+
+        if (event === 'error') throw new Error(payload.detail || 'Failed to send message');
+        if (event === 'done') {
+          rememberConversation(response, payload);
+          result = { text: payload.text, agent: 'jarvis', cached: Boolean(payload.cached) };
+        }
+        if (onEvent) onEvent(event, payload);
+      }
+    }
+
+    if (!result) throw new Error('Chat stream ended unexpectedly');
+    return result;
   },
 
   async getConversationHistory() {
@@ -54,23 +115,50 @@ export const api = {
     return response.json();
   },
 
+  async getConversation(id) {
+    const response = await fetchWithAuth(`/api/conversations/${id}`);
+    if (!response.ok) throw new Error('Failed to fetch conversation');
+    return response.json();
+  },
+
+  /** Forget the current conversation: the next message starts a new one. */
+  startNewConversation() {
+    conversationId = null;
+  },
+
   async getAgentStatus() {
     const response = await fetchWithAuth('/api/agents/status');
     if (!response.ok) throw new Error('Failed to get agent status');
     return response.json();
   },
 
-  async getExpenses({ category, startDate, endDate } = {}) {
+  // Returns { expenses, next }: pass `next` back as `cursor` for the following page
+  async getExpenses({ category, startDate, endDate, folderId, cursor, limit } = {}) {
     const params = new URLSearchParams();
     if (category) params.set('category', category);
     if (startDate) params.set('start_date', startDate);
     if (endDate) params.set('end_date', endDate);
+    if (folderId) params.set('folder_id', folderId);
+    if (cursor) params.set('cursor', cursor);
+    if (limit) params.set('limit', limit);
     const qs = params.toString();
     const response = await fetchWithAuth(`/api/expenses${qs ? `?${qs}` : ''}`);
     if (!response.ok) throw new Error('Failed to fetch expenses');
     return response.json();
   },
 
+  async getExpenseSummary({ category, startDate, endDate, folderId } = {}) {
+    const params = new URLSearchParams();
+    if (category) params.set('category', category);
+    if (startDate) params.set('start_date', startDate);
+    if (endDate) params.set('end_date', endDate);
+    if (folderId) params.set('folder_id', folderId);
+    const qs = params.toString();
+    const response = await fetchWithAuth(`/api/expenses/summary${qs ? `?${qs}` : ''}`);
+    if (!response.ok) throw new Error('Failed to fetch expense summary');
+    return response.json();
+  },
+
   async createExpense(expense) {
     const response = await fetchWithAuth('/api/expenses', {
       method: 'POST',
@@ -151,6 +239,16 @@ export const api = {
     return response.json();
   },
 
+  async getFolderExpenses(id, { cursor, limit } = {}) {
+    const params = new URLSearchParams();
+    if (cursor) params.set('cursor', cursor);
+    if (limit) params.set('limit', limit);
+    const qs = params.toString();
+    const response = await fetchWithAuth(`/api/folders/${id}/expenses${qs ? `?${qs}` : ''}`);
+    if (!response.ok) throw new Error('Failed to fetch folder expenses');
+    return response.json();
+  },
+
   async createFolder(formData) {
     const response = await fetchWithAuth('/api/folders', {
       method: 'POST',